@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+品牌匹配基准测试
+比较原来的逐个文件 normalize_text + 查表，与带缓存和 ASCII 快速路径的 match_many
+
+用法：
+    python benchmarks/bench_matching.py --brands 50000 --files 1000000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import unicodedata
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from brand_engine import BrandCheckEngine  # noqa: E402
+
+
+ACCENTED = "éèêëàâäîïôöùûüçñ"
+LETTERS = "abcdefghijklmnopqrstuvwxyz"
+
+
+def normalize_text_baseline(text):
+    """原来的 normalize_text：对每个字符串都做 NFD 分解"""
+    nfd = unicodedata.normalize('NFD', text)
+    no_accent = ''.join(char for char in nfd if unicodedata.category(char) != 'Mn')
+    return no_accent.lower()
+
+
+def make_brand_name(rng, accent_rate):
+    """随机品牌名，部分带重音字母"""
+    length = rng.randint(4, 12)
+    chars = [rng.choice(LETTERS) for _ in range(length)]
+    if rng.random() < accent_rate:
+        chars[rng.randrange(length)] = rng.choice(ACCENTED)
+    return ''.join(chars).capitalize()
+
+
+def make_tokens(rng, brands, count, miss_rate):
+    """
+    模拟文件名中的品牌名分布：少数品牌占大多数文件（Zipf 分布），
+    大小写随机变化，一部分是不存在的品牌
+    """
+    weights = [1.0 / (rank + 1) for rank in range(len(brands))]
+    picked = rng.choices(brands, weights=weights, k=count)
+    tokens = []
+    for brand in picked:
+        if rng.random() < miss_rate:
+            brand = brand + rng.choice(LETTERS)
+        style = rng.random()
+        if style < 0.2:
+            brand = brand.upper()
+        elif style < 0.4:
+            brand = brand.lower()
+        tokens.append(brand)
+    return tokens
+
+
+def run(brand_count, file_count, miss_rate, accent_rate, seed):
+    rng = random.Random(seed)
+    brands = list({make_brand_name(rng, accent_rate) for _ in range(brand_count)})
+    tokens = make_tokens(rng, brands, file_count, miss_rate)
+
+    engine = BrandCheckEngine()
+    engine.brands = set(brands)
+    for brand in brands:
+        engine.normalized_brands.setdefault(engine.normalize_text(brand), []).append(brand)
+    engine.reset_match_cache()
+    lookup = engine.normalized_brands
+
+    start = time.perf_counter()
+    baseline = []
+    for token in tokens:
+        candidates = lookup.get(normalize_text_baseline(token))
+        baseline.append(candidates[0] if candidates else None)
+    baseline_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = engine.match_many(tokens)
+    batched_seconds = time.perf_counter() - start
+
+    if batched != baseline:
+        raise SystemExit("match_many 的结果与逐个匹配不一致")
+
+    cache = engine.match_token.cache_info()
+    return {
+        "brands": len(brands),
+        "files": file_count,
+        "distinct_tokens": len(set(tokens)),
+        "miss_rate": miss_rate,
+        "accent_rate": accent_rate,
+        "baseline_seconds": baseline_seconds,
+        "match_many_seconds": batched_seconds,
+        "speedup": baseline_seconds / batched_seconds if batched_seconds else None,
+        "cache_hits": cache.hits,
+        "cache_misses": cache.misses,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="品牌匹配基准测试")
+    parser.add_argument("--brands", type=int, default=50000, help="品牌数")
+    parser.add_argument("--files", type=int, default=1000000, help="文件数（品牌名个数）")
+    parser.add_argument("--miss-rate", type=float, default=0.05, help="不存在的品牌所占比例")
+    parser.add_argument("--accent-rate", type=float, default=0.1, help="带重音字母的品牌所占比例")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", default=None, help="把结果写入 JSON 文件")
+    args = parser.parse_args(argv)
+
+    result = run(args.brands, args.files, args.miss_rate, args.accent_rate, args.seed)
+    print(f"品牌数: {result['brands']}，文件数: {result['files']}，不同品牌名: {result['distinct_tokens']}")
+    print(f"逐个匹配:   {result['baseline_seconds']:.3f} 秒")
+    print(f"match_many: {result['match_many_seconds']:.3f} 秒（提速 {result['speedup']:.1f} 倍）")
+    print(f"缓存命中: {result['cache_hits']}，未命中: {result['cache_misses']}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+检查结果集的内存占用基准测试
+对比每个文件保存 (Path, 品牌名, 结论字符串) 与 ResultStore 的紧凑保存方式，单位为每百万文件的 MB
+
+用法：
+    python benchmarks/bench_results.py --files 1000000 --dirs 20000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from brand_engine import VERDICT_FOUND, VERDICT_NOT_FOUND  # noqa: E402
+from brand_results import ResultStore  # noqa: E402
+from bench_matching import make_brand_name  # noqa: E402
+
+
+ROOT = "/data/images"
+
+
+def make_rows(rng, file_count, dir_count, brands):
+    """(目录, 文件名, 品牌名, 结论)，按目录顺序排列（与遍历时一致）"""
+    dirs = [f"{ROOT}/品类{d % 50}/批次{d}" for d in range(dir_count)]
+    rows = []
+    for i in range(file_count):
+        brand = rng.choice(brands)
+        verdict = VERDICT_FOUND if rng.random() < 0.5 else VERDICT_NOT_FOUND
+        rows.append((dirs[i * dir_count // file_count], f"品牌_{brand}_2025年03月16日_{i}.jpg", brand, verdict))
+    return rows
+
+
+def measure(build):
+    """返回 (构建后增加的内存字节数, 耗时)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    kept = build()
+    seconds = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return size, seconds
+
+
+def run(file_count, dir_count, brand_count, seed):
+    rng = random.Random(seed)
+    brands = list({make_brand_name(rng, 0.1) for _ in range(brand_count)})
+    rows = make_rows(rng, file_count, dir_count, brands)
+    verdict_names = {VERDICT_FOUND: "found", VERDICT_NOT_FOUND: "not_found"}
+
+    def build_paths():
+        # 拼接出新的字符串，与从遍历结果中得到路径时一样
+        return [(Path(dir_path) / name, "".join(brand), verdict_names[verdict])
+                for dir_path, name, brand, verdict in rows]
+
+    def build_store():
+        store = ResultStore(ROOT)
+        last_dir, dir_id = None, None
+        for dir_path, name, brand, verdict in rows:
+            if dir_path != last_dir:
+                last_dir, dir_id = dir_path, store.add_dir(dir_path)
+            store.add(dir_id, name, brand, verdict)
+        return store
+
+    results = []
+    for label, build in (("Path 列表", build_paths), ("ResultStore", build_store)):
+        size, seconds = measure(build)
+        results.append({
+            "storage": label,
+            "files": file_count,
+            "bytes": size,
+            "mb_per_million": size / file_count * 1e6 / (1024 * 1024),
+            "seconds": seconds,
+        })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="检查结果集的内存占用基准测试")
+    parser.add_argument("--files", type=int, default=1000000, help="文件数")
+    parser.add_argument("--dirs", type=int, default=20000, help="目录数")
+    parser.add_argument("--brands", type=int, default=5000, help="品牌数")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", default=None, help="把结果写入 JSON 文件")
+    args = parser.parse_args(argv)
+
+    results = run(args.files, args.dirs, args.brands, args.seed)
+    for row in results:
+        print(f"{row['storage']:<12} {row['bytes'] / (1024 * 1024):8.1f} MB  "
+              f"（每百万文件 {row['mb_per_million']:.1f} MB），构建 {row['seconds']:.2f} 秒")
+    print(f"内存占用之比: {results[0]['bytes'] / results[1]['bytes']:.1f} 倍")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
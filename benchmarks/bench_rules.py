@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文件名规则基准测试
+规则数从少到多，比较编译成一个正则表达式的 FilenameRules 与逐条规则调用 re.match 的 Python 循环，
+文件名平均分布在各条规则上（最后一条是默认的下划线规则）
+
+用法：
+    python benchmarks/bench_rules.py --rules 1 10 50 200 --files 200000
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from brand_rules import FilenameRules  # noqa: E402
+
+
+def make_rules(count):
+    """count - 1 条供应商规则（交替使用正则和前缀表），最后是默认规则"""
+    rules = []
+    for i in range(count - 1):
+        if i % 2 == 0:
+            rules.append({"type": "regex", "pattern": rf"^S{i:04d}-(?P<brand>[^-]+)-\d+"})
+        else:
+            rules.append({"type": "prefix", "prefixes": {f"P{i:04d}{j}": f"Brand{j}" for j in range(5)}})
+    rules.append({"type": "delimiter", "delimiter": "_", "position": 1})
+    return rules
+
+
+def make_filenames(rng, count, rule_count):
+    names = []
+    for n in range(count):
+        i = rng.randrange(rule_count)
+        if i == rule_count - 1:
+            names.append(f"品牌_Brand{n % 100}_2025年03月16日_{n}")
+        elif i % 2 == 0:
+            names.append(f"S{i:04d}-Brand{n % 100}-{n}")
+        else:
+            names.append(f"P{i:04d}{n % 5}_{n}")
+    return names
+
+
+def loop_matcher(rules):
+    """对照组：逐条规则尝试（每条规则一次 Python 调用）"""
+    compiled = []
+    for rule in rules:
+        if rule["type"] == "regex":
+            compiled.append((re.compile(rule["pattern"][1:]), None))
+        elif rule["type"] == "prefix":
+            ordered = sorted(rule["prefixes"], key=len, reverse=True)
+            pattern = re.compile(f"(?P<brand>{'|'.join(re.escape(p) for p in ordered)})")
+            compiled.append((pattern, rule["prefixes"]))
+        else:
+            compiled.append((re.compile(r"(?:[^_]*_){1}(?P<brand>[^_]+)"), None))
+
+    def match(stem):
+        for pattern, table in compiled:
+            m = pattern.match(stem)
+            if m is not None:
+                brand = m.group("brand")
+                return table[brand] if table is not None else brand
+        return None
+    return match
+
+
+def run(rule_counts, file_count, seed):
+    rows = []
+    for rule_count in rule_counts:
+        rng = random.Random(seed)
+        rules = make_rules(rule_count)
+        names = make_filenames(rng, file_count, rule_count)
+
+        start = time.perf_counter()
+        compiled = FilenameRules(rules)
+        compile_seconds = time.perf_counter() - start
+        match = compiled.match
+        start = time.perf_counter()
+        combined = [match(name)[0] for name in names]
+        combined_seconds = time.perf_counter() - start
+
+        loop = loop_matcher(rules)
+        start = time.perf_counter()
+        looped = [loop(name) for name in names]
+        loop_seconds = time.perf_counter() - start
+
+        if combined != looped:
+            raise SystemExit("FilenameRules 的结果与逐条规则匹配不一致")
+        rows.append({
+            "rules": rule_count,
+            "files": file_count,
+            "compile_seconds": compile_seconds,
+            "combined_seconds": combined_seconds,
+            "combined_files_per_second": file_count / combined_seconds if combined_seconds else None,
+            "loop_seconds": loop_seconds,
+            "loop_files_per_second": file_count / loop_seconds if loop_seconds else None,
+        })
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="文件名规则基准测试")
+    parser.add_argument("--rules", type=int, nargs='+', default=[1, 10, 50, 200], help="规则数（可以给多个）")
+    parser.add_argument("--files", type=int, default=200000, help="文件名个数")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", default=None, help="把结果写入 JSON 文件")
+    args = parser.parse_args(argv)
+
+    rows = run(args.rules, args.files, args.seed)
+    for row in rows:
+        print(f"规则数: {row['rules']:>5}  编译: {row['compile_seconds']:.3f} 秒  "
+              f"合并正则: {row['combined_files_per_second']:>12,.0f} 个文件/秒  "
+              f"逐条匹配: {row['loop_files_per_second']:>12,.0f} 个文件/秒")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
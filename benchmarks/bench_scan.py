@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+整个文件名查找品牌（scan 方式）的基准测试
+品牌数从少到多，每个文件名的查找耗时应基本不变（只与文件名长度有关）
+
+用法：
+    python benchmarks/bench_scan.py --brands 1000 10000 100000 --files 200000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from brand_automaton import BrandAutomaton  # noqa: E402
+from brand_engine import normalize_text  # noqa: E402
+from bench_matching import make_brand_name  # noqa: E402
+
+
+def make_filenames(rng, brands, count, miss_rate):
+    """不同命名格式的文件名，品牌出现在不同位置"""
+    names = []
+    for i in range(count):
+        brand = rng.choice(brands) if rng.random() >= miss_rate else "unknownbrand"
+        layout = i % 3
+        if layout == 0:
+            names.append(f"品牌_{brand}_2025年03月16日_{i}")
+        elif layout == 1:
+            names.append(f"IMG_{i:06d} {brand} summer collection")
+        else:
+            names.append(f"{i}-{brand}-正面")
+    return names
+
+
+def run(brand_counts, file_count, miss_rate, accent_rate, seed):
+    rows = []
+    for brand_count in brand_counts:
+        rng = random.Random(seed)
+        brands = list({make_brand_name(rng, accent_rate) for _ in range(brand_count)})
+        names = [normalize_text(name) for name in make_filenames(rng, brands, file_count, miss_rate)]
+
+        start = time.perf_counter()
+        automaton = BrandAutomaton({normalize_text(brand): brand for brand in brands})
+        build_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        found = sum(1 for name in names if automaton.detect(name))
+        scan_seconds = time.perf_counter() - start
+        rows.append({
+            "brands": len(brands),
+            "nodes": len(automaton),
+            "files": file_count,
+            "found": found,
+            "build_seconds": build_seconds,
+            "scan_seconds": scan_seconds,
+            "files_per_second": file_count / scan_seconds if scan_seconds else None,
+        })
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="整个文件名查找品牌的基准测试")
+    parser.add_argument("--brands", type=int, nargs='+', default=[1000, 10000, 100000], help="品牌数（可以给多个）")
+    parser.add_argument("--files", type=int, default=200000, help="文件名个数")
+    parser.add_argument("--miss-rate", type=float, default=0.05, help="不含已有品牌的文件名比例")
+    parser.add_argument("--accent-rate", type=float, default=0.1, help="带重音字母的品牌所占比例")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", default=None, help="把结果写入 JSON 文件")
+    args = parser.parse_args(argv)
+
+    rows = run(args.brands, args.files, args.miss_rate, args.accent_rate, args.seed)
+    for row in rows:
+        print(f"品牌数: {row['brands']:>7}  节点数: {row['nodes']:>8}  建立: {row['build_seconds']:.3f} 秒  "
+              f"查找: {row['scan_seconds']:.3f} 秒（{row['files_per_second']:,.0f} 个文件/秒），找到 {row['found']}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+生成用于基准测试的品牌目录和图片目录
+
+品牌目录：<根目录>/<品类>/<品牌>（三级结构，与实际品牌库一致），部分品牌名带重音字母
+图片目录：多级子目录中的图片文件，文件名格式 品牌_<品牌>_2025年03月16日_<目录>_<序号>.jpg，
+         按 miss_rate 的比例使用不存在的品牌名
+
+用法：
+    python benchmarks/generate_tree.py /tmp/bench --categories 50 --brands 200 --files 1000000
+"""
+
+import argparse
+import os
+import random
+
+
+ACCENTED = "éèêëàâäîïôöùûüçñ"
+LETTERS = "abcdefghijklmnopqrstuvwxyz"
+EXTENSIONS = ['.jpg', '.jpeg', '.png', '.JPG', '.webp']
+
+
+def make_brand_name(rng, accent_rate):
+    """随机品牌名，部分带重音字母"""
+    length = rng.randint(4, 12)
+    chars = [rng.choice(LETTERS) for _ in range(length)]
+    if rng.random() < accent_rate:
+        chars[rng.randrange(length)] = rng.choice(ACCENTED)
+    return ''.join(chars).capitalize()
+
+
+def generate_brand_tree(root, categories=20, brands_per_category=100, accent_rate=0.1, seed=1):
+    """
+    生成三级品牌目录，返回品牌名列表
+    root/<品类>/<品牌>/
+    """
+    rng = random.Random(seed)
+    brands = []
+    used = set()
+    for c in range(categories):
+        category_dir = os.path.join(root, f"品类{c:04d}")
+        os.makedirs(category_dir, exist_ok=True)
+        for _ in range(brands_per_category):
+            brand = make_brand_name(rng, accent_rate)
+            if brand in used:
+                continue
+            used.add(brand)
+            brands.append(brand)
+            os.makedirs(os.path.join(category_dir, brand), exist_ok=True)
+    return brands
+
+
+def generate_image_tree(root, brands, files=10000, files_per_dir=500, fanout=10, miss_rate=0.05,
+                        file_size=0, seed=1):
+    """
+    生成图片目录，返回 (文件数, 未找到品牌的文件数)
+
+    files_per_dir: 每个叶子目录中的文件数
+    fanout: 每个中间目录的子目录数（目录深度随文件数自动增加）
+    miss_rate: 使用不存在品牌名（或无法提取品牌名）的文件比例
+    file_size: 每个文件的字节数（0 表示空文件）
+    """
+    rng = random.Random(seed + 1)
+    payload = os.urandom(file_size) if file_size else b''
+    weights = [1.0 / (rank + 1) for rank in range(len(brands))]
+
+    leaf_count = max(1, (files + files_per_dir - 1) // files_per_dir)
+    depth = 1
+    while fanout ** depth < leaf_count:
+        depth += 1
+
+    created = 0
+    missed = 0
+    for leaf in range(leaf_count):
+        parts = []
+        n = leaf
+        for _ in range(depth):
+            parts.append(f"d{n % fanout:03d}")
+            n //= fanout
+        leaf_dir = os.path.join(root, *reversed(parts))
+        os.makedirs(leaf_dir, exist_ok=True)
+
+        count = min(files_per_dir, files - created)
+        picked = rng.choices(brands, weights=weights, k=count)
+        for i, brand in enumerate(picked):
+            if rng.random() < miss_rate:
+                missed += 1
+                if rng.random() < 0.2:
+                    name = f"IMG{leaf:06d}{i:04d}"
+                else:
+                    name = f"品牌_{brand}x_2025年03月16日_{leaf}_{i}"
+            else:
+                style = rng.random()
+                if style < 0.1:
+                    brand = brand.upper()
+                elif style < 0.2:
+                    brand = brand.lower()
+                name = f"品牌_{brand}_2025年03月16日_{leaf}_{i}"
+            path = os.path.join(leaf_dir, name + rng.choice(EXTENSIONS))
+            with open(path, 'wb') as f:
+                if payload:
+                    f.write(payload)
+        created += count
+    return created, missed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="生成基准测试用的品牌目录和图片目录")
+    parser.add_argument("root", help="输出目录（其中生成 brands/ 和 images/）")
+    parser.add_argument("--categories", type=int, default=20, help="品类数（第二级目录）")
+    parser.add_argument("--brands", type=int, default=100, help="每个品类的品牌数（第三级目录）")
+    parser.add_argument("--accent-rate", type=float, default=0.1, help="带重音字母的品牌比例")
+    parser.add_argument("--files", type=int, default=10000, help="图片文件数")
+    parser.add_argument("--files-per-dir", type=int, default=500, help="每个目录的文件数")
+    parser.add_argument("--fanout", type=int, default=10, help="每个目录的子目录数")
+    parser.add_argument("--miss-rate", type=float, default=0.05, help="未找到品牌的文件比例")
+    parser.add_argument("--file-size", type=int, default=0, help="每个文件的字节数（默认空文件）")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    brands = generate_brand_tree(os.path.join(args.root, "brands"), args.categories, args.brands,
+                                 args.accent_rate, args.seed)
+    files, missed = generate_image_tree(os.path.join(args.root, "images"), brands, args.files,
+                                        args.files_per_dir, args.fanout, args.miss_rate,
+                                        args.file_size, args.seed)
+    print(f"品牌数: {len(brands)}，图片数: {files}，未找到品牌: {missed}")
+
+
+if __name__ == "__main__":
+    main()
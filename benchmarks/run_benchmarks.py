@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+品牌检查各阶段的基准测试
+分别计时：品牌扫描（无缓存 / 建索引 / 使用索引）、目录遍历、品牌匹配、复制、完整检查，
+结果保存为 JSON，可以与之前版本的结果比较
+
+用法：
+    python benchmarks/generate_tree.py /tmp/bench --files 1000000
+    python benchmarks/run_benchmarks.py /tmp/bench --json result.json
+    python benchmarks/run_benchmarks.py /tmp/bench --compare old.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from brand_copy import DEFAULT_COPY_WORKERS, CopyEngine  # noqa: E402
+from brand_engine import IMAGE_EXTENSIONS, BrandCheckEngine  # noqa: E402
+from brand_walk import DEFAULT_WALK_WORKERS, iter_dirs  # noqa: E402
+
+
+class Phase:
+    """一个阶段的计时结果"""
+
+    def __init__(self, name, seconds, items, bytes_count=None):
+        self.name = name
+        self.seconds = seconds
+        self.items = items
+        self.bytes_count = bytes_count
+
+    def to_dict(self):
+        data = {
+            "seconds": round(self.seconds, 6),
+            "items": self.items,
+            "items_per_second": round(self.items / self.seconds, 1) if self.seconds > 0 else None,
+        }
+        if self.bytes_count is not None:
+            data["bytes"] = self.bytes_count
+        return data
+
+
+def timed(func):
+    start = time.perf_counter()
+    value = func()
+    return time.perf_counter() - start, value
+
+
+def git_revision():
+    """当前代码的 git 版本（不在 git 仓库中时返回 None）"""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.DEVNULL,
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(data_dir, walk_workers, copy_workers, skip_copy=False):
+    brand_dir = os.path.join(data_dir, "brands")
+    image_dir = os.path.join(data_dir, "images")
+    work_dir = tempfile.mkdtemp(prefix="brand-bench-")
+    phases = []
+    try:
+        # 品牌扫描：完整扫描
+        engine = BrandCheckEngine(brand_dir, image_dir, use_brand_index=False)
+        seconds, _ = timed(engine.scan_brands)
+        phases.append(Phase("brand_scan_full", seconds, len(engine.brands)))
+
+        # 品牌扫描：第一次建立索引，然后使用索引（热启动）
+        index_path = os.path.join(work_dir, "brand-index.json")
+        engine = BrandCheckEngine(brand_dir, image_dir, brand_index_path=index_path)
+        seconds, _ = timed(engine.scan_brands)
+        phases.append(Phase("brand_scan_index_build", seconds, len(engine.brands)))
+        engine = BrandCheckEngine(brand_dir, image_dir, brand_index_path=index_path)
+        seconds, _ = timed(engine.scan_brands)
+        phases.append(Phase("brand_scan_index_warm", seconds, len(engine.brands)))
+
+        # 目录遍历：只列出目录，收集文件名
+        names = []
+        paths = []
+        dirs = 0
+
+        def walk():
+            nonlocal dirs
+            for _, entries in iter_dirs(image_dir, IMAGE_EXTENSIONS, walk_workers):
+                dirs += 1
+                for entry in entries:
+                    names.append(entry.name)
+                    paths.append(entry.path)
+
+        seconds, _ = timed(walk)
+        phases.append(Phase("traversal", seconds, len(names)))
+
+        # 品牌匹配：提取品牌名并查找
+        misses = []
+
+        def match():
+            extract = engine.extract_brand_from_filename
+            match_token = engine.match_token
+            for name, path in zip(names, paths):
+                brand_name = extract(name)
+                if not brand_name or match_token(brand_name)[1] is None:
+                    misses.append(path)
+
+        seconds, _ = timed(match)
+        phases.append(Phase("matching", seconds, len(names)))
+
+        # 复制：把未找到品牌的文件复制到临时目录
+        if not skip_copy:
+            copy_dir = os.path.join(work_dir, "copy")
+            os.makedirs(copy_dir)
+
+            def copy():
+                with CopyEngine(copy_dir, copy_workers) as copier:
+                    for path in misses:
+                        copier.submit(path)
+                return copier.stats
+
+            seconds, stats = timed(copy)
+            phases.append(Phase("copy", seconds, len(misses), stats.bytes_copied))
+
+        # 完整检查（流水线）
+        engine = BrandCheckEngine(brand_dir, image_dir, output_dir=os.path.join(work_dir, "run"),
+                                  brand_index_path=index_path, walk_workers=walk_workers,
+                                  copy_workers=copy_workers)
+        seconds, result = timed(lambda: engine.run(copy_files=not skip_copy))
+        phases.append(Phase("full_run", seconds, result.processed_files))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "data_dir": os.path.abspath(data_dir),
+            "walk_workers": walk_workers,
+            "copy_workers": copy_workers,
+            "directories": dirs,
+            "files": len(names),
+            "not_found": len(misses),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "phases": {phase.name: phase.to_dict() for phase in phases},
+    }
+
+
+def print_report(report, baseline=None):
+    meta = report["meta"]
+    print(f"版本: {meta['revision']}  Python {meta['python']}  目录数: {meta['directories']}  "
+          f"文件数: {meta['files']}  未找到品牌: {meta['not_found']}")
+    for name, phase in report["phases"].items():
+        line = f"  {name:<24} {phase['seconds']:>10.3f} 秒  {phase['items_per_second'] or 0:>14,.0f} 项/秒"
+        if baseline is not None and name in baseline.get("phases", {}):
+            old = baseline["phases"][name]["seconds"]
+            if phase["seconds"] > 0:
+                line += f"  （对比基准: {old / phase['seconds']:.2f} 倍）"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="品牌检查各阶段的基准测试")
+    parser.add_argument("data_dir", help="generate_tree.py 生成的目录（包含 brands/ 和 images/）")
+    parser.add_argument("--walk-workers", type=int, default=DEFAULT_WALK_WORKERS)
+    parser.add_argument("--copy-workers", type=int, default=DEFAULT_COPY_WORKERS)
+    parser.add_argument("--skip-copy", action="store_true", help="不测试复制阶段")
+    parser.add_argument("--json", default=None, help="把结果写入 JSON 文件")
+    parser.add_argument("--compare", default=None, help="与之前保存的 JSON 结果比较")
+    args = parser.parse_args(argv)
+
+    report = run(args.data_dir, args.walk_workers, args.copy_workers, args.skip_copy)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
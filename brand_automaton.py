@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+在整个文件名中查找品牌（Aho-Corasick 多模式匹配）
+把所有标准化品牌名（以及登记的别名）建成一个自动机，标准化后的文件名只需从头到尾扫描一遍，
+就能找出其中出现的所有品牌；每个文件的耗时只与文件名长度有关，与品牌数量无关
+
+别名文件每行一个别名：
+    别名 = 品牌名
+以 # 开头的行是注释。品牌名需要是品牌目录中已有的品牌（不区分大小写和重音）
+"""
+
+
+def load_aliases(path):
+    """读取别名文件，返回 {别名: 品牌名}；格式错误时抛出 ValueError"""
+    aliases = {}
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            alias, sep, brand = line.partition('=')
+            alias = alias.strip()
+            brand = brand.strip()
+            if not sep or not alias or not brand:
+                raise ValueError(f"别名文件第 {line_number} 行格式应为 别名 = 品牌名: {line}")
+            aliases[alias] = brand
+    return aliases
+
+
+def _is_word_char(char):
+    """英文字母和数字组成的单词不能从中间截断（标准化后带重音的字母已变为 ASCII）"""
+    return char.isascii() and char.isalnum()
+
+
+class BrandAutomaton:
+    """
+    Aho-Corasick 自动机
+
+    patterns: {标准化的品牌名或别名: 原始品牌名}
+    whole_word: 品牌名两端是英文字母或数字时，要求文件名中相邻的字符不是英文字母或数字，
+                避免短品牌名匹配到其他单词的一部分（例如 Nike 不匹配 Snikers）
+    """
+
+    def __init__(self, patterns, whole_word=True):
+        self.whole_word = whole_word
+        self.goto = [{}]  # 节点 -> {字符: 子节点}
+        self.fail = [0]
+        self.outputs = [()]  # 节点 -> ((长度, 品牌名), ...)，包含失败链上所有以该节点结尾的模式
+        for pattern, brand in patterns.items():
+            if pattern:
+                self._add(pattern, brand)
+        self._build()
+
+    def __len__(self):
+        return len(self.goto)
+
+    def _add(self, pattern, brand):
+        node = 0
+        for char in pattern:
+            child = self.goto[node].get(char)
+            if child is None:
+                child = len(self.goto)
+                self.goto[node][char] = child
+                self.goto.append({})
+                self.fail.append(0)
+                self.outputs.append(())
+            node = child
+        self.outputs[node] = ((len(pattern), brand),)
+
+    def _build(self):
+        """按广度优先顺序计算失败链接，并把失败链上的输出合并到每个节点"""
+        goto, fail, outputs = self.goto, self.fail, self.outputs
+        queue = list(goto[0].values())
+        for node in queue:
+            for char, child in goto[node].items():
+                queue.append(child)
+                state = fail[node]
+                while state and char not in goto[state]:
+                    state = fail[state]
+                target = goto[state].get(char, 0)
+                fail[child] = target if target != child else 0
+                if outputs[fail[child]]:
+                    outputs[child] = outputs[child] + outputs[fail[child]]
+
+    def find_all(self, text):
+        """返回 text 中所有品牌出现的位置 [(起始, 结束, 品牌名)]（可能重叠）"""
+        goto, fail, outputs = self.goto, self.fail, self.outputs
+        whole_word = self.whole_word
+        text_length = len(text)
+        matches = []
+        node = 0
+        for i, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if not outputs[node]:
+                continue
+            end = i + 1
+            for length, brand in outputs[node]:
+                start = end - length
+                if whole_word and (
+                        (start > 0 and _is_word_char(text[start]) and _is_word_char(text[start - 1])) or
+                        (end < text_length and _is_word_char(text[i]) and _is_word_char(text[end]))):
+                    continue
+                matches.append((start, end, brand))
+        return matches
+
+    def detect(self, text):
+        """
+        返回 text 中出现的品牌名列表（按出现顺序，不重复）
+        重叠的匹配只保留从最左边开始、最长的一个，例如品牌 Nike Air 中不再报告 Nike
+        """
+        matches = self.find_all(text)
+        if not matches:
+            return []
+        matches.sort(key=lambda m: (m[0], m[0] - m[1]))
+        brands = []
+        last_end = 0
+        for start, end, brand in matches:
+            if start < last_end:
+                continue
+            last_end = end
+            if brand not in brands:
+                brands.append(brand)
+        return brands
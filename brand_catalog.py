@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+品牌目录服务
+多个检查进程同时检查同一个品牌根目录时，每个进程都要扫描品牌目录、标准化所有品牌名。
+目录服务是一个常驻进程，把标准化后的品牌表（和别名表）保存在内存中，定期检查品牌目录的变化
+（只重新扫描修改时间变化的品类目录），通过本机 Unix socket 回答查询：
+
+  {"op": "catalog"}                 返回完整的品牌表（检查进程启动时取一次，代替扫描品牌目录）
+  {"op": "lookup", "names": [...]}  批量查询提取出的品牌名，返回 [[标准化品牌名, 匹配的品牌名或 null], ...]
+                                    （供不需要整张品牌表的其他程序使用）
+
+每条消息是 4 字节长度（大端）加 UTF-8 JSON。品牌表每次变化时 generation 加一。
+检查进程启动时取一次整张品牌表，之后全部在本进程中匹配，检查文件时不再与服务通信；
+一次检查固定使用取得的那一版，监控模式下次重新读取品牌时再取新的一版。
+
+启动服务：
+    python brand_catalog.py --brand-root /data/brands [--socket /tmp/brands.sock] [--brand-aliases aliases.txt]
+"""
+
+import argparse
+import json
+import os
+import socket
+import socketserver
+import struct
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from functools import lru_cache
+
+from brand_automaton import load_aliases
+from brand_index import BrandIndex
+
+
+# 默认检查品牌目录变化的间隔（秒）
+DEFAULT_REFRESH_INTERVAL = 10.0
+# 客户端等待回答的最长时间（秒）
+DEFAULT_TIMEOUT = 10.0
+# 单条消息的最大字节数
+MAX_MESSAGE_SIZE = 256 * 1024 * 1024
+# 服务端标准化缓存的条目数
+NORMALIZE_CACHE_SIZE = 1 << 18
+
+_LENGTH = struct.Struct('>I')
+
+
+class CatalogError(Exception):
+    """无法连接目录服务或目录服务返回错误"""
+
+
+def default_socket_path(brand_dir):
+    """默认 socket 路径：临时目录中按品牌根目录区分的文件"""
+    key = zlib.crc32(os.path.abspath(brand_dir).encode('utf-8'))
+    return os.path.join(tempfile.gettempdir(), f"brand-catalog-{key:08x}.sock")
+
+
+def send_message(sock, message):
+    data = json.dumps(message, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    sock.sendall(_LENGTH.pack(len(data)) + data)
+
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("连接已关闭")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def recv_message(sock):
+    """读取一条消息；对方在消息之间关闭连接时返回 None"""
+    header = sock.recv(_LENGTH.size, socket.MSG_WAITALL)
+    if not header:
+        return None
+    if len(header) < _LENGTH.size:
+        raise ConnectionError("连接已关闭")
+    (size,) = _LENGTH.unpack(header)
+    if size > MAX_MESSAGE_SIZE:
+        raise ValueError(f"消息过大: {size} 字节")
+    return json.loads(_recv_exact(sock, size))
+
+
+class CatalogState:
+    """某一时刻的品牌表（创建后不再修改，刷新时整体替换）"""
+
+    def __init__(self, generation, brand_dir, normalized_brands, aliases):
+        self.generation = generation
+        self.normalized_brands = normalized_brands
+        self.catalog = {
+            "generation": generation,
+            "brand_dir": brand_dir,
+            "normalized_brands": normalized_brands,
+            "aliases": aliases,
+        }
+
+
+class CatalogServer:
+    """
+    品牌目录服务
+    每个连接一个线程；品牌表由后台线程每隔 refresh_interval 秒刷新一次，有变化时整体替换
+    """
+
+    def __init__(self, brand_dir, socket_path=None, alias_path=None, brand_index_path=None,
+                 refresh_interval=DEFAULT_REFRESH_INTERVAL, log=None):
+        self.brand_dir = os.path.abspath(brand_dir)
+        self.socket_path = socket_path or default_socket_path(brand_dir)
+        self.alias_path = alias_path
+        self.refresh_interval = refresh_interval
+        self._log = log
+        # brand_engine 导入本模块（客户端），服务端用到时再导入，避免循环导入
+        from brand_engine import normalize_text
+        self.normalize = lru_cache(maxsize=NORMALIZE_CACHE_SIZE)(normalize_text)
+        self.index = BrandIndex(self.brand_dir, self.normalize, brand_index_path)
+        self.index.load()
+        self.state = None
+        self._alias_mtime = None
+        self._aliases = {}
+        self._stop = threading.Event()
+        self._server = None
+        self.requests = 0
+        self.lookups = 0
+
+    def log(self, message):
+        if self._log is not None:
+            self._log(message)
+
+    def refresh(self):
+        """与磁盘上的品牌目录和别名文件同步，有变化时替换品牌表；品牌根目录不存在时抛出 CatalogError"""
+        try:
+            if not self.index.refresh():
+                raise CatalogError(f"品牌根目录不存在: {self.brand_dir}")
+        except OSError as e:
+            raise CatalogError(f"扫描品牌目录失败: {e}")
+        aliases_changed = self.reload_aliases()
+        if self.state is not None and not self.index.changed and not aliases_changed:
+            return False
+        if self.index.changed:
+            try:
+                self.index.save()
+            except OSError:
+                pass
+        generation = self.state.generation + 1 if self.state is not None else 1
+        self.state = CatalogState(generation, self.brand_dir, self.index.normalized_brands, self._aliases)
+        self.log(f"品牌表已更新（第 {generation} 版）：{len(self.index.brands)} 个品牌，"
+                 f"重新扫描 {self.index.rescanned} 个品类")
+        return True
+
+    def reload_aliases(self):
+        """别名文件修改时间变化时重新读取，返回是否有变化"""
+        if not self.alias_path:
+            return False
+        try:
+            mtime = os.stat(self.alias_path).st_mtime_ns
+            if mtime == self._alias_mtime:
+                return False
+            aliases = load_aliases(self.alias_path)
+        except (OSError, ValueError) as e:
+            self.log(f"读取品牌别名文件失败（继续使用原来的别名）: {e}")
+            return False
+        self._alias_mtime = mtime
+        self._aliases = aliases
+        return True
+
+    def handle(self, request):
+        """回答一条请求；请求格式错误时返回错误信息，不断开连接"""
+        state = self.state
+        self.requests += 1
+        if not isinstance(request, dict):
+            return {"error": "请求应为 JSON 对象"}
+        op = request.get("op")
+        if op == "catalog":
+            return state.catalog
+        if op == "lookup":
+            names = request.get("names") or []
+            if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+                return {"error": "names 应为字符串数组"}
+            self.lookups += len(names)
+            normalize = self.normalize
+            normalized_brands = state.normalized_brands
+            matches = []
+            for name in names:
+                normalized = normalize(name)
+                candidates = normalized_brands.get(normalized)
+                matches.append([normalized, candidates[0] if candidates else None])
+            return {"generation": state.generation, "matches": matches}
+        if op == "ping":
+            return {"generation": state.generation, "brands": len(self.index.brands),
+                    "requests": self.requests, "lookups": self.lookups}
+        return {"error": f"未知的请求: {op}"}
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except CatalogError as e:
+                self.log(f"刷新品牌表失败（继续使用原来的品牌表）: {e}")
+
+    def serve_forever(self):
+        """启动服务，直到 stop() 被调用（或按 Ctrl+C）"""
+        if not hasattr(socket, 'AF_UNIX'):
+            raise CatalogError("当前系统不支持 Unix socket")
+        self.refresh()
+        self._remove_stale_socket()
+        server = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                while True:
+                    try:
+                        request = recv_message(self.request)
+                        if request is None:
+                            return
+                        send_message(self.request, server.handle(request))
+                    except (OSError, ValueError):
+                        return
+
+        class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+            daemon_threads = True
+
+        self._server = Server(self.socket_path, Handler)
+        refresher = threading.Thread(target=self._refresh_loop, daemon=True)
+        refresher.start()
+        self.log(f"品牌目录服务已启动: {self.socket_path}（每 {self.refresh_interval} 秒检查品牌目录变化）")
+        try:
+            self._server.serve_forever()
+        finally:
+            self._stop.set()
+            self._server.server_close()
+            try:
+                os.remove(self.socket_path)
+            except OSError:
+                pass
+
+    def stop(self):
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+
+    def _remove_stale_socket(self):
+        """删除上次异常退出时留下的 socket 文件；已有服务在运行时抛出 CatalogError"""
+        if not os.path.exists(self.socket_path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.socket_path)
+        except OSError:
+            os.remove(self.socket_path)
+            return
+        finally:
+            probe.close()
+        raise CatalogError(f"已有品牌目录服务在运行: {self.socket_path}")
+
+
+class CatalogClient:
+    """目录服务的客户端（一个连接，按请求顺序收发）"""
+
+    def __init__(self, socket_path, timeout=DEFAULT_TIMEOUT):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._sock = None
+        self._lock = threading.Lock()
+        self.requests = 0
+
+    def request(self, message):
+        with self._lock:
+            try:
+                if self._sock is None:
+                    if not hasattr(socket, 'AF_UNIX'):
+                        raise CatalogError("当前系统不支持 Unix socket")
+                    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                    sock.settimeout(self.timeout)
+                    sock.connect(self.socket_path)
+                    self._sock = sock
+                send_message(self._sock, message)
+                response = recv_message(self._sock)
+            except (OSError, ValueError) as e:
+                self.close()
+                raise CatalogError(f"无法连接品牌目录服务 {self.socket_path}: {e}")
+            if response is None:
+                self.close()
+                raise CatalogError("品牌目录服务关闭了连接")
+        self.requests += 1
+        if "error" in response:
+            raise CatalogError(response["error"])
+        return response
+
+    def catalog(self):
+        """完整的品牌表：{"generation", "brand_dir", "normalized_brands", "aliases"}"""
+        return self.request({"op": "catalog"})
+
+    def lookup(self, names):
+        """批量查询，返回 (generation, [(标准化品牌名, 匹配的品牌名或 None), ...])"""
+        response = self.request({"op": "lookup", "names": list(names)})
+        return response["generation"], [tuple(match) for match in response["matches"]]
+
+    def close(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="品牌目录服务：在内存中保存品牌表，供多个检查进程查询")
+    parser.add_argument("--brand-root", required=True, help="品牌根目录")
+    parser.add_argument("--socket", default=None, help="Unix socket 路径（默认在临时目录中，按品牌根目录区分）")
+    parser.add_argument("--brand-aliases", default=None, help="品牌别名文件（修改后自动重新读取）")
+    parser.add_argument("--brand-index", default=None, help="品牌索引缓存文件")
+    parser.add_argument("--refresh-interval", type=float, default=DEFAULT_REFRESH_INTERVAL,
+                        help=f"检查品牌目录变化的间隔（秒，默认：{DEFAULT_REFRESH_INTERVAL}）")
+    args = parser.parse_args(argv)
+
+    def log(message):
+        print(f"[{time.strftime('%H:%M:%S')}] {message}", flush=True)
+
+    server = CatalogServer(args.brand_root, args.socket, args.brand_aliases, args.brand_index,
+                           args.refresh_interval, log)
+    try:
+        server.serve_forever()
+    except CatalogError as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
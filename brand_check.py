@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片品牌检查命令行工具（brand-check）
+不需要图形界面，适合在服务器或脚本中批量运行
+
+退出码：
+  0  所有图片都找到对应品牌
+  1  存在未找到品牌的图片
+  2  无法进行检查（参数或目录错误）
+"""
+
+import argparse
+import os
+import sys
+
+from brand_catalog import default_socket_path
+from brand_copy import DEFAULT_COPY_WORKERS, OUTPUT_MODE_NAMES, OUTPUT_MODES
+from brand_engine import MATCH_MODES, BrandCheckEngine, BrandCheckError, default_output_dir
+from brand_report import REPORT_FORMATS
+from brand_shard import SHARD_MODES, ShardSpec, merge_shards, parse_shard, run_local_shards, run_shard
+from brand_suggest import DEFAULT_TOP_K, format_suggestions
+from brand_watch import DEFAULT_POLL_INTERVAL, watch
+from brand_validate import DEFAULT_VALIDATE_WORKERS
+from brand_walk import DEFAULT_WALK_WORKERS
+
+
+EXIT_PASSED = 0
+EXIT_NOT_FOUND = 1
+EXIT_ERROR = 2
+
+
+def build_parser():
+    """命令行参数定义"""
+    parser = argparse.ArgumentParser(
+        prog="brand-check",
+        description="根据图片文件名中的品牌名检查品牌是否存在，并复制未找到品牌的图片",
+    )
+    parser.add_argument("--brand-root", help="品牌根目录（第三级目录为品牌名）")
+    parser.add_argument("--image-root", help="图片根目录")
+    parser.add_argument("-o", "--output", default=None,
+                        help="未找到品牌图片的输出目录（默认：<图片根目录>_未找到品牌图片）")
+    parser.add_argument("--no-copy", action="store_true", help="只检查，不复制未找到品牌的图片")
+    parser.add_argument("--brand-index", default=None,
+                        help="品牌索引缓存文件（默认：品牌根目录旁边的 .<目录名>.brand-index.json）")
+    parser.add_argument("--no-brand-index", action="store_true", help="不使用品牌索引缓存，每次完整扫描")
+    parser.add_argument("--catalog", nargs="?", const="", default=None, metavar="SOCKET",
+                        help="从品牌目录服务（brand_catalog.py）取得品牌表，代替扫描品牌目录，"
+                             "不指定 SOCKET 时使用该品牌根目录的默认 socket；服务不可用时改为本地扫描")
+    parser.add_argument("--incremental", action="store_true",
+                        help="增量检查：只检查新增或修改过的图片（结论保存在清单中）")
+    parser.add_argument("--report", default=None, metavar="文件",
+                        help="逐个文件写出检查结论（路径、提取的品牌名、匹配的品牌、结论、复制为、无效原因）")
+    parser.add_argument("--report-format", choices=REPORT_FORMATS, default=None,
+                        help="报告格式：csv、jsonl 或 sqlite（带索引，可直接查询）；默认根据扩展名判断，无法判断时为 csv")
+    parser.add_argument("--resume", action="store_true",
+                        help="在输出目录中记录检查进度（_检查进度.jsonl），上次检查中途退出时从中断处继续，不重复复制")
+    parser.add_argument("--manifest", default=None,
+                        help="增量检查清单文件（默认：图片根目录旁边的 .<目录名>.brand-manifest.sqlite）")
+    parser.add_argument("--match-mode", choices=MATCH_MODES, default="token",
+                        help="品牌识别方式：token 取文件名第一个下划线后的部分，scan 在整个文件名中查找品牌（默认：token）")
+    parser.add_argument("--brand-aliases", default=None,
+                        help="品牌别名文件，每行 别名 = 品牌名（scan 方式下别名也识别为对应品牌）")
+    parser.add_argument("--filename-rules", default=None,
+                        help="文件名规则文件（JSON），按优先级描述从不同命名方式的文件名中提取品牌名的方法")
+    parser.add_argument("--suggest", action="store_true", help="为未找到的品牌名给出相近的已有品牌")
+    parser.add_argument("--suggest-top", type=int, default=DEFAULT_TOP_K,
+                        help=f"每个品牌名最多给出的相近品牌数（默认：{DEFAULT_TOP_K}）")
+    parser.add_argument("--validate", action="store_true",
+                        help="根据文件头校验图片（JPEG/PNG/GIF/BMP/WebP/TIFF），无效文件列入输出目录的 _无效图片.csv")
+    parser.add_argument("--validate-eof", action="store_true",
+                        help="校验时同时检查 JPEG/PNG 的结束标记，发现没有传完的文件（包含 --validate）")
+    parser.add_argument("--validate-workers", type=int, default=DEFAULT_VALIDATE_WORKERS,
+                        help=f"同时校验的文件数（默认：{DEFAULT_VALIDATE_WORKERS}）")
+    parser.add_argument("--dedup", action="store_true",
+                        help="内容相同的未找到品牌图片只复制一次，源文件与复制结果的对照写入输出目录的 _来源对照.csv")
+    parser.add_argument("--output-mode", choices=OUTPUT_MODES, default="copy",
+                        help="未找到品牌图片的输出方式：copy 复制（默认）、hardlink 硬链接、symlink 符号链接、"
+                             "move 移动、list 只写对照表 _来源对照.csv；无法链接时改为复制")
+    parser.add_argument("--prune-empty-dirs", action="store_true",
+                        help="检查完成后删除图片根目录下的空目录（只含 .DS_Store 等系统文件的目录也视为空目录）")
+    parser.add_argument("--watch", action="store_true",
+                        help="监控模式：持续检查新写入图片根目录的图片，按 Ctrl+C 停止")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL,
+                        help=f"监控模式的轮询间隔（秒，默认：{DEFAULT_POLL_INTERVAL}）")
+    parser.add_argument("--force-polling", action="store_true",
+                        help="监控模式下不使用 inotify，改用轮询（如网络共享目录）")
+    parser.add_argument("--shard", default=None, metavar="序号/分片数",
+                        help="分片检查：只检查第几个分片（序号从 0 开始，如 0/4），结果写入输出目录，全部完成后用 --merge 合并")
+    parser.add_argument("--shard-by", choices=SHARD_MODES, default="top",
+                        help="分片方式：top 按第一级子目录，hash 按目录路径哈希（默认：top）")
+    parser.add_argument("--merge", action="store_true",
+                        help="合并输出目录中所有分片的结果（只需要 --image-root 或 -o 确定输出目录）")
+    parser.add_argument("--local-shards", type=int, default=None, metavar="N",
+                        help="在本机启动 N 个进程分片检查，全部完成后自动合并（用于测试分片检查）")
+    parser.add_argument("--walk-workers", type=int, default=DEFAULT_WALK_WORKERS,
+                        help=f"遍历图片目录的并行线程数（默认：{DEFAULT_WALK_WORKERS}）")
+    parser.add_argument("--copy-workers", type=int, default=DEFAULT_COPY_WORKERS,
+                        help=f"并发复制文件的线程数（默认：{DEFAULT_COPY_WORKERS}）")
+    parser.add_argument("--metrics-json", default=None, help="把各阶段耗时和计数写入 JSON 文件")
+    parser.add_argument("--metrics-prom", default=None,
+                        help="把各阶段耗时和计数写入 Prometheus textfile（如 node_exporter 的 textfile 目录）")
+    parser.add_argument("-v", "--verbose", action="store_true", help="输出逐个文件的检查日志")
+    parser.add_argument("-q", "--quiet", action="store_true", help="只输出最终统计")
+    return parser
+
+
+def validate_args(parser, args):
+    """检查参数组合"""
+    if not args.image_root and not (args.merge and args.output):
+        parser.error("需要 --image-root")
+    if not args.brand_root and not args.merge:
+        parser.error("需要 --brand-root")
+    if args.shard is not None:
+        try:
+            args.shard = parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+    sharded = args.shard is not None or args.local_shards
+    if sharded and (args.watch or args.incremental):
+        parser.error("分片检查不能与 --watch 或 --incremental 同时使用")
+    if args.report and (sharded or args.merge):
+        parser.error("--report 不能与分片检查或 --merge 同时使用")
+    if args.resume and (sharded or args.merge or args.watch or args.incremental):
+        parser.error("--resume 不能与分片检查、--merge、--watch 或 --incremental 同时使用")
+    if args.local_shards is not None and (args.local_shards < 1 or args.shard is not None or args.merge):
+        parser.error("--local-shards 需要大于 0，且不能与 --shard、--merge 同时使用")
+
+
+def local_shard_command(argv):
+    """--local-shards 启动的子进程命令行：去掉 --local-shards 参数"""
+    command = []
+    skip = False
+    for arg in argv:
+        if skip:
+            skip = False
+        elif arg == "--local-shards":
+            skip = True
+        elif not arg.startswith("--local-shards="):
+            command.append(arg)
+    return [sys.executable, os.path.abspath(__file__)] + command
+
+
+def catalog_socket(args):
+    """--catalog 指定的 socket 路径，只写 --catalog 时为默认路径，未指定时为 None"""
+    if args.catalog is None:
+        return None
+    return args.catalog or default_socket_path(args.brand_root)
+
+
+def run_check(args):
+    """按命令行参数执行一次检查，返回 CheckResult"""
+    log = None if args.quiet else print
+    if args.merge:
+        output_dir = args.output or default_output_dir(args.image_root)
+        detail = log if args.verbose else None
+        try:
+            return merge_shards(output_dir, log=log, log_detail=detail)
+        except (OSError, ValueError) as e:
+            raise BrandCheckError(f"合并分片结果失败: {e}")
+    engine = BrandCheckEngine(args.brand_root, args.image_root, output_dir=args.output,
+                              log=log, verbose=args.verbose, walk_workers=args.walk_workers,
+                              copy_workers=args.copy_workers,
+                              use_brand_index=not args.no_brand_index,
+                              brand_index_path=args.brand_index,
+                              incremental=args.incremental, manifest_path=args.manifest,
+                              suggest=args.suggest, suggest_top_k=args.suggest_top,
+                              prune_empty_dirs=args.prune_empty_dirs, dedup=args.dedup,
+                              match_mode=args.match_mode, alias_path=args.brand_aliases,
+                              rules_path=args.filename_rules, validate=args.validate,
+                              validate_eof=args.validate_eof, validate_workers=args.validate_workers,
+                              output_mode=args.output_mode, resume=args.resume,
+                              report_path=args.report, report_format=args.report_format,
+                              catalog_socket=catalog_socket(args))
+    if args.watch:
+        engine.prepare()
+        return watch(engine, poll_interval=args.poll_interval, force_polling=args.force_polling)
+    if args.shard is not None:
+        spec = ShardSpec(args.image_root, args.shard[0], args.shard[1], args.shard_by)
+        return run_shard(engine, spec, copy_files=not args.no_copy)
+    return engine.run(copy_files=not args.no_copy)
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    validate_args(parser, args)
+
+    if args.local_shards:
+        command = local_shard_command(sys.argv[1:] if argv is None else argv)
+        codes = run_local_shards(command, args.local_shards, args.shard_by)
+        if EXIT_ERROR in codes or any(code < 0 for code in codes):
+            print(f"错误: 有分片检查失败（退出码: {codes}）", file=sys.stderr)
+            return EXIT_ERROR
+        args.merge = True
+
+    try:
+        result = run_check(args)
+    except BrandCheckError as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return EXIT_ERROR
+
+    print(f"处理文件数: {result.processed_files}")
+    print(f"找到品牌文件数: {result.found_brand_files}")
+    print(f"未找到品牌文件数: {result.not_found_count}")
+    if result.invalid_files:
+        print(f"无效图片数: {result.invalid_files}")
+    if result.output_dir is not None:
+        verb = OUTPUT_MODE_NAMES[args.output_mode]
+        print(f"已{verb}文件数: {result.copied_count}")
+        print(f"已{verb}到: {result.output_dir}")
+        if args.dedup and result.copy_stats is not None:
+            print(f"内容重复未复制文件数: {result.copy_stats.duplicate_count}")
+    if result.pruned_dirs:
+        print(f"删除空目录数: {result.pruned_dirs}")
+
+    if args.metrics_json:
+        result.metrics.write_json(args.metrics_json)
+    if args.metrics_prom:
+        # 只合并分片结果时没有图片根目录，不加 image_root 标签
+        labels = {"image_root": args.image_root} if args.image_root else None
+        result.metrics.write_prometheus(args.metrics_prom, labels=labels)
+
+    if result.suggestions:
+        print("相近品牌建议:")
+        for brand_name in sorted(result.suggestions):
+            suggestions = result.suggestions[brand_name]
+            print(f"  {brand_name} -> {format_suggestions(suggestions) if suggestions else '无'}")
+
+    return EXIT_PASSED if result.passed else EXIT_NOT_FOUND
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,27 +9,50 @@
 import os
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-import unicodedata
-import re
 from pathlib import Path
 import threading
-import shutil
 import subprocess
 import platform
+import queue
+
+
+from brand_engine import BrandCheckEngine
+from brand_report import default_report_path
+from brand_viewer import ResultsTable
+from brand_walk import prune_empty_dirs
+
+
+# 日志队列刷新间隔（毫秒），每次把队列中积累的日志一次性写入文本框，同时刷新结果表格
+LOG_FLUSH_INTERVAL_MS = 100
+# 单次刷新最多处理的日志条数，保证界面在日志洪峰时仍能响应
+LOG_FLUSH_MAX_RECORDS = 5000
+# 文本框最多保留的行数，超过后删除最早的行
+LOG_MAX_TEXT_LINES = 10000
+# 确定进度条的刻度数
+PROGRESS_MAXIMUM = 1000
 
 
 class BrandCheckerApp:
     def __init__(self, root):
         self.root = root
         self.root.title("图片品牌检查工具")
-        self.root.geometry("700x500")
+        self.root.geometry("900x700")
         
         self.brand_dir = ""
         self.image_dir = ""
         self.brands = set()
         self.is_processing = False  # 标记是否正在处理，防止重复点击
+        self.stop_requested = False  # 点击了停止检查（检查引擎创建之前点击时，创建后再停止）
+        self.resume = False  # 本次检查是否从上次中断处继续（点击开始检查时从选项读取）
+        self.write_report = False  # 本次检查是否写出结果报告
+        
+        # 日志队列：工作线程只负责放入，由主线程定时批量写入文本框
+        # 逐个文件的结论不写日志，显示在结果表格中（直接读取检查引擎的结果集）
+        self.log_queue = queue.Queue()
+        self.engine = None
         
         self.setup_ui()
+        self.root.after(LOG_FLUSH_INTERVAL_MS, self.poll_log_queue)
         
     def setup_ui(self):
         """设置用户界面"""
@@ -57,9 +80,19 @@ class BrandCheckerApp:
         # 分隔线
         ttk.Separator(main_frame, orient=tk.HORIZONTAL).grid(row=2, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=10)
         
+        # 检查选项（默认都不开启）
+        option_frame = ttk.Frame(main_frame)
+        option_frame.grid(row=3, column=0, columnspan=3, sticky=tk.W)
+        # 记录检查进度：检查中途停止或关闭窗口后，下次检查同一目录时从中断处继续
+        self.resume_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(option_frame, text="从上次中断处继续", variable=self.resume_var).pack(side=tk.LEFT, padx=5)
+        # 逐个文件的结论写入图片根目录旁边的 <目录名>_检查结果.csv
+        self.report_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(option_frame, text="写出检查结果报告（CSV）", variable=self.report_var).pack(side=tk.LEFT, padx=5)
+        
         # 操作按钮
         button_frame = ttk.Frame(main_frame)
-        button_frame.grid(row=3, column=0, columnspan=3, pady=10, sticky=tk.W)
+        button_frame.grid(row=4, column=0, columnspan=3, pady=10, sticky=tk.W)
         
         # 创建按钮，设置最小宽度，确保整个按钮区域可点击
         self.process_button = ttk.Button(
@@ -71,36 +104,92 @@ class BrandCheckerApp:
         )
         self.process_button.pack(side=tk.LEFT, padx=5, pady=5)
         
+        # 停止按钮：已复制的文件保留，勾选“从上次中断处继续”时下次检查同一目录从中断处继续
+        self.stop_button = ttk.Button(button_frame, text="停止检查", command=self.stop_processing,
+                                      state=tk.DISABLED, width=15)
+        self.stop_button.pack(side=tk.LEFT, padx=5, pady=5)
+        
         # 状态标签（显示loading状态）
         self.status_label = ttk.Label(button_frame, text="", foreground="blue")
         self.status_label.pack(side=tk.LEFT, padx=10, pady=5)
         
-        # 进度条
-        self.progress = ttk.Progressbar(main_frame, mode='indeterminate')
-        self.progress.grid(row=4, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=10)
+        # 进度条：统计出图片总数之前为不确定模式
+        self.progress = ttk.Progressbar(main_frame, mode='indeterminate', maximum=PROGRESS_MAXIMUM)
+        self.progress.grid(row=5, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=10)
         
         # 日志输出区域
-        ttk.Label(main_frame, text="处理日志:").grid(row=5, column=0, sticky=tk.W, pady=(10, 5))
+        ttk.Label(main_frame, text="处理日志:").grid(row=6, column=0, sticky=tk.W, pady=(10, 5))
         
         log_frame = ttk.Frame(main_frame)
-        log_frame.grid(row=6, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S), pady=5)
+        log_frame.grid(row=7, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S), pady=5)
         log_frame.columnconfigure(0, weight=1)
         log_frame.rowconfigure(0, weight=1)
-        main_frame.rowconfigure(6, weight=1)
+        main_frame.rowconfigure(7, weight=1)
         
         # 文本区域和滚动条
-        self.log_text = tk.Text(log_frame, height=15, wrap=tk.WORD)
+        self.log_text = tk.Text(log_frame, height=8, wrap=tk.WORD)
         scrollbar = ttk.Scrollbar(log_frame, orient=tk.VERTICAL, command=self.log_text.yview)
         self.log_text.configure(yscrollcommand=scrollbar.set)
         
         self.log_text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
         
+        # 检查结果表格：只显示一屏的行，可按结论和品牌筛选
+        ttk.Label(main_frame, text="检查结果:").grid(row=8, column=0, sticky=tk.W, pady=(10, 5))
+        self.results_table = ResultsTable(main_frame)
+        self.results_table.grid(row=9, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S), pady=5)
+        main_frame.rowconfigure(9, weight=3)
+        
     def log(self, message):
-        """添加日志消息"""
-        self.log_text.insert(tk.END, message + "\n")
+        """添加日志消息（线程安全，只放入队列）"""
+        self.log_queue.put(message)
+        
+    def poll_log_queue(self):
+        """定时把队列中的日志批量写入文本框，并显示新检查的文件"""
+        self.flush_log_queue()
+        self.refresh_results()
+        self.update_progress()
+        self.root.after(LOG_FLUSH_INTERVAL_MS, self.poll_log_queue)
+        
+    def update_progress(self):
+        """显示检查进度：总数已知后进度条改为确定模式，状态栏显示速度和预计剩余时间"""
+        engine = self.engine
+        if not self.is_processing or self.stop_requested or engine is None or engine.progress is None:
+            return
+        progress = engine.progress
+        fraction = progress.fraction()
+        if fraction is not None:
+            if str(self.progress['mode']) != 'determinate':
+                self.progress.stop()
+                self.progress.config(mode='determinate')
+            self.progress['value'] = fraction * PROGRESS_MAXIMUM
+        self.status_label.config(text=progress.describe(), foreground="blue")
+        
+    def refresh_results(self):
+        """检查开始后切换到本次检查的结果集，之后只筛选、显示新增的文件"""
+        engine = self.engine
+        if engine is not None and engine.results is not self.results_table.store:
+            self.results_table.set_store(engine.results)
+        else:
+            self.results_table.refresh()
+        
+    def flush_log_queue(self):
+        """取出队列中的日志，合并成一次插入（在主线程中调用）"""
+        lines = []
+        for _ in range(LOG_FLUSH_MAX_RECORDS):
+            try:
+                lines.append(self.log_queue.get_nowait())
+            except queue.Empty:
+                break
+        if not lines:
+            return
+            
+        self.log_text.insert(tk.END, "\n".join(lines) + "\n")
+        # 限制文本框大小，避免长时间运行后无限增长
+        line_count = int(self.log_text.index('end-1c').split('.')[0])
+        if line_count > LOG_MAX_TEXT_LINES:
+            self.log_text.delete('1.0', f"{line_count - LOG_MAX_TEXT_LINES + 1}.0")
         self.log_text.see(tk.END)
-        self.root.update_idletasks()
         
     def select_brand_dir(self):
         """选择品牌根目录"""
@@ -123,99 +212,28 @@ class BrandCheckerApp:
             if self.brand_dir and self.image_dir:
                 self.process_button.config(state=tk.NORMAL)
             
-    def normalize_text(self, text):
-        """
-        标准化文本：移除重音符号，转换为小写
-        例如：Été -> ete, Café -> cafe
-        """
-        # 使用NFD分解，然后过滤掉组合标记（重音符号）
-        nfd = unicodedata.normalize('NFD', text)
-        # 只保留非组合字符（即去掉重音符号）
-        no_accent = ''.join(char for char in nfd if unicodedata.category(char) != 'Mn')
-        return no_accent.lower()
-        
-    def scan_brands(self):
-        """扫描品牌目录，获取所有品牌名称（不输出日志）"""
-        if not self.brand_dir:
-            return False
-            
-        self.brands = set()
-        try:
-            brand_path = Path(self.brand_dir)
-            if not brand_path.exists():
-                return False
-                
-            # 仅识别第三级目录为品牌名
-            for second_level in brand_path.iterdir():
-                if second_level.is_dir():
-                    for third_level in second_level.iterdir():
-                        if third_level.is_dir():
-                            brand_name = third_level.name
-                            self.brands.add(brand_name)
-                    
-            # 创建标准化品牌名映射（用于快速查找）
-            self.normalized_brands = {}
-            for brand in self.brands:
-                normalized = self.normalize_text(brand)
-                if normalized not in self.normalized_brands:
-                    self.normalized_brands[normalized] = []
-                self.normalized_brands[normalized].append(brand)
-                
-            return True
-            
-        except Exception as e:
-            return False
-            
-    def extract_brand_from_filename(self, filename):
-        """
-        从文件名中提取品牌名
-        格式：品牌_Brador_2025年03月16日_03_1.jpg
-        品牌名在第一个下划线和第二个下划线之间
-        """
-        # 移除文件扩展名
-        name_without_ext = os.path.splitext(filename)[0]
-        
-        # 按下划线分割
-        parts = name_without_ext.split('_')
-        
-        # 如果至少有2个部分，第二个部分（索引1）应该是品牌名
-        if len(parts) >= 2:
-            return parts[1]  # 返回品牌名部分
-        return None
-        
-    def find_brand_match(self, brand_name):
-        """
-        查找匹配的品牌（不区分大小写和重音）
-        返回匹配的品牌名，如果没有匹配则返回None
-        """
-        if not brand_name:
-            return None
-            
-        normalized_brand = self.normalize_text(brand_name)
-        
-        # 在标准化品牌名中查找
-        if normalized_brand in self.normalized_brands:
-            # 返回第一个匹配的品牌名（原始名称）
-            return self.normalized_brands[normalized_brand][0]
-            
-        return None
-        
     def reset_button_state(self):
         """重置按钮状态（在主线程中调用）"""
         self.is_processing = False
         self.process_button.config(state=tk.NORMAL, text="开始检查")
+        self.stop_button.config(state=tk.DISABLED, text="停止检查")
         self.progress.stop()
+        self.progress.config(mode='indeterminate', value=0)
+        self.flush_log_queue()
     
     def show_warning(self, title, message):
         """在主线程中显示警告"""
+        self.flush_log_queue()
         messagebox.showwarning(title, message)
     
     def show_error(self, title, message):
         """在主线程中显示错误"""
+        self.flush_log_queue()
         messagebox.showerror(title, message)
     
     def show_info(self, title, message):
         """在主线程中显示信息"""
+        self.flush_log_queue()
         messagebox.showinfo(title, message)
     
     def process_images(self):
@@ -233,13 +251,23 @@ class BrandCheckerApp:
                 self.update_ui_safe(lambda: self.show_warning("警告", "请先选择品牌根目录"))
                 return
             
+            # 逐个文件的结论保存在结果集中供表格显示；勾选时从中断处继续、写出结果报告
+            # 检查的同时统计图片总数，用于显示完成比例和预计剩余时间
+            report_path = default_report_path(self.image_dir) if self.write_report else None
+            engine = BrandCheckEngine(self.brand_dir, self.image_dir, log=self.log, resume=self.resume,
+                                      keep_results=True, report_path=report_path, precount=True)
+            self.engine = engine
+            if self.stop_requested:
+                engine.cancel()
+            
             # 点击开始检查时才扫描品牌
             self.log("正在扫描品牌目录...")
-            if not self.scan_brands():
+            if not engine.scan_brands():
                 self.update_ui_safe(lambda: self.reset_button_state())
                 self.update_ui_safe(lambda: self.status_label.config(text="扫描品牌失败", foreground="red"))
                 self.update_ui_safe(lambda: self.show_error("错误", "扫描品牌目录失败，请检查品牌根目录是否正确"))
                 return
+            self.brands = engine.brands
             
             if not self.brands:
                 self.update_ui_safe(lambda: self.reset_button_state())
@@ -259,47 +287,30 @@ class BrandCheckerApp:
             self.log("\n开始处理图片文件...")
             # 进度条已在 start_processing 中启动
             
-            # 支持的图片扩展名
-            image_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.tiff', '.tif'}
-            
-            processed_files = 0
-            found_brand_files = 0
-            not_found_files = []  # 存储未找到品牌的文件路径
-            
-            # 递归遍历所有文件
-            for root, dirs, files in os.walk(self.image_dir):
-                root_path = Path(root)
-                
-                # 处理当前目录下的所有文件
-                for filename in files:
-                    file_path = root_path / filename
-                    
-                    # 检查是否是图片文件
-                    if file_path.suffix.lower() in image_extensions:
-                        processed_files += 1
-                        
-                        # 从文件名提取品牌名
-                        brand_name = self.extract_brand_from_filename(filename)
-                        
-                        if brand_name:
-                            # 查找匹配的品牌
-                            matched_brand = self.find_brand_match(brand_name)
-                            
-                            if matched_brand:
-                                # 品牌存在，记录
-                                found_brand_files += 1
-                                self.log(f"✓ 找到品牌: {filename} (品牌: {matched_brand})")
-                            else:
-                                # 品牌不存在，添加到待复制列表
-                                not_found_files.append(file_path)
-                                self.log(f"✗ 未找到品牌: {filename} (品牌: {brand_name})")
-                        else:
-                            # 无法提取品牌名，添加到待复制列表
-                            not_found_files.append(file_path)
-                            self.log(f"✗ 未找到品牌: {filename} (无法提取品牌名)")
+            # 检查与复制同时进行，未找到品牌的文件一经发现就复制
+            result = engine.check_images()
+            processed_files = result.processed_files
+            found_brand_files = result.found_brand_files
             
             # 处理结果
-            if not not_found_files:
+            if result.cancelled:
+                # 已复制的文件和检查进度都已保存，下次检查同一目录时从中断处继续
+                copied_count = result.copied_count
+                self.update_ui_safe(lambda: self.reset_button_state())
+                self.update_ui_safe(lambda: self.status_label.config(text="检查已停止", foreground="orange"))
+                self.log(f"  处理文件数: {processed_files}")
+                self.log(f"  找到品牌文件数: {found_brand_files}")
+                self.log(f"  未找到品牌文件数: {result.not_found_count}")
+                self.log(f"  已复制文件数: {copied_count}")
+                self.log("  再次检查同一目录时从中断处继续")
+                
+                self.update_ui_safe(lambda: self.show_info("检查已停止",
+                                  f"检查已停止。\n\n"
+                                  f"处理文件数: {processed_files}\n"
+                                  f"未找到品牌文件数: {result.not_found_count}\n"
+                                  f"已复制文件数: {copied_count}\n\n"
+                                  f"再次检查同一目录时从中断处继续。"))
+            elif result.passed:
                 # 所有文件都找到了品牌
                 self.update_ui_safe(lambda: self.reset_button_state())
                 self.update_ui_safe(lambda: self.status_label.config(text="检测通过！", foreground="green"))
@@ -313,61 +324,24 @@ class BrandCheckerApp:
                                   f"处理文件数: {processed_files}\n"
                                   f"找到品牌文件数: {found_brand_files}"))
             else:
-                # 有未找到品牌的文件，复制到新文件夹
-                self.log(f"\n开始复制未找到品牌的文件...")
-                
-                # 创建新文件夹
-                image_path = Path(self.image_dir)
-                parent_dir = image_path.parent
-                folder_name = f"{image_path.name}_未找到品牌图片"
-                output_dir = parent_dir / folder_name
-                
-                # 创建文件夹（如果不存在）
-                output_dir.mkdir(parents=True, exist_ok=True)
-                self.log(f"  目标文件夹: {output_dir}")
-                
-                # 复制文件（所有文件都复制到目标文件夹根目录）
-                copied_count = 0
-                file_counter = {}  # 用于处理重名文件
-                
-                for file_path in not_found_files:
-                    try:
-                        # 所有文件都复制到目标文件夹根目录
-                        dest_filename = file_path.name
-                        
-                        # 如果文件名已存在，添加序号
-                        if dest_filename in file_counter:
-                            file_counter[dest_filename] += 1
-                            name_parts = dest_filename.rsplit('.', 1)
-                            if len(name_parts) == 2:
-                                dest_filename = f"{name_parts[0]}_{file_counter[dest_filename]}.{name_parts[1]}"
-                            else:
-                                dest_filename = f"{dest_filename}_{file_counter[dest_filename]}"
-                        else:
-                            file_counter[dest_filename] = 0
-                        
-                        dest_path = output_dir / dest_filename
-                        
-                        # 复制文件
-                        shutil.copy2(file_path, dest_path)
-                        copied_count += 1
-                        self.log(f"  已复制: {file_path.name} -> {dest_filename}")
-                    except Exception as e:
-                        self.log(f"  复制失败: {file_path.name} - {str(e)}")
+                # 有未找到品牌的文件，已复制到新文件夹
+                copied_count = result.copied_count
+                output_dir = result.output_dir
+                folder_name = output_dir.name
                 
                 self.update_ui_safe(lambda: self.reset_button_state())
                 self.update_ui_safe(lambda: self.status_label.config(text="处理完成！", foreground="green"))
                 self.log(f"\n处理完成！")
                 self.log(f"  处理文件数: {processed_files}")
                 self.log(f"  找到品牌文件数: {found_brand_files}")
-                self.log(f"  未找到品牌文件数: {len(not_found_files)}")
+                self.log(f"  未找到品牌文件数: {result.not_found_count}")
                 self.log(f"  已复制文件数: {copied_count}")
                 
                 self.update_ui_safe(lambda: self.show_info("处理完成", 
                                   f"处理完成！\n\n"
                                   f"处理文件数: {processed_files}\n"
                                   f"找到品牌文件数: {found_brand_files}\n"
-                                  f"未找到品牌文件数: {len(not_found_files)}\n"
+                                  f"未找到品牌文件数: {result.not_found_count}\n"
                                   f"已复制到: {folder_name}"))
                 
                 # 自动打开文件夹
@@ -405,80 +379,9 @@ class BrandCheckerApp:
         
         检查图片根目录下的所有子文件夹，如果子文件夹是空的则删除。
         包括嵌套的子文件夹，如果删除子文件夹后父文件夹也变成空的，也会被删除。
+        只遍历一次目录树，只含系统文件（.DS_Store 等）的目录也视为空目录。
         """
-        deleted_count = 0
-        
-        # 使用循环方式，确保所有空目录都被删除
-        # 因为删除子目录后，父目录可能也变成空的，需要多次检查
-        max_iterations = 50  # 最多检查50次，避免无限循环（支持深层嵌套）
-        iteration = 0
-        
-        while iteration < max_iterations:
-            iteration += 1
-            found_empty = False
-            
-            # 从最深层的目录开始遍历（topdown=False）
-            # 这样可以先删除最深层的空目录，然后检查父目录
-            for root, dirs, files in os.walk(root_path, topdown=False):
-                root_path_obj = Path(root)
-                
-                # 跳过根目录本身（不删除用户选择的根目录）
-                if root_path_obj == root_path:
-                    continue
-                    
-                try:
-                    # 检查目录是否为空
-                    # 使用 listdir() 获取所有条目（包括隐藏文件）
-                    # 但排除系统文件如 .DS_Store, Thumbs.db 等
-                    entries = list(root_path_obj.iterdir())
-                    
-                    # 过滤掉常见的系统文件（这些文件不应该阻止目录删除）
-                    system_files = {'.DS_Store', 'Thumbs.db', '.gitkeep', '.gitignore'}
-                    filtered_entries = [e for e in entries if e.name not in system_files]
-                    
-                    if not filtered_entries:
-                        # 目录为空（或只有系统文件），删除它
-                        try:
-                            root_path_obj.rmdir()
-                            deleted_count += 1
-                            found_empty = True
-                            # 显示相对路径，更易读
-                            relative_path = root_path_obj.relative_to(root_path)
-                            self.log(f"  删除空目录: {relative_path}")
-                        except OSError as e:
-                            # 如果删除失败，记录详细信息用于调试
-                            relative_path = root_path_obj.relative_to(root_path)
-                            self.log(f"  无法删除目录 {relative_path}: {str(e)}")
-                            # 列出目录内容用于调试
-                            if entries:
-                                entry_names = [e.name for e in entries]
-                                self.log(f"    目录内容: {', '.join(entry_names)}")
-                    else:
-                        # 目录不为空，记录调试信息（仅在第一次迭代时）
-                        if iteration == 1:
-                            relative_path = root_path_obj.relative_to(root_path)
-                            entry_names = [e.name for e in filtered_entries]
-                            self.log(f"  保留目录（非空）: {relative_path} - 包含: {', '.join(entry_names[:5])}{'...' if len(entry_names) > 5 else ''}")
-                            
-                except PermissionError as e:
-                    # 权限不足
-                    relative_path = root_path_obj.relative_to(root_path)
-                    self.log(f"  权限不足，无法访问目录: {relative_path}")
-                except OSError:
-                    # 目录可能已经被删除或不存在，忽略
-                    pass
-                except Exception as e:
-                    relative_path = root_path_obj.relative_to(root_path) if root_path_obj != root_path else str(root_path_obj)
-                    self.log(f"  检查目录时出错 {relative_path}: {str(e)}")
-            
-            # 如果这一轮没有找到空目录，说明已经清理完毕
-            if not found_empty:
-                break
-        
-        if iteration >= max_iterations:
-            self.log(f"  警告: 达到最大迭代次数 ({max_iterations})，可能还有空目录未清理")
-                
-        return deleted_count
+        return prune_empty_dirs(root_path, log=self.log, log_detail=self.log)
         
     def start_processing(self, event=None):
         """在新线程中开始处理，避免界面冻结"""
@@ -497,9 +400,15 @@ class BrandCheckerApp:
         
         # 设置处理状态
         self.is_processing = True
+        self.stop_requested = False
+        # Tk 变量只在主线程中读取
+        self.resume = self.resume_var.get()
+        self.write_report = self.report_var.get()
+        self.engine = None  # 结果表格继续显示上次的结果，直到本次检查开始
         
         # 显示loading状态（在主线程中更新UI）
         self.process_button.config(state=tk.DISABLED, text="处理中...")
+        self.stop_button.config(state=tk.NORMAL)
         self.status_label.config(text="正在处理，请稍候...", foreground="blue")
         self.progress.start(10)  # 立即启动进度条动画
         
@@ -507,6 +416,18 @@ class BrandCheckerApp:
         thread = threading.Thread(target=self.process_images, daemon=True)
         thread.start()
     
+    def stop_processing(self):
+        """停止检查：当前文件检查完、已提交的复制完成后结束（检查线程中显示结果）"""
+        if not self.is_processing or self.stop_requested:
+            return
+        self.stop_requested = True
+        self.stop_button.config(state=tk.DISABLED, text="正在停止...")
+        self.status_label.config(text="正在停止，等待已提交的复制完成...", foreground="orange")
+        # 引擎还没有创建时，由检查线程在创建后停止
+        engine = self.engine
+        if engine is not None:
+            engine.cancel()
+    
     def update_ui_safe(self, func):
         """在主线程中安全更新UI"""
         self.root.after(0, func)
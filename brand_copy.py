@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+并发复制未找到品牌的文件
+目标文件名在提交时按顺序分配（保持原来的重名加序号规则），
+实际复制由有界线程池完成，并优先使用内核快速复制：
+reflink（FICLONE）-> os.copy_file_range -> os.sendfile -> shutil.copyfile
+
+开启去重时，内容相同的文件只复制一次：先按文件大小分组，只有大小相同时才计算 blake2b，
+所有源文件与复制结果的对照写入输出目录中的对照表
+
+除了复制，还可以选择其他输出方式（文件名分配规则相同）：
+  hardlink  硬链接，不复制数据；跨文件系统或文件系统不支持时改为复制
+  symlink   符号链接，指向源文件的绝对路径；无法创建链接时改为复制
+  move      用 os.replace 原子地移动文件；跨文件系统时先复制再删除源文件
+  list      不写入文件，只把源文件与分配的文件名写入对照表
+"""
+
+import csv
+import hashlib
+import os
+import errno
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+# 默认同时复制的文件数
+DEFAULT_COPY_WORKERS = 4
+# 每个线程最多排队等待复制的文件数
+PENDING_PER_WORKER = 4
+# copy_file_range / sendfile 每次调用复制的最大字节数
+COPY_CHUNK_SIZE = 64 * 1024 * 1024
+# 计算内容哈希时每次读取的字节数
+HASH_CHUNK_SIZE = 1024 * 1024
+# 去重对照表文件名（写在输出目录中）
+DEDUP_MAP_FILENAME = "_来源对照.csv"
+# 输出方式 -> 日志中的名称
+OUTPUT_MODE_NAMES = {
+    "copy": "复制",
+    "hardlink": "硬链接",
+    "symlink": "符号链接",
+    "move": "移动",
+    "list": "记录",
+}
+OUTPUT_MODES = tuple(OUTPUT_MODE_NAMES)
+# Linux ioctl FICLONE，在支持的文件系统（btrfs、xfs 等）上共享数据块
+FICLONE = 0x40049409
+
+# 表示当前环境不支持某种快速复制方式的错误码，遇到后改用下一种方式
+_UNSUPPORTED_ERRNOS = {
+    errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.EBADF,
+    getattr(errno, 'EOPNOTSUPP', errno.EINVAL), getattr(errno, 'ENOTSUP', errno.EINVAL),
+    getattr(errno, 'ENOTTY', errno.EINVAL),
+}
+
+
+def next_dest_name(filename, file_counter):
+    """
+    分配目标文件名：第一次出现保持原名，之后依次加 _1、_2 ...
+    例如 a.jpg, a_1.jpg, a_2.jpg
+    """
+    dest_filename = filename
+
+    # 如果文件名已存在，添加序号
+    if dest_filename in file_counter:
+        file_counter[dest_filename] += 1
+        name_parts = dest_filename.rsplit('.', 1)
+        if len(name_parts) == 2:
+            dest_filename = f"{name_parts[0]}_{file_counter[dest_filename]}.{name_parts[1]}"
+        else:
+            dest_filename = f"{dest_filename}_{file_counter[dest_filename]}"
+    else:
+        file_counter[dest_filename] = 0
+
+    return dest_filename
+
+
+def format_rate(bytes_count, seconds):
+    """格式化复制速度，例如 12.3 MB/s"""
+    if seconds <= 0:
+        return "-"
+    return f"{bytes_count / seconds / (1024 * 1024):.1f} MB/s"
+
+
+class FastCopier:
+    """
+    带内核快速路径的文件复制，效果等同于 shutil.copy2
+    某种方式第一次报告“不支持”后不再尝试
+    """
+
+    def __init__(self):
+        self.use_reflink = fcntl is not None and hasattr(fcntl, 'ioctl') and os.name == 'posix'
+        self.use_copy_file_range = hasattr(os, 'copy_file_range')
+        self.use_sendfile = hasattr(os, 'sendfile') and os.name == 'posix'
+
+    def copy(self, src, dst):
+        """复制文件内容和元数据，返回复制的字节数"""
+        with open(src, 'rb') as fsrc:
+            size = os.fstat(fsrc.fileno()).st_size
+            with open(dst, 'wb') as fdst:
+                if not self._copy_fast(fsrc.fileno(), fdst.fileno(), size):
+                    self._rewind(fsrc.fileno(), fdst.fileno())
+                    shutil.copyfileobj(fsrc, fdst, COPY_CHUNK_SIZE)
+        shutil.copystat(src, dst)
+        return size
+
+    def _copy_fast(self, src_fd, dst_fd, size):
+        """依次尝试快速复制，成功返回 True"""
+        if size == 0:
+            return True
+        if self.use_reflink:
+            try:
+                fcntl.ioctl(dst_fd, FICLONE, src_fd)
+                return True
+            except OSError as e:
+                if e.errno not in _UNSUPPORTED_ERRNOS:
+                    raise
+                self.use_reflink = False
+        if self.use_copy_file_range:
+            try:
+                self._rewind(src_fd, dst_fd)
+                if self._copy_loop(os.copy_file_range, src_fd, dst_fd) >= size:
+                    return True
+                # 有的文件系统（如部分 FUSE、/proc）提前返回 0，复制不完整时改用普通读写
+                return False
+            except OSError as e:
+                if e.errno not in _UNSUPPORTED_ERRNOS:
+                    raise
+                self.use_copy_file_range = False
+        if self.use_sendfile:
+            try:
+                self._rewind(src_fd, dst_fd)
+                if self._copy_loop(lambda i, o, n: os.sendfile(o, i, None, n), src_fd, dst_fd) >= size:
+                    return True
+                return False
+            except OSError as e:
+                if e.errno not in _UNSUPPORTED_ERRNOS:
+                    raise
+                self.use_sendfile = False
+        return False
+
+    @staticmethod
+    def _rewind(src_fd, dst_fd):
+        """回到文件开头并清空目标文件，上一种方式失败时可能已写入部分内容"""
+        os.lseek(src_fd, 0, os.SEEK_SET)
+        os.lseek(dst_fd, 0, os.SEEK_SET)
+        os.ftruncate(dst_fd, 0)
+
+    @staticmethod
+    def _copy_loop(copy_func, src_fd, dst_fd):
+        """重复调用 copy_func(src, dst, count) 直到读到文件末尾，返回复制的字节数"""
+        copied = 0
+        while True:
+            count = copy_func(src_fd, dst_fd, COPY_CHUNK_SIZE)
+            if not count:
+                return copied
+            copied += count
+
+
+def file_digest(path):
+    """流式计算文件内容的 blake2b 摘要"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.digest()
+
+
+class ContentDeduper:
+    """
+    按内容查找已复制过的文件
+
+    只有大小与之前某个文件相同时才计算哈希：每种大小的第一个文件先只记住路径，
+    出现第二个同样大小的文件时才补算第一个文件的哈希，所以大小各不相同的文件完全不读取内容。
+    """
+
+    def __init__(self, output_dir=None):
+        self.output_dir = output_dir  # 移动方式下第一个文件可能已移到输出目录
+        self.first_by_size = {}  # 大小 -> (源文件路径, 目标文件名)，该大小还没有计算过哈希
+        self.hashed_sizes = set()
+        self.by_digest = {}  # (大小, 摘要) -> 目标文件名
+        self.hashed_files = 0
+
+    def find(self, file_path, size):
+        """
+        返回 (内容相同的已复制文件的目标文件名或 None, 摘要)
+        该大小第一次出现时不计算摘要，返回 (None, None)
+        """
+        if size not in self.hashed_sizes:
+            first = self.first_by_size.pop(size, None)
+            if first is None:
+                return None, None
+            self.hashed_sizes.add(size)
+            first_digest = self._digest(first[0])
+            if first_digest is None and self.output_dir is not None:
+                first_digest = self._digest(os.path.join(self.output_dir, first[1]))
+            if first_digest is not None:
+                self.by_digest[(size, first_digest)] = first[1]
+        digest = self._digest(file_path)
+        if digest is None:
+            return None, None
+        return self.by_digest.get((size, digest)), digest
+
+    def add(self, file_path, size, digest, dest_filename):
+        """记录一个已提交复制的文件（digest 为 find 返回的摘要）"""
+        if digest is not None:
+            self.by_digest[(size, digest)] = dest_filename
+        elif size not in self.hashed_sizes:
+            self.first_by_size[size] = (file_path, dest_filename)
+
+    def _digest(self, path):
+        try:
+            digest = file_digest(path)
+        except OSError:
+            # 读取失败的文件不参与去重，照常提交复制（复制失败会记录下来）
+            return None
+        self.hashed_files += 1
+        return digest
+
+
+class CopyStats:
+    """复制阶段的统计"""
+
+    def __init__(self):
+        self.copied_count = 0
+        self.failed_count = 0
+        self.failed_files = []  # 复制失败的源文件路径
+        self.duplicate_count = 0  # 与已复制文件内容相同、没有再复制的文件数
+        self.bytes_deduplicated = 0
+        self.hashed_files = 0  # 去重时计算过哈希的文件数
+        self.bytes_copied = 0
+        self.linked_count = 0  # 以硬链接或符号链接输出的文件数
+        self.moved_count = 0
+        self.fallback_count = 0  # 无法按指定方式输出、改为复制的文件数
+        self.elapsed = 0.0
+
+    @property
+    def bytes_per_second(self):
+        return self.bytes_copied / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def _replace_link(link_func, src, dst):
+    """创建链接；目标已存在时与复制一样覆盖"""
+    try:
+        link_func(src, dst)
+    except FileExistsError:
+        os.remove(dst)
+        link_func(src, dst)
+
+
+class CopyEngine:
+    """
+    把文件并发复制（或链接、移动、只记录）到输出目录根目录
+
+    submit() 在调用线程中按顺序分配目标文件名，所以无论复制完成的先后，
+    同样的提交顺序总是得到同样的文件名；排队的文件数有上限，提交过快时会等待。
+    keep_existing 为 True 时不覆盖输出目录中已有的文件（跳过已存在的序号）。
+    dedup 为 True 时内容相同的文件只复制一次，每个源文件对应的目标文件写入对照表 DEDUP_MAP_FILENAME。
+    mode 为 OUTPUT_MODES 之一；list 方式也写对照表。
+    on_removed: 移动方式下源文件移走后在复制线程中调用 on_removed(源文件路径)（已加锁）
+    on_assigned: 分配目标文件名后、提交复制前调用 on_assigned(源文件路径, 目标文件名, 是否重复)
+    on_copied: 复制完成后在复制线程中调用 on_copied(源文件路径, 目标文件名)
+    """
+
+    def __init__(self, output_dir, workers=DEFAULT_COPY_WORKERS, log=None, log_detail=None,
+                 keep_existing=False, dedup=False, mode="copy", on_removed=None, on_assigned=None,
+                 on_copied=None):
+        if mode not in OUTPUT_MODES:
+            raise ValueError(f"未知的输出方式: {mode}")
+        self.output_dir = output_dir
+        self.keep_existing = keep_existing
+        self.mode = mode
+        self.verb = OUTPUT_MODE_NAMES[mode]
+        self._on_removed = on_removed
+        self._on_assigned = on_assigned
+        self._on_copied = on_copied
+        self._can_link = True
+        self.deduper = ContentDeduper(output_dir if mode == "move" else None) if dedup else None
+        self._map_file = None
+        self._map_writer = None
+        if dedup or mode == "list":
+            self._open_map()
+        self.workers = max(1, workers)
+        self.file_counter = {}  # 用于处理重名文件
+        self.stats = CopyStats()
+        self._log = log
+        self._log_detail = log_detail
+        self._copier = FastCopier()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.workers * PENDING_PER_WORKER)
+        self._pool = ThreadPoolExecutor(max_workers=self.workers)
+        self._start = time.monotonic()
+
+    def _open_map(self):
+        """打开对照表（监控模式下追加到已有的对照表）"""
+        map_path = os.path.join(self.output_dir, DEDUP_MAP_FILENAME)
+        append = self.keep_existing and os.path.exists(map_path)
+        # utf-8-sig 让 Excel 正确识别中文
+        self._map_file = open(map_path, 'a' if append else 'w', encoding='utf-8-sig', newline='')
+        self._map_writer = csv.writer(self._map_file)
+        if not append:
+            self._map_writer.writerow(["源文件", f"{self.verb}为", "重复"])
+
+    def restore(self, assignments):
+        """
+        恢复上次中断的检查已分配的文件名：assignments 为按分配顺序排列的 (源文件路径, 目标文件名, 是否重复)
+        重新计算重名序号，并把对照写回对照表，之后新分配的文件名不会与它们重复
+        """
+        for file_path, dest_filename, duplicate in assignments:
+            if not duplicate:
+                next_dest_name(os.path.basename(file_path), self.file_counter)
+            if self._map_writer is not None:
+                self._map_writer.writerow([file_path, dest_filename, 1 if duplicate else 0])
+
+    def submit(self, file_path, dest_filename=None):
+        """
+        提交一个文件，返回分配的目标文件名（去重时内容重复的文件返回已复制的文件名）
+        dest_filename: 使用指定的目标文件名（继续上次中断的检查时），不再分配文件名和去重
+        """
+        if dest_filename is not None:
+            self._start_copy(file_path, dest_filename)
+            return dest_filename
+        size = digest = None
+        if self.deduper is not None:
+            try:
+                size = os.stat(file_path).st_size
+            except OSError:
+                # 文件已不存在，照常提交，由复制线程记录失败
+                size = None
+            if size is not None:
+                existing, digest = self.deduper.find(file_path, size)
+                if existing is not None:
+                    # 移动方式下重复的源文件留在原处
+                    self.stats.duplicate_count += 1
+                    self.stats.bytes_deduplicated += size
+                    self._map_writer.writerow([file_path, existing, 1])
+                    if self._on_assigned is not None:
+                        self._on_assigned(file_path, existing, True)
+                    if self._log_detail is not None:
+                        self._log_detail(f"  内容重复，不再{self.verb}: {os.path.basename(file_path)} -> {existing}")
+                    return existing
+        dest_filename = self._submit_copy(file_path)
+        if size is not None:
+            self.deduper.add(file_path, size, digest, dest_filename)
+        if self._map_writer is not None:
+            self._map_writer.writerow([file_path, dest_filename, 0])
+        return dest_filename
+
+    def _submit_copy(self, file_path):
+        filename = os.path.basename(file_path)
+        dest_filename = next_dest_name(filename, self.file_counter)
+        if self.keep_existing:
+            while os.path.exists(os.path.join(self.output_dir, dest_filename)):
+                dest_filename = next_dest_name(filename, self.file_counter)
+        if self._on_assigned is not None:
+            self._on_assigned(file_path, dest_filename, False)
+        self._start_copy(file_path, dest_filename)
+        return dest_filename
+
+    def _start_copy(self, file_path, dest_filename):
+        if self.mode == "list":
+            # 只记录，不写入文件
+            self.stats.copied_count += 1
+            if self._on_copied is not None:
+                self._on_copied(file_path, dest_filename)
+            return
+        self._slots.acquire()
+        try:
+            self._pool.submit(self._copy_one, file_path, dest_filename)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _copy_one(self, file_path, dest_filename):
+        try:
+            method, size = self._transfer(file_path, os.path.join(self.output_dir, dest_filename))
+            with self._lock:
+                self.stats.copied_count += 1
+                self.stats.bytes_copied += size
+                if method in ("hardlink", "symlink"):
+                    self.stats.linked_count += 1
+                elif method == "move":
+                    self.stats.moved_count += 1
+                    if self._on_removed is not None:
+                        self._on_removed(file_path)
+                elif self.mode != "copy":
+                    self.stats.fallback_count += 1
+            if self._on_copied is not None:
+                self._on_copied(file_path, dest_filename)
+            if self._log_detail is not None:
+                self._log_detail(f"  已{OUTPUT_MODE_NAMES[method]}: {os.path.basename(file_path)} -> {dest_filename}")
+        except Exception as e:
+            with self._lock:
+                self.stats.failed_count += 1
+                self.stats.failed_files.append(file_path)
+            if self._log is not None:
+                self._log(f"  {self.verb}失败: {os.path.basename(file_path)} - {str(e)}")
+        finally:
+            self._slots.release()
+
+    def _transfer(self, src, dst):
+        """按输出方式写出一个文件，返回 (实际使用的方式, 复制的字节数)"""
+        if self.mode == "hardlink" and self._can_link:
+            try:
+                _replace_link(os.link, src, dst)
+                return "hardlink", 0
+            except OSError as e:
+                # 跨文件系统时所有文件都无法硬链接，不再尝试；其他错误（不支持、权限等）只对这个文件改为复制
+                if e.errno == errno.EXDEV:
+                    self._can_link = False
+        elif self.mode == "symlink":
+            try:
+                _replace_link(os.symlink, os.path.abspath(src), dst)
+                return "symlink", 0
+            except OSError:
+                # 例如 Windows 上没有创建符号链接的权限
+                pass
+        elif self.mode == "move":
+            try:
+                os.replace(src, dst)
+                return "move", 0
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+            # 跨文件系统：先完整复制，再删除源文件
+            size = self._copier.copy(src, dst)
+            os.remove(src)
+            return "move", size
+        return "copy", self._copier.copy(src, dst)
+
+    def close(self):
+        """等待所有复制完成，返回 CopyStats"""
+        self._pool.shutdown(wait=True)
+        self.stats.elapsed = time.monotonic() - self._start
+        if self.deduper is not None:
+            self.stats.hashed_files = self.deduper.hashed_files
+        if self._map_file is not None:
+            self._map_file.close()
+            self._map_file = None
+        return self.stats
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,1246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+品牌检查引擎
+不依赖 tkinter，可以在无界面的服务器上导入使用
+图形界面（brand_checker.py）和命令行（brand_check.py）都通过它完成检查
+"""
+
+import csv
+import os
+import threading
+import time
+import unicodedata
+import zlib
+from functools import lru_cache
+from pathlib import Path
+
+from brand_automaton import BrandAutomaton, load_aliases
+from brand_catalog import CatalogClient, CatalogError
+from brand_copy import DEFAULT_COPY_WORKERS, OUTPUT_MODE_NAMES, CopyEngine, format_rate
+from brand_index import BrandIndex
+from brand_journal import JOURNAL_VERSION, ProgressJournal
+from brand_manifest import Manifest, default_manifest_path, relative_dir
+from brand_metrics import RunMetrics
+from brand_progress import CheckProgress
+from brand_report import ReportWriter
+from brand_results import ResultStore
+from brand_rules import FilenameRuleError, load_rules
+from brand_suggest import DEFAULT_TOP_K, BrandSuggester, format_suggestions
+from brand_validate import DEFAULT_VALIDATE_WORKERS, ImageValidator, validate_image
+from brand_walk import DEFAULT_WALK_WORKERS, EmptyDirPruner, iter_dirs
+
+
+# 支持的图片扩展名
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.tiff', '.tif'}
+
+# 未找到品牌图片的输出文件夹后缀
+OUTPUT_DIR_SUFFIX = "_未找到品牌图片"
+
+# 无效图片清单文件名（写在输出目录中）
+INVALID_REPORT_FILENAME = "_无效图片.csv"
+
+# 品牌名 -> 匹配结果缓存的最大条目数（大量文件共用同一个品牌名）
+MATCH_CACHE_SIZE = 65536
+
+# 品牌识别方式
+MATCH_MODE_TOKEN = "token"  # 文件名第一个和第二个下划线之间的部分是品牌名
+MATCH_MODE_SCAN = "scan"  # 在整个文件名中查找品牌名和别名
+MATCH_MODES = (MATCH_MODE_TOKEN, MATCH_MODE_SCAN)
+
+# 检查结论
+VERDICT_FOUND = 0  # 找到品牌
+VERDICT_NOT_FOUND = 1  # 品牌不存在
+VERDICT_NO_BRAND = 2  # 无法提取品牌名
+VERDICT_INVALID = 3  # 不是有效的图片文件（开启图片校验时）
+# 结论代码 -> 报告中的结论名称
+VERDICT_NAMES = {
+    VERDICT_FOUND: "found",
+    VERDICT_NOT_FOUND: "not_found",
+    VERDICT_NO_BRAND: "no_brand",
+    VERDICT_INVALID: "invalid",
+}
+
+
+def normalize_text(text):
+    """
+    标准化文本：移除重音符号，转换为小写
+    例如：Été -> ete, Café -> cafe
+    """
+    # 纯 ASCII 文本没有可分解的字符，NFD 结果与原文相同，直接转小写
+    if text.isascii():
+        return text.lower()
+    # 使用NFD分解，然后过滤掉组合标记（重音符号）
+    nfd = unicodedata.normalize('NFD', text)
+    # 只保留非组合字符（即去掉重音符号）
+    no_accent = ''.join(char for char in nfd if unicodedata.category(char) != 'Mn')
+    return no_accent.lower()
+
+
+def extract_brand_from_filename(filename):
+    """
+    从文件名中提取品牌名
+    格式：品牌_Brador_2025年03月16日_03_1.jpg
+    品牌名在第一个下划线和第二个下划线之间
+    """
+    # 移除文件扩展名
+    name_without_ext = os.path.splitext(filename)[0]
+
+    # 按下划线分割
+    parts = name_without_ext.split('_')
+
+    # 如果至少有2个部分，第二个部分（索引1）应该是品牌名
+    if len(parts) >= 2:
+        return parts[1]  # 返回品牌名部分
+    return None
+
+
+def default_output_dir(image_dir):
+    """默认输出目录：图片根目录旁边的 <目录名>_未找到品牌图片"""
+    image_path = Path(image_dir)
+    return image_path.parent / f"{image_path.name}{OUTPUT_DIR_SUFFIX}"
+
+
+def suggestion_hint(suggestions):
+    """附加在逐个文件日志后的相近品牌提示"""
+    return f" 相近品牌: {suggestions}" if suggestions else ""
+
+
+class BrandCheckError(Exception):
+    """检查无法进行（目录不存在、没有品牌等）"""
+
+
+class CheckResult:
+    """一次检查的结果"""
+
+    def __init__(self):
+        self.processed_files = 0
+        self.found_brand_files = 0
+        self.not_found_files = 0  # 本次检查出的未找到品牌文件数（路径不保存在内存中）
+        self.unchanged_files = 0  # 增量检查时直接使用清单结论的文件数
+        self.unchanged_not_found = 0  # 其中未找到品牌的文件数（之前已复制过）
+        self.reclassified_files = 0  # 增量检查时文件未变化、因品牌目录变化结论改变的文件数
+        self.outputs_removed = 0  # 结论变为找到品牌后从输出目录删除的上次输出数
+        self.suggestions = {}  # 未找到的品牌名 -> [(相近品牌名, 编辑距离)]（开启相近品牌建议时）
+        self.copied_count = 0
+        self.copy_stats = None  # brand_copy.CopyStats
+        self.output_dir = None
+        self.pruned_dirs = 0  # 删除的空目录数（开启删除空目录时）
+        self.invalid_files = 0  # 校验未通过的文件数（开启图片校验时，不参与品牌检查）
+        self.results = None  # brand_results.ResultStore，每个文件的结论（开启 keep_results 时）
+        self.metrics = None  # brand_metrics.RunMetrics
+        self.cancelled = False  # 检查被 cancel() 停止（结果只包含已检查的文件）
+
+    @property
+    def not_found_count(self):
+        return self.not_found_files + self.unchanged_not_found
+
+    @property
+    def passed(self):
+        """所有图片都找到了对应品牌（且都是有效图片）"""
+        return self.not_found_count == 0 and self.invalid_files == 0
+
+
+def result_counts(result):
+    """检查进度记录中每个目录保存的计数"""
+    return (result.processed_files, result.found_brand_files, result.not_found_files, result.invalid_files)
+
+
+class BrandCheckEngine:
+    """
+    无界面的品牌检查引擎
+
+    log: 接收一条日志字符串的回调，默认不输出
+    verbose: 是否输出逐个文件的检查日志
+    detail_log: 逐个文件日志的单独回调（设置后忽略 verbose，明细只发给它）
+    walk_workers: 遍历图片目录时同时列出目录的线程数
+    copy_workers: 同时复制文件的线程数
+    use_brand_index: 是否使用品牌索引缓存（只重新扫描有变化的品类目录）
+    brand_index_path: 品牌索引文件路径（默认在品牌根目录旁边）
+    incremental: 增量检查，只检查新增或修改过的文件（以及品牌变化后结论可能改变的文件）
+    manifest_path: 增量检查清单路径（默认在图片根目录旁边）
+    suggest: 为未找到的品牌名给出相近的已有品牌
+    suggest_top_k: 每个品牌名最多给出的相近品牌数
+    prune_empty_dirs: 检查完成后删除图片目录下的空目录（在检查的同一次遍历中记录目录结构）
+    dedup: 内容相同的未找到品牌文件只复制一次，所有源文件与复制结果的对照写入输出目录
+    match_mode: 品牌识别方式，token 只看文件名中第一个下划线后的部分，scan 在整个文件名中查找品牌
+    alias_path: 品牌别名文件（scan 方式下别名也能识别为对应品牌）
+    rules_path: 文件名规则文件（JSON），描述不同命名方式下从文件名中提取品牌名的方法
+    validate: 根据文件头校验图片，无效文件单独列出，不参与品牌检查
+    validate_eof: 校验时同时检查 JPEG/PNG 的结束标记（发现没传完的文件）
+    validate_workers: 同时校验的文件数
+    output_mode: 未找到品牌文件的输出方式（copy/hardlink/symlink/move/list，见 brand_copy）
+    report_path: 检查过程中逐个文件写出结论的报告文件（见 brand_report）
+    report_format: 报告格式 csv/jsonl/sqlite（默认根据扩展名判断）
+    keep_results: 在 CheckResult.results 中紧凑地保存每个文件的结论（供查看、筛选；继续检查时跳过的目录不在其中）
+    resume: 在输出目录中记录检查进度，上次检查中途退出时从中断处继续（见 brand_journal，不用于增量检查）
+    precount: 检查的同时在另一个线程中统计图片总数（只列目录），供 progress 计算完成比例和剩余时间
+    catalog_socket: 品牌目录服务的 socket 路径（见 brand_catalog），从服务取得整张品牌表后在本进程中匹配，
+        代替在本进程中扫描品牌目录；服务不可用时改为本地扫描
+    """
+
+    def __init__(self, brand_dir="", image_dir="", output_dir=None, log=None, verbose=False,
+                 detail_log=None, walk_workers=DEFAULT_WALK_WORKERS,
+                 copy_workers=DEFAULT_COPY_WORKERS, use_brand_index=True, brand_index_path=None,
+                 incremental=False, manifest_path=None, suggest=False, suggest_top_k=DEFAULT_TOP_K,
+                 prune_empty_dirs=False, dedup=False, match_mode=MATCH_MODE_TOKEN, alias_path=None,
+                 rules_path=None, validate=False, validate_eof=False,
+                 validate_workers=DEFAULT_VALIDATE_WORKERS, output_mode="copy", resume=False,
+                 keep_results=False, report_path=None, report_format=None, catalog_socket=None,
+                 precount=False):
+        self.brand_dir = brand_dir
+        self.image_dir = image_dir
+        self.output_dir = output_dir
+        self.verbose = verbose
+        self._log = log
+        self._detail_log = detail_log
+        self._log_lock = threading.Lock()
+        self.walk_workers = walk_workers
+        self.copy_workers = copy_workers
+        self.use_brand_index = use_brand_index
+        self.brand_index_path = brand_index_path
+        self.brand_index = None
+        self.catalog_socket = catalog_socket
+        self.catalog = None  # 已连接的 CatalogClient
+        self.catalog_generation = None
+        self.catalog_aliases = {}
+        self.incremental = incremental
+        self.manifest_path = manifest_path
+        self.manifest = None
+        self.copier = None
+        self.copy_files = True
+        self.keep_existing_outputs = False  # 输出目录中已有同名文件时改用新序号（监控模式）
+        self.dedup = dedup
+        self.output_mode = output_mode
+        self.resume = resume
+        self.keep_results = keep_results
+        self.report_path = report_path
+        self.report_format = report_format
+        self.report = None
+        self.results = None  # 当前检查的结果集（keep_results 时）
+        self.precount = precount
+        self.progress = None  # 当前检查的进度（brand_progress.CheckProgress）
+        self._cancel = threading.Event()
+        self.journal = None
+        self.match_mode = match_mode
+        self.alias_path = alias_path
+        self.aliases = {}  # 别名 -> 品牌名
+        self.automaton = None
+        self.rules_path = rules_path
+        self.filename_rules = None
+        self.validate = validate or validate_eof
+        self.validate_eof = validate_eof
+        self.validate_workers = validate_workers
+        self.validator = None
+        self._invalid_file = None
+        self._invalid_writer = None
+        self.shard = None  # brand_shard.ShardSpec，分片检查时只检查属于该分片的目录
+        self.not_found_sink = None  # 每个未找到品牌的文件调用 not_found_sink(文件路径, 目标文件名或 None)
+        self.suggest = suggest
+        self.suggest_top_k = suggest_top_k
+        self.suggester = None
+        self.prune_empty_dirs = prune_empty_dirs
+        self.pruner = None
+        self.metrics = RunMetrics()
+        self.brands = set()
+        self.normalized_brands = {}
+        self.reset_match_cache()
+
+    def log(self, message):
+        """输出日志消息（复制、校验的工作线程也会调用，加锁避免与主线程的输出交错）"""
+        if self._log is not None:
+            with self._log_lock:
+                self._log(message)
+
+    @property
+    def detail_enabled(self):
+        """是否输出逐个文件的日志（不输出时不必拼接日志文字）"""
+        return self._detail_log is not None or self.verbose
+
+    def log_detail(self, message):
+        """输出逐个文件的日志（仅 verbose 或设置了 detail_log 时）"""
+        if self._detail_log is not None:
+            with self._log_lock:
+                self._detail_log(message)
+        elif self.verbose:
+            self.log(message)
+
+    def cancel(self):
+        """
+        停止检查（可在其他线程中调用）：遍历、匹配在当前文件之后停止，已提交的复制完成后返回，
+        CheckResult.cancelled 为 True。进度记录、增量检查清单只包含已完成的部分，下次检查从中断处继续
+        """
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    normalize_text = staticmethod(normalize_text)
+    extract_brand_from_filename = staticmethod(extract_brand_from_filename)
+
+    def scan_brands(self):
+        """扫描品牌目录，获取所有品牌名称（不输出日志）"""
+        if not self.brand_dir:
+            return False
+
+        if self.catalog_socket and self.load_catalog():
+            return True
+
+        if self.use_brand_index:
+            return self.load_brand_index()
+
+        # 扫描完成后才替换品牌列表，扫描失败时保留原来的品牌（监控模式定期重新扫描）
+        brands = set()
+        try:
+            brand_path = Path(self.brand_dir)
+            if not brand_path.exists():
+                return False
+
+            # 仅识别第三级目录为品牌名
+            for second_level in brand_path.iterdir():
+                if second_level.is_dir():
+                    for third_level in second_level.iterdir():
+                        if third_level.is_dir():
+                            brand_name = third_level.name
+                            brands.add(brand_name)
+
+            # 创建标准化品牌名映射（用于快速查找）
+            normalized_brands = {}
+            for brand in brands:
+                normalized = self.normalize_text(brand)
+                if normalized not in normalized_brands:
+                    normalized_brands[normalized] = []
+                normalized_brands[normalized].append(brand)
+
+            self.brands = brands
+            self.normalized_brands = normalized_brands
+            self.reset_match_cache()
+            return True
+
+        except Exception:
+            return False
+
+    def load_brand_index(self):
+        """通过品牌索引缓存获取品牌，只重新扫描修改时间变化的品类目录"""
+        index = BrandIndex(self.brand_dir, self.normalize_text, self.brand_index_path)
+        index.load()
+        try:
+            if not index.refresh():
+                return False
+        except OSError:
+            return False
+
+        if index.changed:
+            try:
+                index.save()
+            except OSError:
+                # 索引文件无法写入（如只读共享目录）时不影响本次检查
+                pass
+
+        self.brand_index = index
+        self.brands = index.brands
+        self.normalized_brands = index.normalized_brands
+        self.reset_match_cache()
+        return True
+
+    def load_catalog(self):
+        """从品牌目录服务取得品牌表；服务不可用或服务的品牌根目录不同时返回 False（改为本地扫描）"""
+        # 监控模式定期重新扫描品牌时沿用已有的连接
+        client = self.catalog or CatalogClient(self.catalog_socket)
+        self.catalog = None
+        try:
+            catalog = client.catalog()
+        except CatalogError as e:
+            client.close()
+            self.log(f"品牌目录服务不可用，改为本地扫描: {e}")
+            return False
+        if catalog["brand_dir"] != os.path.abspath(self.brand_dir):
+            client.close()
+            self.log(f"品牌目录服务的品牌根目录是 {catalog['brand_dir']}，改为本地扫描")
+            return False
+
+        self.catalog = client
+        self.catalog_generation = catalog["generation"]
+        self.catalog_aliases = catalog["aliases"]
+        self.normalized_brands = catalog["normalized_brands"]
+        self.brands = {brand for brands in self.normalized_brands.values() for brand in brands}
+        self.brand_index = None
+        self.reset_match_cache()
+        return True
+
+    def close_catalog(self):
+        """断开与品牌目录服务的连接"""
+        if self.catalog is not None:
+            self.catalog.close()
+            self.catalog = None
+
+    def reset_match_cache(self):
+        """品牌列表变化后重建匹配缓存（相近品牌索引也随之重建）"""
+        self.match_token = lru_cache(maxsize=MATCH_CACHE_SIZE)(self._match_token)
+        self.suggester = None
+        self.automaton = None
+
+    def _match_token(self, brand_name):
+        """返回 (标准化品牌名, 匹配的原始品牌名或 None)，通过 match_token 带缓存调用"""
+        normalized = self.normalize_text(brand_name)
+        candidates = self.normalized_brands.get(normalized)
+        # 返回第一个匹配的品牌名（原始名称）
+        return normalized, candidates[0] if candidates else None
+
+    def find_brand_match(self, brand_name):
+        """
+        查找匹配的品牌（不区分大小写和重音）
+        返回匹配的品牌名，如果没有匹配则返回None
+        """
+        if not brand_name:
+            return None
+        return self.match_token(brand_name)[1]
+
+    def load_aliases(self):
+        """读取别名文件，别名指向的品牌不存在时忽略该别名；文件无法读取时抛出 BrandCheckError"""
+        self.aliases = {}
+        if self.alias_path:
+            try:
+                aliases = load_aliases(self.alias_path)
+            except (OSError, ValueError) as e:
+                raise BrandCheckError(f"读取品牌别名文件失败: {e}")
+        elif self.catalog is not None:
+            # 没有指定别名文件时使用品牌目录服务的别名
+            aliases = self.catalog_aliases
+        else:
+            return
+        for alias, brand in aliases.items():
+            if self.find_brand_match(brand) is None:
+                self.log(f"  忽略别名 {alias}: 品牌目录中没有品牌 {brand}")
+                continue
+            self.aliases[alias] = brand
+        self.automaton = None
+
+    def load_filename_rules(self):
+        """读取并编译文件名规则，之后用规则代替默认的品牌名提取方法；规则无效时抛出 BrandCheckError"""
+        if not self.rules_path:
+            return
+        try:
+            self.filename_rules = load_rules(self.rules_path)
+        except (OSError, FilenameRuleError) as e:
+            raise BrandCheckError(f"读取文件名规则失败: {e}")
+        self.extract_brand_from_filename = self.filename_rules.extract
+        self.log(f"文件名规则: {len(self.filename_rules)} 条（{', '.join(self.filename_rules.names)}）")
+
+    def get_automaton(self):
+        """所有品牌名和别名的自动机（品牌列表变化后重新建立）"""
+        if self.automaton is None:
+            patterns = {normalized: brands[0] for normalized, brands in self.normalized_brands.items()}
+            for alias, brand in self.aliases.items():
+                matched = self.find_brand_match(brand)
+                # 品牌目录重新扫描后别名指向的品牌可能已不存在
+                if matched is not None:
+                    patterns.setdefault(self.normalize_text(alias), matched)
+            self.automaton = BrandAutomaton(patterns)
+        return self.automaton
+
+    def detect_brands(self, normalized_name):
+        """在标准化后的文件名中查找品牌，返回出现的品牌名列表"""
+        return self.get_automaton().detect(normalized_name)
+
+    def match_many(self, brand_names):
+        """批量查找匹配的品牌，返回与输入顺序一致的列表，结果与 find_brand_match 相同"""
+        match_token = self.match_token
+        return [match_token(name)[1] if name else None for name in brand_names]
+
+    def get_output_dir(self):
+        """未找到品牌文件的目标文件夹"""
+        if self.output_dir:
+            return Path(self.output_dir)
+        return default_output_dir(self.image_dir)
+
+    def check_images(self, copy_files=True):
+        """
+        检查图片并复制未找到品牌的文件，返回 CheckResult
+
+        以流水线方式运行：遍历目录（线程池）-> 提取品牌并匹配（当前线程）-> 复制（线程池），
+        三个阶段同时进行，阶段之间的缓冲都有上限，未找到品牌的文件一经发现就提交复制，
+        所以内存占用不随文件数或未找到品牌的文件数增长。
+        copy_files 为 False 时只统计，不复制。
+        """
+        result = CheckResult()
+        result.metrics = self.metrics
+        if self.keep_results:
+            result.results = ResultStore(self.image_dir)
+        # 检查过程中界面即可读取（查看、筛选已检查的文件）
+        self.results = result.results
+        self.progress = CheckProgress(result)
+        if self.precount:
+            self.start_precount()
+        self.copy_files = copy_files
+        if self.prune_empty_dirs:
+            self.pruner = EmptyDirPruner(self.image_dir, self.log, self.log_detail)
+        if self.validate:
+            self.validator = ImageValidator(self.validate_workers, self.validate_eof)
+        finished = False
+        try:
+            if self.resume and not self.incremental:
+                self.open_journal(result)
+            self.open_report()
+            self.progress.start_session()
+            with self.metrics.phase("check"):
+                try:
+                    if self.incremental:
+                        self.check_images_incremental(result)
+                    else:
+                        self.check_all_images(result)
+                finally:
+                    self.close_validator()
+                    self.finish_copy(result)
+                    self.close_manifest()
+            finished = not result.cancelled
+            if result.cancelled:
+                self.log(f"检查已停止：已检查 {result.processed_files} 个文件")
+            # 遍历完整结束后才删除空目录（中途出错或停止时目录结构不完整）
+            if finished and self.pruner is not None:
+                self.prune_dirs(result)
+        finally:
+            self.close_journal(finished, result)
+            self.close_report(result, finished)
+            self.pruner = None
+            self.progress.done = True
+            self.collect_metrics(result)
+        return result
+
+    def start_precount(self):
+        """在另一个线程中统计图片总数（与检查同时进行，只列目录），完成后设置 progress.total"""
+        progress = self.progress
+        shard = self.shard
+        skip_dir = shard.skip_dir if shard is not None else None
+        cancelled = self._cancel.is_set
+        progress.counting = True
+
+        def count():
+            counted = 0
+            try:
+                for dir_path, files in iter_dirs(self.image_dir, IMAGE_EXTENSIONS, self.walk_workers,
+                                                 skip_dir=skip_dir):
+                    # 检查已结束或已停止时不再继续统计
+                    if cancelled() or progress.done:
+                        return
+                    # 与检查使用同样的分片判断（hash 方式下每个分片都遍历整棵目录树）
+                    if shard is not None and not shard.owns_dir(dir_path):
+                        continue
+                    counted += len(files)
+                    progress.counted = counted
+                progress.set_total(counted)
+            except OSError:
+                pass
+            finally:
+                progress.counting = False
+
+        threading.Thread(target=count, name="brand-precount", daemon=True).start()
+
+    def iter_image_dirs(self, prefetch_stat=False):
+        """并行遍历图片目录（只返回图片文件），并记录等待遍历结果的时间"""
+        on_dir = self.pruner.add_dir if self.pruner is not None else None
+        shard = self.shard
+        skip_dir = shard.skip_dir if shard is not None else None
+        dirs = iter_dirs(self.image_dir, IMAGE_EXTENSIONS, self.walk_workers, prefetch_stat, on_dir,
+                         skip_dir)
+        for item in self.metrics.timed_iter("traversal_wait", dirs):
+            self.metrics.count("directories_listed")
+            if shard is not None and not shard.owns_dir(item[0]):
+                continue
+            yield item
+
+    def check_all_images(self, result):
+        """检查所有图片"""
+        # 并行遍历所有目录，只返回图片文件（扩展名在遍历时已过滤）
+        journal = self.journal
+        completed = journal.state.completed_dirs if journal is not None else {}
+        store = result.results
+        cancelled = self._cancel.is_set
+        for dir_path, entries in self.iter_image_dirs():
+            if cancelled():
+                result.cancelled = True
+                return
+            if completed and relative_dir(self.image_dir, dir_path) in completed:
+                # 上次中断前已检查完的目录
+                continue
+            counts_before = result_counts(result)
+            start = time.perf_counter()
+            wait = self.wait_time()
+            reasons = self.validate_paths([entry.path for entry in entries])
+            dir_id = store.add_dir(dir_path) if store is not None else None
+            # 处理当前目录下的所有图片文件
+            for entry in entries:
+                if cancelled():
+                    break
+                result.processed_files += 1
+                if reasons is not None:
+                    reason = next(reasons)
+                    if reason is not None:
+                        self.add_invalid(entry.path, reason, result)
+                        if store is not None:
+                            store.add(dir_id, entry.name, reason, VERDICT_INVALID)
+                        continue
+                brand_name, _, verdict, _ = self.check_file(entry.name, entry.path, result)
+                if store is not None:
+                    store.add(dir_id, entry.name, brand_name, verdict)
+            self.add_matching_time(start, wait)
+            if cancelled():
+                # 没检查完的目录不记为已完成，下次重新检查（已分配的文件名不变）
+                result.cancelled = True
+                return
+            if journal is not None:
+                if journal.resumed and self.output_mode == "move":
+                    self.count_moved_before(dir_path, entries, result)
+                self.journal_dir_done(dir_path, counts_before, result)
+
+    def wait_time(self):
+        """等待复制队列和图片校验的累计时间"""
+        phases = self.metrics.phases
+        return phases.get("copy_wait", 0.0) + phases.get("validate_wait", 0.0)
+
+    def add_matching_time(self, start, wait_before):
+        """记录一个目录的匹配时间（不含等待复制队列和图片校验的时间）"""
+        wait = self.wait_time() - wait_before
+        self.metrics.add_time("matching", time.perf_counter() - start - wait)
+
+    def validate_paths(self, paths):
+        """开启图片校验时并发校验一批文件，按顺序产出无效原因（有效为 None）；未开启时返回 None"""
+        if self.validator is None:
+            return None
+        return self.metrics.timed_iter("validate_wait", self.validator.map(paths))
+
+    def check_new_file(self, filename, file_path, result):
+        """检查单个新文件（监控模式），开启图片校验时先在当前线程中校验"""
+        if self.validate:
+            reason = validate_image(file_path, self.validate_eof)
+            if reason is not None:
+                self.add_invalid(file_path, reason, result)
+                return reason, None, VERDICT_INVALID, None
+        return self.check_file(filename, file_path, result)
+
+    def add_invalid(self, file_path, reason, result):
+        """记录一个校验未通过的文件，写入输出目录中的无效图片清单"""
+        result.invalid_files += 1
+        self.log_detail(f"✗ 无效图片: {os.path.basename(file_path)} ({reason})")
+        if self.report is not None:
+            self.report_file(file_path, None, None, VERDICT_INVALID, reason=reason)
+        if self._invalid_writer is None:
+            output_dir = self.get_output_dir()
+            output_dir.mkdir(parents=True, exist_ok=True)
+            path = output_dir / INVALID_REPORT_FILENAME
+            append = self.keep_existing_outputs and path.exists()
+            # utf-8-sig 让 Excel 正确识别中文
+            self._invalid_file = open(path, 'a' if append else 'w', encoding='utf-8-sig', newline='')
+            self._invalid_writer = csv.writer(self._invalid_file)
+            if not append:
+                self._invalid_writer.writerow(["文件", "原因"])
+        self._invalid_writer.writerow([file_path, reason])
+
+    def close_validator(self):
+        """停止校验线程池并关闭无效图片清单"""
+        if self.validator is not None:
+            self.validator.close(cancel=self.cancelled)
+            self.validator = None
+        if self._invalid_file is not None:
+            self._invalid_file.close()
+            self._invalid_file = None
+            self._invalid_writer = None
+
+    def check_file(self, filename, file_path, result):
+        """检查一个图片文件并记入结果，返回 (品牌名, 标准化品牌名, 结论, 复制为的文件名或 None)"""
+        if self.match_mode == MATCH_MODE_SCAN:
+            return self.check_file_scan(filename, file_path, result)
+
+        # 从文件名提取品牌名
+        brand_name = self.extract_brand_from_filename(filename)
+
+        if brand_name:
+            # 查找匹配的品牌（同一个品牌名只标准化一次）
+            normalized, matched_brand = self.match_token(brand_name)
+
+            if matched_brand:
+                # 品牌存在，记录
+                result.found_brand_files += 1
+                if self.detail_enabled:
+                    self.log_detail(f"✓ 找到品牌: {filename} (品牌: {matched_brand})")
+                if self.report is not None:
+                    self.report_file(file_path, brand_name, matched_brand, VERDICT_FOUND)
+                return brand_name, normalized, VERDICT_FOUND, None
+
+            # 品牌不存在，提交复制
+            suggestions = self.suggest_brands(brand_name, normalized, result)
+            if self.detail_enabled:
+                self.log_detail(f"✗ 未找到品牌: {filename} (品牌: {brand_name}){suggestion_hint(suggestions)}")
+            dest_filename = self.add_not_found(file_path, result)
+            if self.report is not None:
+                self.report_file(file_path, brand_name, None, VERDICT_NOT_FOUND, dest_filename,
+                                 suggestions=suggestions)
+            return brand_name, normalized, VERDICT_NOT_FOUND, dest_filename
+
+        # 无法提取品牌名，提交复制
+        if self.detail_enabled:
+            self.log_detail(f"✗ 未找到品牌: {filename} (无法提取品牌名)")
+        dest_filename = self.add_not_found(file_path, result)
+        if self.report is not None:
+            self.report_file(file_path, None, None, VERDICT_NO_BRAND, dest_filename)
+        return None, None, VERDICT_NO_BRAND, dest_filename
+
+    def check_file_scan(self, filename, file_path, result):
+        """
+        在整个文件名中查找品牌（scan 方式），返回 (品牌名, 标准化文件名, 结论, 复制为的文件名或 None)
+        没有找到品牌时仍按原来的规则提取品牌名，用于日志和相近品牌建议
+        """
+        normalized = self.normalize_text(os.path.splitext(filename)[0])
+        brands = self.detect_brands(normalized)
+        if brands:
+            result.found_brand_files += 1
+            if self.detail_enabled:
+                self.log_detail(f"✓ 找到品牌: {filename} (品牌: {', '.join(brands)})")
+            if self.report is not None:
+                # 文件名中出现多个品牌时全部列出
+                self.report_file(file_path, None, ", ".join(brands), VERDICT_FOUND)
+            return brands[0], normalized, VERDICT_FOUND, None
+
+        brand_name = self.extract_brand_from_filename(filename)
+        if brand_name:
+            suggestions = self.suggest_brands(brand_name, self.normalize_text(brand_name), result)
+            self.log_detail(f"✗ 未找到品牌: {filename} (品牌: {brand_name}){suggestion_hint(suggestions)}")
+            dest_filename = self.add_not_found(file_path, result)
+            if self.report is not None:
+                self.report_file(file_path, brand_name, None, VERDICT_NOT_FOUND, dest_filename,
+                                 suggestions=suggestions)
+            return brand_name, normalized, VERDICT_NOT_FOUND, dest_filename
+
+        self.log_detail(f"✗ 未找到品牌: {filename} (无法提取品牌名)")
+        dest_filename = self.add_not_found(file_path, result)
+        if self.report is not None:
+            self.report_file(file_path, None, None, VERDICT_NO_BRAND, dest_filename)
+        return None, normalized, VERDICT_NO_BRAND, dest_filename
+
+    def suggest_brands(self, brand_name, normalized, result):
+        """查找相近品牌并记入结果，返回格式化的相近品牌（例如 Brador(1), Bravo(2)），没有时返回 None"""
+        if not self.suggest:
+            return None
+        suggestions = result.suggestions.get(brand_name)
+        if suggestions is None:
+            if self.suggester is None:
+                self.suggester = BrandSuggester(self.normalized_brands)
+            suggestions = self.suggester.suggest(normalized, self.suggest_top_k)
+            result.suggestions[brand_name] = suggestions
+        if not suggestions:
+            return None
+        return format_suggestions(suggestions)
+
+    def check_images_incremental(self, result):
+        """
+        增量检查：大小和修改时间与清单一致的文件直接使用清单中的结论，
+        只用已保存的标准化品牌名重新查一次品牌（品牌目录变化时结论可能改变）
+        """
+        path = self.manifest_path or default_manifest_path(self.image_dir)
+        self.manifest = Manifest(path, self.manifest_settings()).open()
+        # 预先计数完成前，用清单中上次检查的文件数估计总数
+        previous = self.manifest.file_count()
+        if previous:
+            self.progress.set_total(previous, estimated=True)
+        store = result.results
+        cancelled = self._cancel.is_set
+        for dir_path, entries in self.iter_image_dirs(prefetch_stat=True):
+            if cancelled():
+                result.cancelled = True
+                break
+            start = time.perf_counter()
+            wait = self.wait_time()
+            rel_dir = relative_dir(self.image_dir, dir_path)
+            dir_id = store.add_dir(dir_path) if store is not None else None
+            cached = self.manifest.load_dir(rel_dir)
+            # 先找出未变化的文件，只校验需要重新检查的文件
+            rows = []
+            for entry in entries:
+                st = entry.stat()
+                row = cached.pop(entry.name, None)
+                if row is not None and (row.size != st.st_size or row.mtime_ns != st.st_mtime_ns):
+                    row = None
+                rows.append(row)
+            reasons = self.validate_paths([entry.path for entry, row in zip(entries, rows) if row is None])
+            for entry, row in zip(entries, rows):
+                if cancelled():
+                    break
+                result.processed_files += 1
+                if row is not None:
+                    brand_name, verdict = self.reuse_entry(rel_dir, entry, row, result)
+                    if store is not None:
+                        store.add(dir_id, entry.name, brand_name, verdict)
+                    continue
+                st = entry.stat()
+                if reasons is not None:
+                    reason = next(reasons)
+                    if reason is not None:
+                        self.add_invalid(entry.path, reason, result)
+                        # 无效文件的原因保存在品牌列中
+                        self.manifest.record(rel_dir, entry.name, st.st_size, st.st_mtime_ns,
+                                             reason, None, VERDICT_INVALID)
+                        if store is not None:
+                            store.add(dir_id, entry.name, reason, VERDICT_INVALID)
+                        continue
+                brand_name, normalized, verdict, dest = self.check_file(entry.name, entry.path, result)
+                self.manifest.record(rel_dir, entry.name, st.st_size, st.st_mtime_ns,
+                                     brand_name, normalized, verdict, dest)
+                if store is not None:
+                    store.add(dir_id, entry.name, brand_name, verdict)
+            self.add_matching_time(start, wait)
+            if cancelled():
+                # 没检查完的目录中剩下的文件仍在 cached 中，不能当作已删除
+                result.cancelled = True
+                break
+            # 清单中有、磁盘上已不存在的文件
+            if cached:
+                self.manifest.forget(rel_dir, cached)
+        if result.cancelled:
+            # 已检查的文件已记入清单，不删除本次没有访问到的目录的记录
+            return
+        self.manifest.finish()
+
+        rechecked = result.processed_files - result.unchanged_files - result.reclassified_files
+        message = f"增量检查: {result.unchanged_files} 个文件未变化，"
+        if result.reclassified_files:
+            message += f"{result.reclassified_files} 个文件因品牌目录变化结论改变，"
+        message += f"重新检查 {rechecked} 个文件"
+        if result.outputs_removed:
+            message += f"，删除不再需要的输出 {result.outputs_removed} 个"
+        self.log(message)
+
+    def manifest_settings(self):
+        """
+        影响检查结论的设置，与清单中保存的不同时清单作废
+        清单认为未找到品牌的文件已经输出过，所以输出方式和是否复制也包括在内
+        （--no-copy 检查后再复制检查时，之前记录的文件需要重新检查、复制）
+        """
+        settings = self.match_mode
+        if self.validate:
+            settings += ";validate+eof" if self.validate_eof else ";validate"
+        if self.copy_files:
+            # 清单记录了输出文件名，输出目录改变后这些记录不再适用
+            settings += f";{self.output_mode};{os.path.abspath(self.get_output_dir())}"
+        else:
+            settings += ";no-copy"
+        return settings
+
+    def reuse_entry(self, rel_dir, entry, row, result):
+        """使用清单中未变化文件的记录，品牌目录变化导致结论改变时更新清单；返回 (品牌名, 结论)"""
+        if row.verdict == VERDICT_INVALID:
+            result.unchanged_files += 1
+            self.add_invalid(entry.path, row.brand, result)
+            return row.brand, VERDICT_INVALID
+        verdict = row.verdict
+        brand_name = row.brand
+        normalized = row.normalized
+        matched = None
+        if self.match_mode == MATCH_MODE_SCAN:
+            # 清单中保存的是标准化后的文件名，重新扫描一遍即可
+            brands = self.detect_brands(row.normalized)
+            if brands:
+                # 与 check_file_scan 相同：品牌名为第一个品牌，报告中列出所有品牌
+                verdict, brand_name, matched = VERDICT_FOUND, brands[0], ", ".join(brands)
+            else:
+                brand_name = self.extract_brand_from_filename(entry.name)
+                normalized = self.normalize_text(brand_name) if brand_name else None
+                verdict = VERDICT_NOT_FOUND if brand_name else VERDICT_NO_BRAND
+        elif verdict != VERDICT_NO_BRAND:
+            candidates = self.normalized_brands.get(row.normalized)
+            verdict = VERDICT_FOUND if candidates else VERDICT_NOT_FOUND
+            matched = candidates[0] if candidates else None
+
+        dest_filename = None
+        suggestions = None
+        if verdict == row.verdict:
+            result.unchanged_files += 1
+            if verdict == VERDICT_FOUND:
+                result.found_brand_files += 1
+            else:
+                # 之前已复制过
+                result.unchanged_not_found += 1
+                dest_filename = row.dest
+                if verdict == VERDICT_NOT_FOUND and self.suggest and self.report is not None:
+                    # 报告中未变化的文件也给出相近品牌（scan 方式清单中保存的是标准化后的文件名）
+                    suggestions = self.suggest_brands(brand_name, self.normalize_text(brand_name), result)
+        else:
+            # 结论改变：重新记入结果，并让输出目录与新结论一致
+            result.reclassified_files += 1
+            if verdict == VERDICT_FOUND:
+                result.found_brand_files += 1
+                self.log_detail(f"✓ 找到品牌: {entry.name} (品牌: {matched})")
+                self.manifest.update_verdict(rel_dir, entry.name, verdict)
+                self.remove_stale_output(row.dest, result)
+            else:
+                if verdict == VERDICT_NOT_FOUND:
+                    suggestions = self.suggest_brands(brand_name, normalized, result)
+                    self.log_detail(f"✗ 未找到品牌: {entry.name} (品牌: {brand_name}){suggestion_hint(suggestions)}")
+                else:
+                    self.log_detail(f"✗ 未找到品牌: {entry.name} (无法提取品牌名)")
+                dest_filename = self.reuse_output(row.dest, entry.path, result)
+                self.manifest.update_verdict(rel_dir, entry.name, verdict, dest_filename)
+        if self.report is not None:
+            # scan 方式找到品牌时报告中只列出匹配到的品牌（与 check_file_scan 相同）
+            report_brand = None if self.match_mode == MATCH_MODE_SCAN and verdict == VERDICT_FOUND else brand_name
+            self.report_file(entry.path, report_brand, matched, verdict, dest_filename, suggestions=suggestions)
+        return brand_name, verdict
+
+    def output_path(self, dest_filename):
+        return os.path.join(str(self.get_output_dir()), dest_filename)
+
+    def remove_stale_output(self, dest_filename, result):
+        """
+        文件的结论变为找到品牌：删除上次输出到输出目录的文件
+        移动方式下输出的就是原文件，不删除；去重时还有其他文件使用同一个输出的不删除
+        """
+        if not dest_filename or not self.copy_files or self.output_mode == "move":
+            return
+        if self.manifest.dest_in_use(dest_filename):
+            return
+        try:
+            os.remove(self.output_path(dest_filename))
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            self.log(f"  无法删除已不需要的输出 {dest_filename}: {e}")
+            return
+        result.outputs_removed += 1
+        self.log_detail(f"  已删除不再需要的输出: {dest_filename}")
+
+    def reuse_output(self, dest_filename, file_path, result):
+        """
+        文件的结论变为未找到品牌：上次的输出还在时直接沿用（不再复制一份），否则提交复制；
+        返回复制为的文件名
+        """
+        if dest_filename and self.copy_files and os.path.lexists(self.output_path(dest_filename)):
+            result.not_found_files += 1
+            return dest_filename
+        return self.add_not_found(file_path, result)
+
+    def add_not_found(self, file_path, result):
+        """记录一个未找到品牌的文件，并立即提交复制；返回复制为的文件名（不复制时为 None）"""
+        result.not_found_files += 1
+        dest_filename = None
+        if self.copy_files:
+            if self.copier is None:
+                self.open_copier(result)
+            if self.journal is not None:
+                # 上次中断前已分配文件名的文件沿用原来的文件名，已复制完成的不再复制
+                dest_filename = self.journal.dest_for(file_path)
+                if dest_filename is not None and dest_filename in self.journal.state.copied:
+                    if self.not_found_sink is not None:
+                        self.not_found_sink(file_path, dest_filename)
+                    return dest_filename
+            # 复制队列已满时 submit 会等待，这段时间单独记录
+            with self.metrics.phase("copy_wait"):
+                dest_filename = self.copier.submit(file_path, dest_filename)
+        if self.not_found_sink is not None:
+            self.not_found_sink(file_path, dest_filename)
+        return dest_filename
+
+    def open_copier(self, result):
+        """发现第一个未找到品牌的文件时创建目标文件夹并启动复制线程池"""
+        output_dir = self.get_output_dir()
+        result.output_dir = output_dir
+
+        # 创建文件夹（如果不存在）
+        output_dir.mkdir(parents=True, exist_ok=True)
+        self.log(f"开始{OUTPUT_MODE_NAMES[self.output_mode]}未找到品牌的文件，目标文件夹: {output_dir}")
+
+        # 移动的文件不再占用原目录，删除空目录时计入
+        on_removed = None
+        if self.output_mode == "move" and self.pruner is not None:
+            on_removed = self.pruner.file_removed
+        journal = self.journal
+        # 增量检查时输出目录中是上次（包括中途停止的那次）复制的文件，清单认为它们已复制过，不能覆盖
+        keep_existing = self.keep_existing_outputs or self.incremental
+        # 目标文件名按提交顺序分配，复制由线程池并发完成
+        self.copier = CopyEngine(str(output_dir), self.copy_workers, log=self.log,
+                                 log_detail=self.log_detail,
+                                 keep_existing=keep_existing, dedup=self.dedup,
+                                 mode=self.output_mode, on_removed=on_removed,
+                                 on_assigned=journal.assigned if journal is not None else None,
+                                 on_copied=journal.copied if journal is not None else None)
+        if journal is not None and journal.resumed:
+            self.copier.restore([(journal.absolute_path(rel_path), dest, duplicate)
+                                 for rel_path, (dest, duplicate) in journal.state.assigned.items()])
+
+    def finish_copy(self, result):
+        """等待复制完成并记入结果"""
+        if self.copier is None:
+            return
+        stats = self.copier.close()
+        self.copier = None
+        self.metrics.add_time("copy", stats.elapsed)
+
+        if self.manifest is not None:
+            # 复制失败的文件从清单中删除，下次增量检查时重新处理
+            for file_path in stats.failed_files:
+                self.manifest.forget(relative_dir(self.image_dir, os.path.dirname(file_path)),
+                                     [os.path.basename(file_path)])
+
+        result.copy_stats = stats
+        result.copied_count = stats.copied_count
+        if self.journal is not None:
+            # 上次中断前已复制完成的文件
+            result.copied_count += self.journal.resumed_copies
+        if self.output_mode == "copy":
+            self.log(f"  复制 {stats.copied_count} 个文件，共 {stats.bytes_copied} 字节，"
+                     f"速度 {format_rate(stats.bytes_copied, stats.elapsed)}")
+        elif self.output_mode == "list":
+            self.log(f"  记录 {stats.copied_count} 个文件到对照表，没有写入文件")
+        else:
+            self.log(f"  {OUTPUT_MODE_NAMES[self.output_mode]} {stats.copied_count} 个文件，"
+                     f"其中 {stats.fallback_count} 个改为复制（{stats.bytes_copied} 字节）")
+        if self.dedup:
+            self.log(f"  内容重复未复制 {stats.duplicate_count} 个文件（{stats.bytes_deduplicated} 字节），"
+                     f"计算哈希 {stats.hashed_files} 个文件")
+
+    def open_report(self):
+        """打开检查结果报告（设置了 report_path 时）"""
+        if self.report_path and self.report is None:
+            keep = None
+            journal = self.journal
+            if journal is not None and journal.resumed:
+                # 继续上次中断的检查：保留已检查完的目录的行（这些目录不会再检查）
+                completed = journal.state.completed_dirs
+                image_dir = self.image_dir
+
+                def keep(path):
+                    return relative_dir(image_dir, os.path.dirname(path)) in completed
+            self.report = ReportWriter(self.report_path, self.report_format, keep)
+            self.log(f"检查结果报告: {self.report.path}（{self.report.format}）")
+            if self.report.kept:
+                self.log(f"  保留上次检查的 {self.report.kept} 行")
+
+    def report_file(self, file_path, brand, matched, verdict, dest_filename=None, reason=None, suggestions=None):
+        """把一个文件的结论写入报告"""
+        self.report.add(file_path, brand, matched, VERDICT_NAMES[verdict], dest_filename, reason, suggestions)
+
+    def close_report(self, result, finished=True):
+        """写完并关闭报告"""
+        if self.report is None:
+            return
+        self.report.close({
+            "image_dir": os.path.abspath(self.image_dir),
+            "brand_dir": os.path.abspath(self.brand_dir),
+            "match_mode": self.match_mode,
+            "output_mode": self.output_mode,
+            "output_dir": result.output_dir or "",
+            "completed": int(finished),
+        })
+        self.report = None
+
+    def journal_settings(self):
+        """继续上次中断的检查时需要保持不变的设置"""
+        settings = self.manifest_settings()
+        if self.dedup:
+            settings += ";dedup"
+        return settings
+
+    def brand_fingerprint(self):
+        """
+        品牌表的指纹（所有品牌名和别名的 CRC32），品牌或别名变化后不同
+        按内容计算，品牌索引、品牌目录服务和直接扫描得到的同一个品牌表指纹相同
+        """
+        crc = 0
+        for brand in sorted(self.brands):
+            crc = zlib.crc32(brand.encode('utf-8', 'surrogatepass') + b'\0', crc)
+        for alias, brand in sorted(self.aliases.items()):
+            crc = zlib.crc32(f"{alias}\t{brand}".encode('utf-8', 'surrogatepass') + b'\0', crc)
+        return f"{len(self.brands)}:{crc:08x}"
+
+    def open_journal(self, result):
+        """打开检查进度记录；有上次中断的进度时计入已完成目录的结果，并重新提交没有复制完的文件"""
+        output_dir = self.get_output_dir()
+        output_dir.mkdir(parents=True, exist_ok=True)
+        header = {
+            "version": JOURNAL_VERSION,
+            "image_dir": os.path.abspath(self.image_dir),
+            "brand_dir": os.path.abspath(self.brand_dir),
+            "brands": self.brand_fingerprint(),
+            "settings": self.journal_settings(),
+        }
+        journal = ProgressJournal(str(output_dir), os.path.abspath(self.image_dir), header, log=self.log)
+        self.journal = journal
+        if not journal.resumed:
+            return
+        state = journal.state
+        self.log(f"从上次中断处继续：已检查完 {len(state.completed_dirs)} 个目录，"
+                 f"已{OUTPUT_MODE_NAMES[self.output_mode]} {len(state.copied)} 个文件")
+        self.metrics.set("dirs_resumed", len(state.completed_dirs))
+        for processed, found, not_found, invalid in state.completed_dirs.values():
+            result.processed_files += processed
+            result.found_brand_files += found
+            result.not_found_files += not_found
+            result.invalid_files += invalid
+        if self.validate:
+            self.restore_invalid_report(state.completed_dirs)
+        if not state.assigned or not self.copy_files:
+            return
+
+        self.open_copier(result)
+        for rel_path, (dest, duplicate) in state.assigned.items():
+            if duplicate or dest in state.copied:
+                continue
+            file_path = journal.absolute_path(rel_path)
+            if relative_dir(self.image_dir, os.path.dirname(file_path)) not in state.completed_dirs:
+                # 未检查完的目录会重新检查，到时再提交
+                continue
+            if (self.output_mode == "move" and not os.path.exists(file_path)
+                    and os.path.exists(os.path.join(self.copier.output_dir, dest))):
+                # 移动完成后、记录之前中断
+                journal.copied(file_path, dest)
+                journal.resumed_copies += 1
+                continue
+            self.copier.submit(file_path, dest)
+
+    def count_moved_before(self, dir_path, entries, result):
+        """移动方式下，目录中上次中断前已移走的文件不会再列出，按进度记录计入结果"""
+        journal = self.journal
+        names = {entry.name for entry in entries}
+        for file_path, dest in journal.assigned_in_dir(dir_path):
+            if os.path.basename(file_path) in names:
+                continue
+            if dest not in journal.state.copied:
+                if not os.path.exists(os.path.join(str(self.get_output_dir()), dest)):
+                    continue
+                # 移动完成后、记录之前中断
+                journal.copied(file_path, dest)
+                journal.resumed_copies += 1
+            result.processed_files += 1
+            result.not_found_files += 1
+
+    def restore_invalid_report(self, completed_dirs):
+        """无效图片清单只保留已检查完的目录中的文件（其余目录会重新检查），之后追加写入"""
+        path = self.get_output_dir() / INVALID_REPORT_FILENAME
+        rows = []
+        try:
+            with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+                rows = [row for row in list(csv.reader(f))[1:]
+                        if len(row) == 2 and relative_dir(self.image_dir, os.path.dirname(row[0])) in completed_dirs]
+        except OSError:
+            # 上次没有发现无效图片
+            return
+        self._invalid_file = open(path, 'w', encoding='utf-8-sig', newline='')
+        self._invalid_writer = csv.writer(self._invalid_file)
+        self._invalid_writer.writerow(["文件", "原因"])
+        self._invalid_writer.writerows(rows)
+
+    def journal_dir_done(self, dir_path, counts_before, result):
+        """记录一个目录已检查完（先把无效图片清单和报告写入文件，保证记录中的目录在其中完整）"""
+        if self._invalid_file is not None:
+            self._invalid_file.flush()
+        if self.report is not None:
+            self.report.flush()
+        counts = [after - before for after, before in zip(result_counts(result), counts_before)]
+        self.journal.dir_done(relative_dir(self.image_dir, dir_path), counts)
+
+    def close_journal(self, finished, result):
+        """关闭检查进度记录；检查完整结束时删除记录（输出目录中没有其他文件时一并删除）"""
+        if self.journal is None:
+            return
+        self.journal.close(finished)
+        self.journal = None
+        if finished and result.output_dir is None:
+            try:
+                self.get_output_dir().rmdir()
+            except OSError:
+                pass
+
+    def prune_dirs(self, result):
+        """删除检查时记录下的空目录"""
+        # 输出目录在图片目录内时不删除（遍历时可能还是空的）
+        self.pruner.remaining.pop(os.path.normpath(str(self.get_output_dir())), None)
+        with self.metrics.phase("prune"):
+            result.pruned_dirs = self.pruner.prune()
+        self.log(f"  删除 {result.pruned_dirs} 个空目录")
+
+    def collect_metrics(self, result):
+        """把本次检查的计数和缓存命中率记入 metrics"""
+        metrics = self.metrics
+        metrics.set("brands_loaded", len(self.brands))
+        metrics.set("files_processed", result.processed_files)
+        metrics.set("files_found", result.found_brand_files)
+        metrics.set("files_not_found", result.not_found_count)
+        metrics.set("files_unchanged", result.unchanged_files)
+        if self.incremental:
+            metrics.set("files_reclassified", result.reclassified_files)
+            metrics.set("outputs_removed", result.outputs_removed)
+        metrics.set("dirs_pruned", result.pruned_dirs)
+        if self.validate:
+            metrics.set("files_invalid", result.invalid_files)
+        metrics.set("files_per_second", metrics.rate(result.processed_files, metrics.phases.get("check")))
+
+        stats = result.copy_stats
+        metrics.set("files_copied", stats.copied_count if stats else 0)
+        metrics.set("copy_failures", stats.failed_count if stats else 0)
+        metrics.set("bytes_copied", stats.bytes_copied if stats else 0)
+        metrics.set("copy_bytes_per_second", stats.bytes_per_second if stats else 0)
+        if self.output_mode != "copy":
+            metrics.set("files_linked", stats.linked_count if stats else 0)
+            metrics.set("files_moved", stats.moved_count if stats else 0)
+            metrics.set("copy_fallbacks", stats.fallback_count if stats else 0)
+        if self.dedup:
+            metrics.set("files_deduplicated", stats.duplicate_count if stats else 0)
+            metrics.set("bytes_deduplicated", stats.bytes_deduplicated if stats else 0)
+            metrics.set("dedup_files_hashed", stats.hashed_files if stats else 0)
+
+        cache = self.match_token.cache_info()
+        metrics.set("match_cache_hits", cache.hits)
+        metrics.set("match_cache_misses", cache.misses)
+        metrics.set("match_cache_hit_ratio", metrics.rate(cache.hits, cache.hits + cache.misses))
+        if self.brand_index is not None:
+            index = self.brand_index
+            metrics.set("brand_index_categories_rescanned", index.rescanned)
+            metrics.set("brand_index_categories_reused", index.reused)
+            metrics.set("brand_index_hit_ratio", metrics.rate(index.reused, index.reused + index.rescanned))
+        if self.catalog is not None:
+            metrics.set("catalog_requests", self.catalog.requests)
+        if self.incremental:
+            metrics.set("manifest_hit_ratio", metrics.rate(result.unchanged_files + result.reclassified_files,
+                                                           result.processed_files))
+
+    def prepare(self):
+        """
+        检查目录设置并扫描品牌
+        无法进行检查时抛出 BrandCheckError
+        """
+        if not self.image_dir:
+            raise BrandCheckError("请先选择图片根目录")
+        if not self.brand_dir:
+            raise BrandCheckError("请先选择品牌根目录")
+
+        self.log("正在扫描品牌目录...")
+        with self.metrics.phase("brand_scan"):
+            scanned = self.scan_brands()
+        if not scanned:
+            raise BrandCheckError("扫描品牌目录失败，请检查品牌根目录是否正确")
+        if not self.brands:
+            raise BrandCheckError("品牌目录下没有找到任何品牌子目录")
+        if self.catalog is not None:
+            self.log(f"品牌表来自品牌目录服务（第 {self.catalog_generation} 版）: {self.catalog_socket}")
+        elif self.brand_index is not None:
+            self.log(f"品牌索引: 重新扫描 {self.brand_index.rescanned} 个品类，"
+                     f"使用缓存 {self.brand_index.reused} 个品类")
+        self.load_aliases()
+        self.load_filename_rules()
+        self.log(f"已加载 {len(self.brands)} 个品牌，开始处理图片...")
+
+        if not Path(self.image_dir).exists():
+            raise BrandCheckError("图片目录不存在")
+
+    def run(self, copy_files=True):
+        """
+        完整执行一次检查：扫描品牌 -> 匹配图片 -> 复制未找到品牌的文件
+        无法进行检查时抛出 BrandCheckError
+        """
+        self.prepare()
+        return self.check_images(copy_files)
+
+    def close_manifest(self):
+        """关闭增量检查清单"""
+        if self.manifest is not None:
+            self.manifest.close()
+            self.manifest = None
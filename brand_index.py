@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+品牌索引缓存
+把扫描得到的品牌名（原始名和标准化名）保存到品牌根目录旁边的文件中，
+下次启动时只重新扫描修改时间发生变化的第二级目录（品类目录）
+"""
+
+import json
+import os
+from pathlib import Path
+
+
+# 索引文件格式版本，格式变化时旧文件自动作废
+INDEX_VERSION = 1
+# 默认索引文件名：品牌根目录旁边的 .<目录名>.brand-index.json
+INDEX_FILE_TEMPLATE = ".{name}.brand-index.json"
+
+
+def default_index_path(brand_dir):
+    """默认索引文件路径"""
+    brand_path = Path(brand_dir)
+    return brand_path.parent / INDEX_FILE_TEMPLATE.format(name=brand_path.name)
+
+
+class BrandIndex:
+    """
+    带修改时间校验的品牌索引
+
+    categories: {品类目录名: {"mtime_ns": 修改时间, "brands": [品牌名...], "normalized": [标准化名...]}}
+    第二级目录里增加、删除或重命名品牌目录时，该目录的修改时间会变化，
+    所以热启动时每个品类只需要一次 stat。
+    """
+
+    def __init__(self, brand_dir, normalize, index_path=None):
+        self.brand_dir = str(brand_dir)
+        self.normalize = normalize
+        self.index_path = Path(index_path) if index_path else default_index_path(brand_dir)
+        self.categories = {}
+        self.brands = set()
+        self.normalized_brands = {}
+        self.rescanned = 0  # 本次重新扫描的品类数
+        self.reused = 0  # 本次直接使用缓存的品类数
+        self.changed = False  # 与缓存相比是否有变化
+
+    def load(self):
+        """读取索引文件，文件不存在、损坏或不属于当前品牌根目录时返回 False"""
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get("version") != INDEX_VERSION or data.get("root") != os.path.abspath(self.brand_dir):
+            return False
+        self.categories = data.get("categories", {})
+        return True
+
+    def save(self):
+        """写入索引文件（先写临时文件再替换，避免写到一半的文件）"""
+        data = {
+            "version": INDEX_VERSION,
+            "root": os.path.abspath(self.brand_dir),
+            "categories": self.categories,
+        }
+        tmp_path = self.index_path.with_name(self.index_path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, self.index_path)
+
+    def scan_category(self, path):
+        """扫描一个品类目录，返回其中的品牌目录名（第三级目录）"""
+        brands = []
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.is_dir():
+                    brands.append(entry.name)
+        return brands
+
+    def refresh(self):
+        """
+        与磁盘上的品牌目录同步：修改时间不变的品类直接使用缓存
+        返回 True 表示成功；品牌根目录不存在时返回 False
+        """
+        if not os.path.isdir(self.brand_dir):
+            return False
+
+        old = self.categories
+        categories = {}
+        self.rescanned = 0
+        self.reused = 0
+
+        with os.scandir(self.brand_dir) as it:
+            entries = sorted((e for e in it if e.is_dir()), key=lambda e: e.name)
+
+        for entry in entries:
+            mtime_ns = entry.stat().st_mtime_ns
+            cached = old.get(entry.name)
+            if cached is not None and cached.get("mtime_ns") == mtime_ns:
+                categories[entry.name] = cached
+                self.reused += 1
+                continue
+            brands = self.scan_category(entry.path)
+            categories[entry.name] = {
+                "mtime_ns": mtime_ns,
+                "brands": brands,
+                "normalized": [self.normalize(brand) for brand in brands],
+            }
+            self.rescanned += 1
+
+        self.changed = self.rescanned > 0 or set(categories) != set(old)
+        self.categories = categories
+        self.build_lookup()
+        return True
+
+    def build_lookup(self):
+        """根据品类缓存生成 brands 集合和 标准化名 -> [原始品牌名] 映射"""
+        self.brands = set()
+        self.normalized_brands = {}
+        for category in self.categories.values():
+            for brand, normalized in zip(category["brands"], category["normalized"]):
+                if brand in self.brands:
+                    continue
+                self.brands.add(brand)
+                self.normalized_brands.setdefault(normalized, []).append(brand)
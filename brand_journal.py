@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+检查进度记录（预写日志）
+长时间的检查中途退出（进程被结束、关闭窗口）后，下次检查可以从中断处继续。
+记录文件写在输出目录中，每行一个 JSON，只追加写入：
+  - 未找到品牌的文件在提交复制之前，先记录分配的目标文件名
+  - 复制完成后记录目标文件名
+  - 一个目录中的文件全部检查完后，记录该目录的计数
+每行写入后立即交给操作系统，每隔 SYNC_INTERVAL 秒 fsync 一次；最后一行不完整（写到一半时中断）时丢弃。
+继续检查时跳过已完成的目录，已分配过文件名的文件仍使用原来的文件名，已复制完成的不再复制，
+所以输出目录中不会出现同一个文件的多个副本。检查完整结束后删除记录文件
+"""
+
+import json
+import os
+import threading
+import time
+
+
+JOURNAL_FILENAME = "_检查进度.jsonl"
+JOURNAL_VERSION = 1
+# 两次 fsync 之间的最长间隔（秒）
+SYNC_INTERVAL = 1.0
+
+
+class JournalState:
+    """从记录文件中读出的进度"""
+
+    def __init__(self):
+        self.completed_dirs = {}  # 相对目录 -> [处理文件数, 找到品牌数, 未找到品牌数, 无效图片数]
+        self.assigned = {}  # 文件相对路径 -> (目标文件名, 是否为内容重复的文件)，按分配顺序
+        self.copied = set()  # 已复制完成的目标文件名
+
+
+def read_journal(path):
+    """
+    读取记录文件，返回 (第一行的检查信息, JournalState, 完整内容的字节数)
+    文件不存在或第一行无法解析时返回 (None, None, 0)
+    """
+    state = JournalState()
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        return None, None, 0
+    with f:
+        line = f.readline()
+        try:
+            header = json.loads(line)
+        except ValueError:
+            return None, None, 0
+        valid_size = len(line)
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            if "a" in record:
+                state.assigned.setdefault(record["a"], (record["d"], bool(record.get("dup"))))
+            elif "c" in record:
+                state.copied.add(record["c"])
+            elif "dir" in record:
+                state.completed_dirs[record["dir"]] = record["n"]
+            valid_size += len(line)
+    return header, state, valid_size
+
+
+class ProgressJournal:
+    """
+    检查进度记录
+    header 描述本次检查（图片目录、品牌目录和品牌表指纹、设置），与记录文件中的不同时不能继续，重新开始记录
+    """
+
+    def __init__(self, output_dir, image_dir, header, log=None):
+        self.path = os.path.join(output_dir, JOURNAL_FILENAME)
+        self.image_dir = image_dir
+        old_header, state, valid_size = read_journal(self.path)
+        self.resumed = state is not None and old_header == header
+        if old_header is not None and not self.resumed and log is not None:
+            log("进度记录与本次检查的目录、品牌或设置不同，重新开始检查")
+        self.state = state if self.resumed else JournalState()
+        self.resumed_copies = len(self.state.copied)
+        self._assigned_by_dir = None
+        self._lock = threading.Lock()
+        self._last_sync = time.monotonic()
+        if self.resumed:
+            self._file = open(self.path, 'r+b')
+            # 去掉中断时写到一半的最后一行
+            self._file.truncate(valid_size)
+            self._file.seek(valid_size)
+        else:
+            self._file = open(self.path, 'wb')
+            self._write(header)
+
+    def relative_path(self, file_path):
+        return os.path.relpath(file_path, self.image_dir).replace(os.sep, '/')
+
+    def absolute_path(self, rel_path):
+        return os.path.join(self.image_dir, *rel_path.split('/'))
+
+    def dest_for(self, file_path):
+        """上次检查为该文件分配的目标文件名，没有时返回 None"""
+        entry = self.state.assigned.get(self.relative_path(file_path))
+        return entry[0] if entry is not None else None
+
+    def assigned_in_dir(self, dir_path):
+        """上次检查在该目录中分配过文件名的文件，返回 [(文件路径, 目标文件名)]（不含内容重复的文件）"""
+        if self._assigned_by_dir is None:
+            self._assigned_by_dir = {}
+            for rel_path, (dest, duplicate) in self.state.assigned.items():
+                if not duplicate:
+                    rel_dir = rel_path.rpartition('/')[0]
+                    self._assigned_by_dir.setdefault(rel_dir, []).append((rel_path, dest))
+        rel_dir = self.relative_path(dir_path)
+        entries = self._assigned_by_dir.get('' if rel_dir == '.' else rel_dir, ())
+        return [(self.absolute_path(rel_path), dest) for rel_path, dest in entries]
+
+    def assigned(self, file_path, dest_filename, duplicate=False):
+        """记录分配的目标文件名（在提交复制之前调用）"""
+        record = {"a": self.relative_path(file_path), "d": dest_filename}
+        if duplicate:
+            record["dup"] = 1
+        self._write(record)
+
+    def copied(self, file_path, dest_filename):
+        """记录复制完成（可在复制线程中调用）"""
+        self._write({"c": dest_filename})
+
+    def dir_done(self, rel_dir, counts):
+        """记录一个目录已检查完"""
+        self._write({"dir": rel_dir, "n": list(counts)})
+
+    def _write(self, record):
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode('utf-8')
+        with self._lock:
+            self._file.write(line)
+            # 交给操作系统，进程退出后不会丢失；断电保护依靠定期 fsync
+            self._file.flush()
+            now = time.monotonic()
+            if now - self._last_sync >= SYNC_INTERVAL:
+                os.fsync(self._file.fileno())
+                self._last_sync = now
+
+    def close(self, finished=False):
+        """关闭记录文件；finished 为 True（检查完整结束）时删除"""
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.close()
+        if finished:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
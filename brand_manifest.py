@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+增量检查清单
+用 SQLite 记录每个已检查图片的路径、大小、修改时间、提取的品牌、检查结论和复制为的文件名，
+下次检查时大小和修改时间都没变的文件直接使用记录的结论
+"""
+
+import os
+import sqlite3
+from pathlib import Path
+
+
+# 清单格式版本，格式变化时旧清单自动重建
+MANIFEST_VERSION = 1
+# 默认清单文件名：图片根目录旁边的 .<目录名>.brand-manifest.sqlite
+MANIFEST_FILE_TEMPLATE = ".{name}.brand-manifest.sqlite"
+# 累积多少条写入后提交一次
+COMMIT_BATCH_SIZE = 5000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS files (
+    dir TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    brand TEXT,
+    normalized TEXT,
+    verdict INTEGER NOT NULL,
+    dest TEXT,
+    PRIMARY KEY (dir, name)
+) WITHOUT ROWID;
+"""
+
+
+def default_manifest_path(image_dir):
+    """默认清单文件路径"""
+    image_path = Path(image_dir)
+    return image_path.parent / MANIFEST_FILE_TEMPLATE.format(name=image_path.name)
+
+
+class ManifestEntry:
+    """清单中的一条文件记录"""
+
+    __slots__ = ('size', 'mtime_ns', 'brand', 'normalized', 'verdict', 'dest')
+
+    def __init__(self, size, mtime_ns, brand, normalized, verdict, dest=None):
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.brand = brand
+        self.normalized = normalized
+        self.verdict = verdict
+        self.dest = dest  # 复制到输出目录的文件名（未复制或旧清单中没有记录时为 None）
+
+
+class Manifest:
+    """
+    已检查图片的清单
+
+    目录使用相对于图片根目录的路径保存，图片根目录整体移动后清单仍然有效。
+    只应在一个线程中使用。
+    """
+
+    def __init__(self, path, settings="token"):
+        self.path = str(path)
+        self.settings = settings
+        self.conn = None
+        self._pending = 0
+
+    def open(self):
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        row = None
+        try:
+            row = self.conn.execute("SELECT value FROM meta WHERE key='version'").fetchone()
+        except sqlite3.OperationalError:
+            pass
+        if row is not None and row[0] != str(MANIFEST_VERSION):
+            self.conn.executescript("DROP TABLE IF EXISTS files; DROP TABLE IF EXISTS meta;")
+        self.conn.executescript(_SCHEMA)
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(files)")]
+        if "dest" not in columns:
+            # 旧清单没有 dest 列：补上，已记录的文件保持有效（输出文件名未知）
+            self.conn.execute("ALTER TABLE files ADD COLUMN dest TEXT")
+        # 结论改变时按输出文件名查找是否还有其他文件（去重时）使用同一个输出
+        self.conn.execute("CREATE INDEX IF NOT EXISTS files_dest ON files (dest) WHERE dest IS NOT NULL")
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)",
+                          (str(MANIFEST_VERSION),))
+        # 品牌识别方式或图片校验设置改变后，已保存的结论不再适用，重新检查所有文件
+        row = self.conn.execute("SELECT value FROM meta WHERE key='settings'").fetchone()
+        if row is not None and row[0] != self.settings:
+            self.conn.execute("DELETE FROM files")
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('settings', ?)",
+                          (self.settings,))
+        # 记录本次检查访问过的目录，结束时删除已不存在目录的记录
+        self.conn.execute("CREATE TEMP TABLE visited (dir TEXT PRIMARY KEY)")
+        return self
+
+    def load_dir(self, rel_dir):
+        """读取一个目录下所有文件的记录，返回 {文件名: ManifestEntry}"""
+        self.conn.execute("INSERT OR IGNORE INTO visited (dir) VALUES (?)", (rel_dir,))
+        rows = self.conn.execute(
+            "SELECT name, size, mtime_ns, brand, normalized, verdict, dest FROM files WHERE dir = ?",
+            (rel_dir,))
+        return {row[0]: ManifestEntry(*row[1:]) for row in rows}
+
+    def record(self, rel_dir, name, size, mtime_ns, brand, normalized, verdict, dest=None):
+        """写入（或覆盖）一条文件记录"""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO files (dir, name, size, mtime_ns, brand, normalized, verdict, dest) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (rel_dir, name, size, mtime_ns, brand, normalized, verdict, dest))
+        self._tick()
+
+    def update_verdict(self, rel_dir, name, verdict, dest=None):
+        """只更新结论和输出文件名（品牌目录变化导致结论改变时）"""
+        self.conn.execute("UPDATE files SET verdict = ?, dest = ? WHERE dir = ? AND name = ?",
+                          (verdict, dest, rel_dir, name))
+        self._tick()
+
+    def dest_in_use(self, dest):
+        """是否还有文件记录使用这个输出文件（去重时多个内容相同的文件共用一个输出）"""
+        return self.conn.execute("SELECT 1 FROM files WHERE dest = ? LIMIT 1", (dest,)).fetchone() is not None
+
+    def forget(self, rel_dir, names):
+        """删除指定文件的记录（文件已删除，或需要下次重新检查）"""
+        self.conn.executemany("DELETE FROM files WHERE dir = ? AND name = ?",
+                              [(rel_dir, name) for name in names])
+        self._tick()
+
+    def file_count(self):
+        """清单中的文件数（上次检查的文件数，用于估计总数）"""
+        return self.conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def finish(self):
+        """删除本次没有访问到的目录（已被删除）的记录，并提交"""
+        self.conn.execute("DELETE FROM files WHERE dir NOT IN (SELECT dir FROM visited)")
+        self.conn.commit()
+        self._pending = 0
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.commit()
+            self.conn.close()
+            self.conn = None
+
+    def _tick(self):
+        self._pending += 1
+        if self._pending >= COMMIT_BATCH_SIZE:
+            self.conn.commit()
+            self._pending = 0
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def relative_dir(root, dir_path):
+    """目录相对于图片根目录的路径（根目录本身为 '.'）"""
+    return os.path.relpath(dir_path, root)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运行指标
+记录每个阶段的耗时和计数，导出为 JSON 摘要或 Prometheus textfile（node_exporter 的 textfile collector）
+
+流水线中遍历、匹配、复制同时进行，各阶段耗时含义：
+  brand_scan      扫描品牌目录（或使用品牌索引）的时间
+  traversal_wait  等待目录遍历结果的时间（越大说明遍历是瓶颈）
+  matching        提取品牌名并匹配的时间
+  copy            从开始复制到全部复制完成的时间
+  copy_wait       提交复制时因复制队列已满而等待的时间（越大说明复制是瓶颈）
+  validate_wait   等待图片校验结果的时间（开启图片校验时）
+  check           遍历、匹配、复制整体的时间
+  prune           检查完成后删除空目录的时间
+"""
+
+import json
+import os
+import time
+from contextlib import contextmanager
+
+
+# Prometheus 指标名前缀
+METRIC_PREFIX = "brand_check"
+
+
+class RunMetrics:
+    """一次检查的耗时和计数"""
+
+    def __init__(self):
+        self.phases = {}  # 阶段名 -> 秒
+        self.counters = {}  # 指标名 -> 数值
+
+    def add_time(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, phase):
+        """计时上下文：with metrics.phase("brand_scan"): ..."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(phase, time.perf_counter() - start)
+
+    def timed_iter(self, phase, iterable):
+        """逐项产出 iterable 的元素，把等待每一项的时间记到 phase"""
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add_time(phase, time.perf_counter() - start)
+                return
+            self.add_time(phase, time.perf_counter() - start)
+            yield item
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def set(self, name, value):
+        self.counters[name] = value
+
+    def rate(self, numerator, denominator):
+        """计算比率类指标，分母为 0 时返回 None"""
+        return numerator / denominator if denominator else None
+
+    def to_dict(self):
+        return {
+            "phases_seconds": {name: round(value, 6) for name, value in self.phases.items()},
+            "counters": dict(self.counters),
+            "timestamp": time.time(),
+        }
+
+    def write_json(self, path):
+        """写入 JSON 摘要"""
+        _atomic_write(path, json.dumps(self.to_dict(), ensure_ascii=False, indent=2) + "\n")
+
+    def to_prometheus(self, labels=None):
+        """Prometheus 文本格式"""
+        label_text = _format_labels(labels or {})
+        lines = [
+            f"# HELP {METRIC_PREFIX}_phase_seconds Wall time of each check phase in seconds.",
+            f"# TYPE {METRIC_PREFIX}_phase_seconds gauge",
+        ]
+        for name, value in sorted(self.phases.items()):
+            lines.append(f"{METRIC_PREFIX}_phase_seconds{_format_labels(dict(labels or {}, phase=name))} {value:.6f}")
+        for name, value in sorted(self.counters.items()):
+            if value is None:
+                continue
+            metric = f"{METRIC_PREFIX}_{name}"
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric}{label_text} {_format_value(value)}")
+        lines.append(f"# TYPE {METRIC_PREFIX}_last_run_timestamp_seconds gauge")
+        lines.append(f"{METRIC_PREFIX}_last_run_timestamp_seconds{label_text} {time.time():.0f}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path, labels=None):
+        """写入 Prometheus textfile（先写临时文件再替换，避免采集到写了一半的文件）"""
+        _atomic_write(path, self.to_prometheus(labels))
+
+
+def _format_value(value):
+    """整数原样输出，避免大计数被科学计数法截断精度"""
+    if isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    parts = []
+    for key, value in sorted(labels.items()):
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{escaped}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _atomic_write(path, text):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
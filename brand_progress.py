@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+检查进度
+总文件数来自检查开始时在另一个线程中进行的预先计数（只列目录，不检查文件），
+计数完成前可以先用增量检查清单中上次的文件数作为估计。
+速度按最近一段时间内处理的文件数计算（继续上次中断的检查时不包括上次已检查的文件），
+剩余时间 = 剩余文件数 / 速度
+"""
+
+import threading
+import time
+from collections import deque
+
+
+# 计算速度时使用最近多少秒内的进度
+RATE_WINDOW_SECONDS = 30.0
+# 两次记录进度之间的最短间隔（秒）
+SAMPLE_INTERVAL = 0.5
+
+
+class CheckProgress:
+    """
+    一次检查的进度（检查线程写入，界面线程读取）
+    processed 直接读取 CheckResult.processed_files（继续检查时包含上次已检查完的目录），
+    完成比例按它计算；速度只按 start_session() 之后检查的文件计算
+    """
+
+    def __init__(self, result):
+        self.result = result
+        self.total = None  # 总文件数，未知时为 None
+        self.estimated = False  # total 是否为估计值
+        self.counting = False  # 是否在预先计数
+        self.counted = 0  # 预先计数已找到的文件数
+        self.done = False  # 检查已结束（包括停止）
+        self.started = time.monotonic()
+        self.baseline = 0  # 本次开始检查前已计入的文件数（上次已检查完的目录）
+        self._samples = deque()
+        self._lock = threading.Lock()
+
+    @property
+    def processed(self):
+        return self.result.processed_files
+
+    def start_session(self):
+        """开始检查文件（已计入上次中断前的结果之后调用），之后的速度只计算本次检查的文件"""
+        with self._lock:
+            self.baseline = self.processed
+            self.started = time.monotonic()
+            self._samples.clear()
+
+    def set_total(self, total, estimated=False):
+        """设置总文件数；已有准确的总数时忽略估计值"""
+        if estimated and self.total is not None and not self.estimated:
+            return
+        self.total = total
+        self.estimated = estimated
+
+    def fraction(self):
+        """已完成的比例（0～1），总数未知时为 None"""
+        if not self.total:
+            return None
+        return min(1.0, self.processed / self.total)
+
+    def rate(self):
+        """最近的处理速度（文件/秒）"""
+        with self._lock:
+            now = time.monotonic()
+            # 在锁内读取，start_session() 之后的记录不会包含上次已检查的文件
+            processed = self.processed
+            samples = self._samples
+            if not samples or now - samples[-1][0] >= SAMPLE_INTERVAL:
+                samples.append((now, processed))
+            while len(samples) > 2 and now - samples[0][0] > RATE_WINDOW_SECONDS:
+                samples.popleft()
+            first_time, first_processed = samples[0]
+            if now - first_time < SAMPLE_INTERVAL:
+                # 刚开始时按本次检查的平均速度计算
+                first_time, first_processed = self.started, self.baseline
+        elapsed = now - first_time
+        return (processed - first_processed) / elapsed if elapsed > 0 else 0.0
+
+    def eta(self, rate=None):
+        """预计剩余秒数，总数或速度未知时为 None"""
+        if not self.total:
+            return None
+        rate = self.rate() if rate is None else rate
+        if rate <= 0:
+            return None
+        return max(0, self.total - self.processed) / rate
+
+    def describe(self):
+        """界面上显示的一行进度文字"""
+        processed = self.processed
+        rate = self.rate()
+        if self.total:
+            text = f"已检查 {processed:,} / {'约 ' if self.estimated else ''}{self.total:,} 个文件"
+            text += f"（{self.fraction():.0%}）"
+        elif self.counting:
+            text = f"已检查 {processed:,} 个文件（正在统计总数，已找到 {self.counted:,} 个）"
+        else:
+            text = f"已检查 {processed:,} 个文件"
+        text += f"，每秒 {rate:,.0f} 个"
+        eta = self.eta(rate)
+        if eta is not None:
+            text += f"，预计剩余 {format_duration(eta)}"
+        return text
+
+
+def format_duration(seconds):
+    """把秒数格式化为 1小时02分 / 3分05秒 / 12秒"""
+    seconds = int(seconds + 0.5)
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours}小时{minutes:02d}分"
+    if minutes:
+        return f"{minutes}分{secs:02d}秒"
+    return f"{secs}秒"
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+检查结果报告
+检查过程中逐个文件写出结论（文件路径、提取的品牌名、匹配到的品牌、结论、复制为、无效原因、相近品牌），
+写入有缓冲，不在内存中累积。支持三种格式：
+
+  csv     UTF-8（带 BOM，Excel 可直接打开）
+  jsonl   每行一个 JSON 对象
+  sqlite  files 表，brand、matched、verdict 列建有索引，例如：
+          SELECT brand, COUNT(*) FROM files WHERE verdict = 'not_found' GROUP BY brand ORDER BY 2 DESC
+
+继续上次中断的检查时，旧报告中已检查完的目录的行保留下来（keep），其余目录重新检查后再写入
+"""
+
+import csv
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+
+REPORT_FORMATS = ("csv", "jsonl", "sqlite")
+# 报告的列
+REPORT_COLUMNS = ("path", "brand", "matched", "verdict", "dest", "reason", "suggestions")
+# 默认报告文件：图片根目录旁边的 <目录名>_检查结果.csv
+REPORT_FILE_SUFFIX = "_检查结果"
+# csv / jsonl 的写入缓冲区大小
+WRITE_BUFFER_SIZE = 1024 * 1024
+# sqlite 累积多少行后写入一次
+INSERT_BATCH_SIZE = 5000
+
+_SQLITE_SCHEMA = """
+CREATE TABLE meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    brand TEXT,
+    matched TEXT,
+    verdict TEXT NOT NULL,
+    dest TEXT,
+    reason TEXT,
+    suggestions TEXT
+);
+"""
+# 写完后再建索引，比边写边维护索引快
+_SQLITE_INDEXES = """
+CREATE INDEX files_verdict_brand ON files (verdict, brand);
+CREATE INDEX files_brand ON files (brand);
+CREATE INDEX files_matched ON files (matched);
+"""
+
+
+def default_report_path(image_dir, report_format="csv"):
+    """默认报告文件路径"""
+    image_path = Path(image_dir)
+    return image_path.parent / f"{image_path.name}{REPORT_FILE_SUFFIX}.{report_format}"
+
+
+def report_format_for(path):
+    """根据扩展名判断报告格式（.db 也视为 sqlite），无法判断时返回 None"""
+    ext = os.path.splitext(os.fspath(path))[1].lower().lstrip('.')
+    if ext in ("db", "sqlite3"):
+        return "sqlite"
+    return ext if ext in REPORT_FORMATS else None
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class _TextReport:
+    """
+    csv / jsonl 报告的共同部分
+    继续上次中断的检查时，旧报告改名为 <报告>.old，从中读取要保留的行，新报告写完（close）后才删除 .old
+    """
+
+    def __init__(self, path, keep=None):
+        self.kept = 0
+        self._old_path = None
+        old_path = f"{path}.old"
+        if keep is None:
+            # 生成新的报告：以前中途退出时留下的 .old 不再需要
+            _remove_file(old_path)
+        else:
+            self._old_path = self._old_report(path, old_path, keep)
+        self._file, self._write = self._open(path)
+        if self._old_path is not None:
+            for row_path, item in self._read(self._old_path):
+                if keep(row_path):
+                    self._write(item)
+                    self.kept += 1
+
+    def _old_report(self, path, old_path, keep):
+        """
+        返回旧报告的路径（没有旧报告时返回 None）
+        .old 已经存在说明上次继续检查时中途退出：.old 不覆盖，上次写到一半的报告中新检查完的目录的行
+        （.old 中没有的目录）合并到 .old 中，先写临时文件再替换，合并中途退出时两个文件都不变
+        """
+        if not os.path.exists(old_path):
+            try:
+                os.replace(path, old_path)
+            except FileNotFoundError:
+                return None
+            return old_path
+        if os.path.exists(path):
+            tmp_path = f"{path}.tmp"
+            file, write = self._open(tmp_path)
+            with file:
+                old_dirs = set()
+                for row_path, item in self._read(old_path):
+                    if keep(row_path):
+                        write(item)
+                        old_dirs.add(os.path.dirname(row_path))
+                for row_path, item in self._read(path):
+                    if keep(row_path) and os.path.dirname(row_path) not in old_dirs:
+                        write(item)
+            os.replace(tmp_path, old_path)
+            os.remove(path)
+        return old_path
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self, meta=None):
+        self._file.close()
+        if self._old_path is not None:
+            _remove_file(self._old_path)
+
+
+class CsvReport(_TextReport):
+    @staticmethod
+    def _open(path):
+        # utf-8-sig 让 Excel 正确识别中文
+        file = open(path, 'w', encoding='utf-8-sig', newline='', buffering=WRITE_BUFFER_SIZE)
+        writer = csv.writer(file)
+        writer.writerow(REPORT_COLUMNS)
+        return file, writer.writerow
+
+    @staticmethod
+    def _read(path):
+        """逐行返回 (文件路径, 行)"""
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            rows = csv.reader(f)
+            header = next(rows, None) or []
+            # 旧版本的报告少了后面的列（如 suggestions），读出的行补上空值
+            if tuple(header) != REPORT_COLUMNS[:len(header)]:
+                return
+            padding = [""] * (len(REPORT_COLUMNS) - len(header))
+            for row in rows:
+                if len(row) == len(header):
+                    yield row[0], row + padding
+
+    def add(self, row):
+        self._write(row)
+
+
+class JsonlReport(_TextReport):
+    @staticmethod
+    def _open(path):
+        file = open(path, 'w', encoding='utf-8', buffering=WRITE_BUFFER_SIZE)
+        return file, file.write
+
+    @staticmethod
+    def _read(path):
+        """逐行返回 (文件路径, 行)"""
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # 中断时写到一半的最后一行
+                    break
+                yield record.get("path", ""), line if line.endswith("\n") else line + "\n"
+
+    def add(self, row):
+        self._write(json.dumps(dict(zip(REPORT_COLUMNS, row)), ensure_ascii=False) + "\n")
+
+
+class SqliteReport:
+    def __init__(self, path, keep=None):
+        self.kept = 0
+        self.conn = None
+        if keep is not None and os.path.exists(path):
+            self._reuse(path, keep)
+        if self.conn is None:
+            # 每次检查生成新的报告
+            self._remove(path)
+            self.conn = sqlite3.connect(path)
+            # 报告可以重新生成，不需要崩溃保护
+            self.conn.execute("PRAGMA journal_mode=OFF")
+            self.conn.execute("PRAGMA synchronous=OFF")
+            self.conn.executescript(_SQLITE_SCHEMA)
+        self._pending = []
+
+    @staticmethod
+    def _remove(path):
+        for suffix in ("", "-journal", "-wal", "-shm"):
+            _remove_file(f"{path}{suffix}")
+
+    def _reuse(self, path, keep):
+        """保留旧报告中 keep(路径) 为 True 的行；旧报告损坏时重新生成"""
+        conn = sqlite3.connect(path)
+        try:
+            conn.execute("PRAGMA journal_mode=OFF")
+            conn.execute("PRAGMA synchronous=OFF")
+            # 索引在写完后重建
+            for name in ("files_verdict_brand", "files_brand", "files_matched"):
+                conn.execute(f"DROP INDEX IF EXISTS {name}")
+            conn.create_function("keep_row", 1, lambda row_path: 1 if keep(row_path) else 0)
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(files)")]
+            if "suggestions" not in columns:
+                # 旧版本的报告
+                conn.execute("ALTER TABLE files ADD COLUMN suggestions TEXT")
+            conn.execute("DELETE FROM files WHERE NOT keep_row(path)")
+            conn.execute("DELETE FROM meta")
+            self.kept = conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+            conn.commit()
+        except sqlite3.DatabaseError:
+            conn.close()
+            return
+        self.conn = conn
+
+    def add(self, row):
+        self._pending.append(row)
+        if len(self._pending) >= INSERT_BATCH_SIZE:
+            self._flush()
+
+    def _flush(self):
+        if self._pending:
+            self.conn.executemany(
+                f"INSERT INTO files ({', '.join(REPORT_COLUMNS)}) VALUES ({', '.join('?' * len(REPORT_COLUMNS))})",
+                self._pending)
+            self._pending = []
+
+    def flush(self):
+        self._flush()
+        self.conn.commit()
+
+    def close(self, meta=None):
+        self._flush()
+        self.conn.executescript(_SQLITE_INDEXES)
+        if meta:
+            self.conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                                  [(key, str(value)) for key, value in meta.items()])
+        self.conn.commit()
+        self.conn.close()
+
+
+_WRITERS = {"csv": CsvReport, "jsonl": JsonlReport, "sqlite": SqliteReport}
+
+
+class ReportWriter:
+    """
+    逐个文件写出检查结论
+    report_format 为 None 时根据扩展名判断，无法判断时使用 csv
+    keep 为 None 时生成新的报告；否则保留旧报告中 keep(文件路径) 为 True 的行（继续上次中断的检查）
+    """
+
+    def __init__(self, path, report_format=None, keep=None):
+        self.path = os.fspath(path)
+        self.format = report_format or report_format_for(self.path) or "csv"
+        if self.format not in _WRITERS:
+            raise ValueError(f"未知的报告格式: {self.format}")
+        self._started = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self._writer = _WRITERS[self.format](self.path, keep)
+        self.kept = self._writer.kept
+        self.rows = self.kept
+
+    def add(self, path, brand, matched, verdict, dest=None, reason=None, suggestions=None):
+        """
+        记录一个文件；verdict 为结论名称（found / not_found / no_brand / invalid），
+        suggestions 为格式化的相近品牌（例如 Brador(1), Bravo(2)）
+        """
+        self._writer.add((os.fspath(path), brand, matched, verdict, dest, reason, suggestions))
+        self.rows += 1
+
+    def flush(self):
+        """把已写出的行交给操作系统（记录目录已检查完之前调用，中断后保留的行是完整的）"""
+        self._writer.flush()
+
+    def close(self, meta=None):
+        """写完剩余内容；meta 为检查信息（只写入 sqlite 的 meta 表）"""
+        meta = dict(meta or {}, started=self._started, finished=time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    rows=self.rows)
+        self._writer.close(meta)
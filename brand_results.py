@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+紧凑的检查结果集
+数百万个文件时，每个文件保存一个 Path 对象和品牌名字符串要占用几个 GB 内存。
+这里目录路径和品牌名各只保存一次（目录表、品牌表），每个文件只占用：
+品牌序号（2 字节，品牌超过 65535 个时 4 字节）、结论代码（1 字节）和压缩后的文件名。
+同一目录的文件是连续加入的，目录序号按段记录（每个目录一段），不必每个文件保存一份；
+文件名每 NAME_BLOCK_SIZE 个用 zlib 压缩成一块（同一目录的文件名很相似，压缩到约四分之一），
+读取时解压整块，最近解压的一块缓存起来，界面显示一屏的行通常只需解压一两块。
+完整路径只在复制、报告或查看时才拼接。
+检查线程写入的同时界面线程可以读取：结论代码最后写入，len() 以内的文件都已完整记录
+"""
+
+import os
+import zlib
+from array import array
+from bisect import bisect_right
+from collections import Counter
+
+
+# 每块压缩的文件名数
+NAME_BLOCK_SIZE = 128
+# 文件名的压缩级别（1 最快，压缩率与更高级别相差很少）
+NAME_COMPRESS_LEVEL = 1
+# 文件名之间的分隔符（文件名中不会出现 NUL）
+_NAME_SEPARATOR = b'\0'
+
+
+class ResultStore:
+    """
+    按检查顺序保存每个文件的 (目录, 文件名, 品牌名, 结论代码)
+    结论代码与 brand_engine 的 VERDICT_* 相同；无效图片的品牌名为无效原因
+    """
+
+    def __init__(self, root):
+        self.root = os.fspath(root)
+        self.dirs = []  # 目录序号 -> 相对目录（根目录为 '.'）
+        self._dir_ids = {}
+        self.brands = [None]  # 品牌序号 -> 品牌名，0 表示没有品牌名
+        self._brand_ids = {None: 0}
+        # 目录段：第 k 段从第 _run_starts[k] 个文件开始，这些文件都在目录 _run_dirs[k] 中
+        self._run_starts = array('I')
+        self._run_dirs = array('I')
+        self.brand_ids = array('H')
+        self.verdicts = array('B')
+        self._blocks = []  # 压缩后的文件名块，第 k 块是第 k * NAME_BLOCK_SIZE 个起的文件名
+        self._tail = []  # 还没有压缩的最后一块（UTF-8 文件名）
+        self._decoded = (-1, None)  # 最近解压的 (块序号, 文件名列表)
+
+    def __len__(self):
+        return len(self.verdicts)
+
+    def add_dir(self, dir_path):
+        """登记一个目录，返回目录序号（同一目录只保存一次）"""
+        rel_dir = os.path.relpath(dir_path, self.root)
+        dir_id = self._dir_ids.get(rel_dir)
+        if dir_id is None:
+            dir_id = len(self.dirs)
+            self.dirs.append(rel_dir)
+            self._dir_ids[rel_dir] = dir_id
+        return dir_id
+
+    def add(self, dir_id, name, brand, verdict):
+        """记录一个文件的结果"""
+        index = len(self.verdicts)
+        brand_id = self._brand_ids.get(brand)
+        if brand_id is None:
+            brand_id = len(self.brands)
+            if brand_id == 1 << 16:
+                # 品牌序号超出 2 字节，换成 4 字节（读取方取到的旧数组也包含之前的所有文件）
+                self.brand_ids = array('I', self.brand_ids)
+            self.brands.append(brand)
+            self._brand_ids[brand] = brand_id
+        if not self._run_dirs or self._run_dirs[-1] != dir_id:
+            # 先写目录再写起点，读取方按起点找到的段一定有目录
+            self._run_dirs.append(dir_id)
+            self._run_starts.append(index)
+        self.brand_ids.append(brand_id)
+        tail = self._tail
+        tail.append(name.encode('utf-8', 'surrogateescape'))
+        if len(tail) == NAME_BLOCK_SIZE:
+            # 先加入压缩块再换新的末块，读取方总能在其中之一找到文件名
+            self._blocks.append(zlib.compress(_NAME_SEPARATOR.join(tail), NAME_COMPRESS_LEVEL))
+            self._tail = []
+        # 最后写入结论代码，其他线程看到的 len() 只包含已完整记录的文件
+        self.verdicts.append(verdict)
+
+    def name(self, index):
+        block, offset = divmod(index, NAME_BLOCK_SIZE)
+        # 先取末块再判断是否已压缩（与 add 的写入顺序相反）
+        tail = self._tail
+        if block < len(self._blocks):
+            decoded_block, names = self._decoded
+            if decoded_block != block:
+                names = zlib.decompress(self._blocks[block]).split(_NAME_SEPARATOR)
+                self._decoded = (block, names)
+            name = names[offset]
+        else:
+            name = tail[offset]
+        return name.decode('utf-8', 'surrogateescape')
+
+    def brand(self, index):
+        return self.brands[self.brand_ids[index]]
+
+    def verdict(self, index):
+        return self.verdicts[index]
+
+    def dir_id(self, index):
+        return self._run_dirs[bisect_right(self._run_starts, index) - 1]
+
+    def rel_path(self, index):
+        """相对于图片根目录的路径"""
+        rel_dir = self.dirs[self.dir_id(index)]
+        name = self.name(index)
+        return name if rel_dir == '.' else os.path.join(rel_dir, name)
+
+    def path(self, index):
+        return os.path.join(self.root, self.rel_path(index))
+
+    def row(self, index):
+        """(相对路径, 品牌名, 结论代码)"""
+        return self.rel_path(index), self.brand(index), self.verdicts[index]
+
+    def select(self, verdicts=None, brand=None, start=0, stop=None):
+        """
+        返回符合条件的文件序号（array）
+        verdicts: 结论代码的集合，None 表示不限；brand: 品牌名中包含的文字（不区分大小写），None 表示不限
+        start / stop: 只在这个序号范围内查找（检查过程中只筛选新增的文件）
+        """
+        # 先确定范围，范围内文件的品牌都已在品牌表中
+        stop = len(self) if stop is None else min(stop, len(self))
+        if brand:
+            needle = brand.casefold()
+            brand_ok = bytes(1 if b is not None and needle in b.casefold() else 0 for b in self.brands)
+        else:
+            brand_ok = None
+        if verdicts is not None:
+            verdict_ok = bytes(1 if code in verdicts else 0 for code in range(256))
+        else:
+            verdict_ok = None
+        if brand_ok is None and verdict_ok is None:
+            return array('I', range(start, stop))
+        brand_ids, codes = self.brand_ids, self.verdicts
+        return array('I', (i for i in range(start, stop)
+                           if (verdict_ok is None or verdict_ok[codes[i]])
+                           and (brand_ok is None or brand_ok[brand_ids[i]])))
+
+    def counts(self):
+        """结论代码 -> 文件数"""
+        return dict(Counter(self.verdicts))
+
+    def memory_bytes(self):
+        """按文件保存的数据占用的字节数（不含目录表和品牌表）"""
+        return (self._run_starts.itemsize * len(self._run_starts) + self._run_dirs.itemsize * len(self._run_dirs)
+                + self.brand_ids.itemsize * len(self.brand_ids) + len(self.verdicts)
+                + sum(len(block) for block in self._blocks) + sum(len(name) for name in self._tail))
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文件名规则
+不同供应商的文件命名方式不同，可以用规则文件描述从文件名中提取品牌名的方法。
+规则按优先级编译成一个正则表达式的各个分支，每个文件只调用一次 match，
+按顺序尝试各条规则都在正则引擎内部完成，没有逐条规则的 Python 循环。
+以固定文字开头的规则（前缀表、以 ^ 加普通字符开头的正则）按开头文字建立索引，
+每个文件只把开头文字相符的规则和其他规则组成分支（组合编译后缓存）。
+查索引本身有固定的开销：有带开头文字的规则时每个文件的耗时约为只有一条规则时的 1.5 倍，
+之后从 10 条到 1000 条规则基本不变（见 benchmarks/bench_rules.py）。
+
+规则文件是 JSON 数组，按优先级从高到低排列，每条规则是以下三种之一（匹配时不含扩展名）：
+
+  {"type": "delimiter", "delimiter": "_", "position": 1}
+      按分隔符拆分后取第 position 段（从 0 开始，负数从末尾数）；这也是默认规则
+  {"type": "regex", "pattern": "^IMG\\d+-(?P<brand>[^-]+)"}
+      正则表达式，品牌名是命名分组 brand；不以 ^ 开头时可以出现在文件名任意位置
+  {"type": "prefix", "prefixes": {"NK": "Nike", "BR": "Brador"}}
+      文件名以表中的前缀开头时，品牌为对应的品牌名（较长的前缀优先）
+
+每条规则都可以加 "name"（日志中显示）和 "ignore_case": true。
+"""
+
+import json
+import os
+import re
+
+
+# 规则类型
+RULE_TYPES = ("delimiter", "regex", "prefix")
+# 与原来 extract_brand_from_filename 相同的默认规则
+DEFAULT_RULES = [{"type": "delimiter", "delimiter": "_", "position": 1}]
+
+# 规则中的命名分组和反向引用，编译时加上规则序号避免重名
+_NAMED_GROUP = re.compile(r'\(\?P<([A-Za-z_]\w*)>')
+_NAMED_BACKREF = re.compile(r'\(\?P=([A-Za-z_]\w*)\)')
+# 正则表达式中的特殊字符，开头文字到这里为止
+_REGEX_META = frozenset('.^$*+?{}[]\\|()')
+# 最多缓存的规则组合数
+PATTERN_CACHE_SIZE = 4096
+
+
+class FilenameRuleError(ValueError):
+    """规则文件格式错误"""
+
+
+def _delimiter_fragment(rule, group):
+    delimiter = rule.get("delimiter", "_")
+    position = rule.get("position", 1)
+    if not isinstance(delimiter, str) or not delimiter or not isinstance(position, int):
+        raise FilenameRuleError("delimiter 规则需要非空的 delimiter 和整数 position")
+    sep = re.escape(delimiter)
+    # 一段：不含分隔符的字符（多字符分隔符时逐个字符检查）
+    segment = f"(?:(?!{sep}).)" if len(delimiter) > 1 else f"[^{sep}]"
+    if position >= 0:
+        return f"(?:{segment}*{sep}){{{position}}}(?P<{group}>{segment}+)"
+    # 从末尾数时前面至少还有一个分隔符（与按位置取第 1 段时至少有一个分隔符一致）
+    return f".*{sep}(?P<{group}>{segment}+)(?:{sep}{segment}*){{{-position - 1}}}$"
+
+
+def _regex_fragment(rule, prefix, group):
+    pattern = rule.get("pattern")
+    if not isinstance(pattern, str):
+        raise FilenameRuleError("regex 规则需要 pattern")
+    try:
+        compiled = re.compile(pattern)
+    except re.error as e:
+        raise FilenameRuleError(f"正则表达式无效 {pattern}: {e}")
+    if "brand" not in compiled.groupindex:
+        raise FilenameRuleError(f"正则表达式需要命名分组 (?P<brand>...): {pattern}")
+    pattern = _NAMED_GROUP.sub(lambda m: f"(?P<{prefix}{m.group(1)}>", pattern)
+    pattern = _NAMED_BACKREF.sub(lambda m: f"(?P={prefix}{m.group(1)})", pattern)
+    if pattern.startswith('^'):
+        return pattern[1:]
+    return f".*?(?:{pattern})"
+
+
+def _leading_literal(pattern):
+    """以 ^ 开头的正则表达式开头的固定文字（无法确定时返回空字符串）"""
+    if not pattern.startswith('^') or '|' in pattern:
+        return ''
+    literal = []
+    for char in pattern[1:]:
+        if char in _REGEX_META:
+            # 后面跟着量词时前一个字符不一定出现
+            if char in '*?{' and literal:
+                literal.pop()
+            break
+        literal.append(char)
+    return ''.join(literal)
+
+
+def _prefix_fragment(rule, group):
+    prefixes = rule.get("prefixes")
+    if not isinstance(prefixes, dict) or not prefixes:
+        raise FilenameRuleError("prefix 规则需要非空的 prefixes 表")
+    # 较长的前缀放在前面，避免被它的前缀抢先匹配
+    ordered = sorted(prefixes, key=len, reverse=True)
+    return f"(?P<{group}>{'|'.join(re.escape(p) for p in ordered)})"
+
+
+class FilenameRules:
+    """编译后的文件名规则"""
+
+    def __init__(self, rules=None):
+        rules = DEFAULT_RULES if rules is None else rules
+        if not isinstance(rules, list) or not rules:
+            raise FilenameRuleError("规则文件应为非空的 JSON 数组")
+        self.names = []
+        self.prefix_tables = {}  # 规则序号 -> {前缀（小写或原样）: 品牌名}
+        self.ignore_case = {}
+        self.fragments = []
+        self.literal_index = {}  # 开头文字 -> 规则序号列表（区分大小写）
+        self.literal_index_icase = {}  # 小写的开头文字 -> 规则序号列表（不区分大小写的规则）
+        self.always = []  # 没有固定开头文字、每个文件都要尝试的规则序号
+        for index, rule in enumerate(rules):
+            if not isinstance(rule, dict) or rule.get("type") not in RULE_TYPES:
+                raise FilenameRuleError(f"第 {index + 1} 条规则的 type 应为 {'、'.join(RULE_TYPES)} 之一")
+            rule_type = rule["type"]
+            ignore_case = bool(rule.get("ignore_case"))
+            group = f"r{index}_brand"
+            literals = []
+            if rule_type == "delimiter":
+                fragment = _delimiter_fragment(rule, group)
+            elif rule_type == "regex":
+                fragment = _regex_fragment(rule, f"r{index}_", group)
+                literals = [_leading_literal(rule["pattern"])]
+            else:
+                fragment = _prefix_fragment(rule, group)
+                self.ignore_case[index] = ignore_case
+                self.prefix_tables[index] = {
+                    (prefix.lower() if ignore_case else prefix): brand
+                    for prefix, brand in rule["prefixes"].items()
+                }
+                literals = list(rule["prefixes"])
+            if ignore_case:
+                fragment = f"(?i:{fragment})"
+            # 每条规则外面包一个分组，匹配后 lastgroup 就是成功的规则
+            self.fragments.append(f"(?P<_r{index}>{fragment})")
+            self.names.append(rule.get("name") or f"{rule_type}#{index + 1}")
+            self._index_literals(index, literals, ignore_case)
+
+        self.literal_lengths = sorted({len(key) for key in self.literal_index} |
+                                      {len(key) for key in self.literal_index_icase})
+        # 每种开头文字长度对应的 (长度, 区分大小写的索引, 不区分大小写的索引)
+        self._lookups = [(length,
+                          {key: tuple(rules) for key, rules in self.literal_index.items() if len(key) == length},
+                          {key: tuple(rules) for key, rules in self.literal_index_icase.items()
+                           if len(key) == length})
+                         for length in self.literal_lengths]
+        # 规则外层分组名 -> (规则序号, 品牌分组名, 前缀表, 前缀表是否不区分大小写)
+        self._groups = {f"_r{index}": (index, f"r{index}_brand", self.prefix_tables.get(index),
+                                       self.ignore_case.get(index, False))
+                        for index in range(len(rules))}
+        self._patterns = {}
+        # 编译一次全部规则，提前发现规则之间无法组合的错误
+        self.pattern = self._compile(range(len(rules)))
+
+    def _index_literals(self, index, literals, ignore_case):
+        if not literals or not all(literals):
+            self.always.append(index)
+            return
+        table = self.literal_index_icase if ignore_case else self.literal_index
+        for literal in literals:
+            key = literal.lower() if ignore_case else literal
+            rules = table.setdefault(key, [])
+            if index not in rules:
+                rules.append(index)
+
+    def _compile(self, indexes):
+        try:
+            return re.compile('|'.join(self.fragments[i] for i in indexes), re.DOTALL)
+        except re.error as e:
+            raise FilenameRuleError(f"规则无法编译: {e}")
+
+    def __len__(self):
+        return len(self.names)
+
+    def pattern_for(self, stem):
+        """只包含可能匹配 stem 的规则的正则表达式（按开头文字筛选，按规则组合缓存）"""
+        if not self._lookups:
+            # 没有固定开头文字的规则
+            return self.pattern
+        hits = ()
+        for length, index, index_icase in self._lookups:
+            head = stem[:length]
+            rules = index.get(head)
+            if rules:
+                hits += rules
+            if index_icase:
+                rules = index_icase.get(head.lower())
+                if rules:
+                    hits += rules
+        pattern = self._patterns.get(hits)
+        if pattern is None:
+            if len(self._patterns) >= PATTERN_CACHE_SIZE:
+                self._patterns.clear()
+            indexes = sorted(set(hits).union(self.always))
+            pattern = self._compile(indexes) if indexes else None
+            self._patterns[hits] = pattern
+        return pattern
+
+    def match(self, stem):
+        """对不含扩展名的文件名匹配规则，返回 (品牌名, 规则序号)，没有规则匹配时返回 (None, None)"""
+        pattern = self.pattern_for(stem)
+        m = pattern.match(stem) if pattern is not None else None
+        if m is None:
+            return None, None
+        index, group, table, ignore_case = self._groups[m.lastgroup]
+        brand = m.group(group)
+        if table is not None:
+            brand = table[brand.lower() if ignore_case else brand]
+        return brand, index
+
+    def extract(self, filename):
+        """从文件名中提取品牌名（与 extract_brand_from_filename 用法相同），没有规则匹配时返回 None"""
+        return self.match(os.path.splitext(filename)[0])[0]
+
+
+def load_rules(path):
+    """读取规则文件并编译；文件无法读取或格式错误时抛出 OSError / FilenameRuleError"""
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        try:
+            rules = json.load(f)
+        except ValueError as e:
+            raise FilenameRuleError(f"规则文件不是有效的 JSON: {e}")
+    return FilenameRules(rules)
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分片检查
+把一个很大的图片目录分给多台机器（或同一台机器上的多个进程）同时检查，最后合并结果
+
+每个分片只检查属于自己的目录，未找到品牌的文件复制到输出目录中该分片的临时目录
+（.shard-<序号>-of-<分片数>/），检查结果写入分片结果文件（.shard-<序号>-of-<分片数>.jsonl）。
+所有分片完成后运行合并：把临时目录中的文件按分片顺序移入输出目录（保持原来的重名加序号规则），
+并写出一份检查报告和未找到品牌文件清单。输出目录需要在所有机器都能访问的共享存储上。
+
+分片方式：
+  top   按图片根目录下的第一级子目录分配，每个分片只遍历自己的子目录（根目录下的文件属于分片 0）
+  hash  按目录相对路径的哈希分配，分配更均匀，但每个分片都要遍历整棵目录树
+"""
+
+import csv
+import json
+import os
+import shutil
+import socket
+import subprocess
+import time
+import zlib
+
+from brand_copy import next_dest_name
+from brand_engine import INVALID_REPORT_FILENAME, CheckResult
+from brand_manifest import relative_dir
+from brand_metrics import RunMetrics
+
+
+# 分片方式
+SHARD_MODES = ("top", "hash")
+# 分片结果文件格式版本
+RESULT_VERSION = 1
+# 合并后写入输出目录的报告和未找到品牌文件清单
+REPORT_FILENAME = "_检查报告.json"
+NOT_FOUND_LIST_FILENAME = "_未找到品牌文件.csv"
+
+
+def parse_shard(text):
+    """解析 "序号/分片数"（序号从 0 开始），例如 "2/8" -> (2, 8)"""
+    try:
+        index, count = (int(part) for part in text.split('/'))
+    except ValueError:
+        raise ValueError(f"分片格式应为 序号/分片数，例如 0/4: {text}")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"分片序号应在 0 到 {count - 1} 之间: {text}")
+    return index, count
+
+
+def shard_for_key(key, count):
+    """把目录路径分配到分片（各台机器上结果相同，不受 Python 哈希随机化影响）"""
+    return zlib.crc32(key.encode('utf-8', 'surrogateescape')) % count
+
+
+class ShardSpec:
+    """一个分片：序号、分片数和分片方式"""
+
+    def __init__(self, image_dir, index, count, mode="top"):
+        if mode not in SHARD_MODES:
+            raise ValueError(f"未知的分片方式: {mode}")
+        self.image_dir = os.fspath(image_dir)
+        self.index = index
+        self.count = count
+        self.mode = mode
+
+    @property
+    def name(self):
+        return f"shard-{self.index:03d}-of-{self.count:03d}"
+
+    def _key(self, dir_path):
+        # 使用相对路径和 / 分隔符，各台机器的挂载点不同也能得到同样的分配
+        return relative_dir(self.image_dir, dir_path).replace(os.sep, '/')
+
+    def skip_dir(self, dir_path):
+        """遍历时不进入的子目录（top 方式下不属于本分片的第一级子目录）"""
+        if self.mode != "top":
+            return False
+        key = self._key(dir_path)
+        return '/' not in key and shard_for_key(key, self.count) != self.index
+
+    def owns_dir(self, dir_path):
+        """目录中的文件是否由本分片检查"""
+        key = self._key(dir_path)
+        if self.mode == "top":
+            if key == '.':
+                return self.index == 0
+            return shard_for_key(key.split('/', 1)[0], self.count) == self.index
+        return shard_for_key(key, self.count) == self.index
+
+
+def staging_dir(output_dir, spec):
+    return os.path.join(output_dir, f".{spec.name}")
+
+
+def result_path(output_dir, spec):
+    return os.path.join(output_dir, f".{spec.name}.jsonl")
+
+
+class ShardResultWriter:
+    """
+    逐行写出分片结果：第一行是分片信息，之后每个未找到品牌的文件一行，最后一行是统计
+    先写临时文件，分片完成后才改为正式文件名，所以合并时看到的都是完整的结果
+    """
+
+    def __init__(self, path, spec, copy_files, output_mode="copy"):
+        self.path = path
+        self.spec = spec
+        self._tmp_path = f"{path}.tmp"
+        self._file = open(self._tmp_path, 'w', encoding='utf-8')
+        self._write({
+            "version": RESULT_VERSION,
+            "shard": spec.index,
+            "shard_count": spec.count,
+            "shard_by": spec.mode,
+            "copy_files": copy_files,
+            "output_mode": output_mode,
+            "host": socket.gethostname(),
+        })
+
+    def _write(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def add(self, file_path, dest_filename):
+        """记录一个未找到品牌的文件（可直接作为 engine.not_found_sink）"""
+        rel_path = os.path.relpath(file_path, self.spec.image_dir).replace(os.sep, '/')
+        self._write({"file": rel_path, "staged": dest_filename})
+
+    def finish(self, result, elapsed):
+        stats = result.copy_stats
+        self._write({"summary": {
+            "processed_files": result.processed_files,
+            "found_brand_files": result.found_brand_files,
+            "not_found_files": result.not_found_count,
+            "invalid_files": result.invalid_files,
+            "copied_count": result.copied_count,
+            "failed_count": stats.failed_count if stats else 0,
+            "suggestions": result.suggestions,
+            "elapsed": round(elapsed, 3),
+        }})
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        self._file.close()
+        try:
+            os.remove(self._tmp_path)
+        except OSError:
+            pass
+
+
+def run_shard(engine, spec, copy_files=True):
+    """
+    检查一个分片：未找到品牌的文件复制到该分片的临时目录，结果写入分片结果文件
+    engine 的 output_dir 为最终输出目录；返回本分片的 CheckResult
+    """
+    output_dir = str(engine.get_output_dir())
+    os.makedirs(output_dir, exist_ok=True)
+    engine.output_dir = staging_dir(output_dir, spec)
+    if copy_files:
+        # 重新运行同一个分片时清除上次留下的临时文件
+        shutil.rmtree(engine.output_dir, ignore_errors=True)
+    engine.shard = spec
+
+    engine.prepare()
+    engine.log(f"分片 {spec.index + 1}/{spec.count}（按 {spec.mode} 分配）")
+    writer = ShardResultWriter(result_path(output_dir, spec), spec, copy_files, engine.output_mode)
+    engine.not_found_sink = writer.add
+    start = time.monotonic()
+    try:
+        result = engine.check_images(copy_files)
+    except BaseException:
+        writer.abort()
+        raise
+    finally:
+        engine.not_found_sink = None
+    writer.finish(result, time.monotonic() - start)
+    engine.log(f"分片结果已写入: {writer.path}")
+    return result
+
+
+def load_shard_results(output_dir):
+    """
+    找到输出目录中的所有分片结果文件，检查分片是否齐全
+    返回按分片序号排列的 (文件路径, 分片信息, 统计)；分片缺失时抛出 ValueError
+    """
+    headers = {}
+    for name in os.listdir(output_dir):
+        if not (name.startswith(".shard-") and name.endswith(".jsonl")):
+            continue
+        path = os.path.join(output_dir, name)
+        with open(path, 'r', encoding='utf-8') as f:
+            header = json.loads(f.readline())
+            summary = None
+            for line in f:
+                summary = line
+        if header.get("version") != RESULT_VERSION:
+            raise ValueError(f"分片结果文件版本不一致: {name}")
+        headers[header["shard"]] = (path, header, json.loads(summary)["summary"])
+
+    if not headers:
+        raise ValueError(f"输出目录中没有分片结果文件: {output_dir}")
+    counts = {header["shard_count"] for _, header, _ in headers.values()}
+    modes = {header["shard_by"] for _, header, _ in headers.values()}
+    if len(counts) != 1 or len(modes) != 1:
+        raise ValueError("分片结果文件的分片数或分片方式不一致，请清除旧的分片结果后重新运行")
+    count = counts.pop()
+    missing = [str(i) for i in range(count) if i not in headers]
+    if missing:
+        raise ValueError(f"缺少分片 {', '.join(missing)} 的结果（共 {count} 个分片），请等待所有分片完成")
+    return [headers[i] for i in range(count)]
+
+
+def merge_shards(output_dir, log=None, log_detail=None):
+    """
+    合并所有分片的结果：临时目录中的文件按分片顺序移入输出目录，写出检查报告和未找到品牌文件清单，
+    然后删除分片结果文件和临时目录。返回合并后的 CheckResult
+    """
+    output_dir = os.fspath(output_dir)
+    metrics = RunMetrics()
+    result = CheckResult()
+    result.metrics = metrics
+    shards = load_shard_results(output_dir)
+    shard_count = len(shards)
+    if log is not None:
+        log(f"合并 {shard_count} 个分片的结果: {output_dir}")
+
+    file_counter = {}
+    failed_count = 0
+    shard_reports = []
+    list_path = os.path.join(output_dir, NOT_FOUND_LIST_FILENAME)
+    with metrics.phase("merge"), open(list_path, 'w', encoding='utf-8-sig', newline='') as list_file:
+        writer = csv.writer(list_file)
+        writer.writerow(["文件", "复制为", "重复"])
+        for path, header, summary in shards:
+            spec = ShardSpec(output_dir, header["shard"], shard_count, header["shard_by"])
+            stage = staging_dir(output_dir, spec)
+            # list 方式下分片只分配了文件名，没有临时文件
+            list_only = header.get("output_mode") == "list"
+            final_names = {}  # 临时目录中的文件名 -> 输出目录中的文件名
+            with open(path, 'r', encoding='utf-8') as f:
+                next(f)
+                for line in f:
+                    record = json.loads(line)
+                    if "file" not in record:
+                        continue
+                    staged = record["staged"]
+                    if staged is None:
+                        writer.writerow([record["file"], "", 0])
+                        continue
+                    if staged in final_names:
+                        # 去重时内容相同的文件对应同一个临时文件
+                        writer.writerow([record["file"], final_names[staged] or "", 1])
+                        continue
+                    final = next_dest_name(os.path.basename(record["file"]), file_counter)
+                    try:
+                        if not list_only:
+                            os.replace(os.path.join(stage, staged), os.path.join(output_dir, final))
+                    except OSError as e:
+                        # 分片复制失败的文件没有临时文件
+                        failed_count += 1
+                        final_names[staged] = None
+                        if log_detail is not None:
+                            log_detail(f"  无法移入: {record['file']} - {str(e)}")
+                        writer.writerow([record["file"], "", 0])
+                        continue
+                    final_names[staged] = final
+                    writer.writerow([record["file"], final, 0])
+                    result.copied_count += 1
+
+            result.processed_files += summary["processed_files"]
+            result.found_brand_files += summary["found_brand_files"]
+            result.not_found_files += summary["not_found_files"]
+            result.invalid_files += summary["invalid_files"]
+            for brand_name, suggestions in summary["suggestions"].items():
+                result.suggestions.setdefault(brand_name, [tuple(s) for s in suggestions])
+            shard_reports.append(dict(summary, shard=header["shard"], host=header["host"]))
+            if log is not None:
+                log(f"  分片 {header['shard'] + 1}/{shard_count}（{header['host']}）: "
+                    f"{summary['processed_files']} 个文件，未找到品牌 {summary['not_found_files']} 个")
+
+    report = {
+        "shard_count": shard_count,
+        "shard_by": shards[0][1]["shard_by"],
+        "processed_files": result.processed_files,
+        "found_brand_files": result.found_brand_files,
+        "not_found_files": result.not_found_count,
+        "invalid_files": result.invalid_files,
+        "copied_count": result.copied_count,
+        "failed_count": failed_count,
+        "suggestions": result.suggestions,
+        "shards": shard_reports,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    with open(os.path.join(output_dir, REPORT_FILENAME), 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    if result.invalid_files:
+        merge_invalid_reports(output_dir, [header for _, header, _ in shards])
+
+    # 合并完成后删除分片结果和临时目录，避免下次合并时混入旧结果
+    for path, header, _ in shards:
+        spec = ShardSpec(output_dir, header["shard"], shard_count, header["shard_by"])
+        shutil.rmtree(staging_dir(output_dir, spec), ignore_errors=True)
+        os.remove(path)
+
+    result.output_dir = output_dir
+    metrics.set("files_processed", result.processed_files)
+    metrics.set("files_found", result.found_brand_files)
+    metrics.set("files_not_found", result.not_found_count)
+    metrics.set("files_copied", result.copied_count)
+    metrics.set("copy_failures", failed_count)
+    metrics.set("shards_merged", shard_count)
+    if log is not None:
+        log(f"检查报告: {os.path.join(output_dir, REPORT_FILENAME)}")
+        log(f"未找到品牌文件清单: {list_path}")
+    return result
+
+
+def merge_invalid_reports(output_dir, headers):
+    """把各分片临时目录中的无效图片清单按分片顺序合并到输出目录"""
+    with open(os.path.join(output_dir, INVALID_REPORT_FILENAME), 'w', encoding='utf-8-sig',
+              newline='') as merged:
+        writer = csv.writer(merged)
+        writer.writerow(["文件", "原因"])
+        for header in headers:
+            spec = ShardSpec(output_dir, header["shard"], header["shard_count"], header["shard_by"])
+            path = os.path.join(staging_dir(output_dir, spec), INVALID_REPORT_FILENAME)
+            if not os.path.exists(path):
+                continue
+            with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+                rows = csv.reader(f)
+                next(rows, None)
+                writer.writerows(rows)
+
+
+def run_local_shards(command, count, shard_by="top"):
+    """
+    在本机启动 count 个进程分别检查一个分片（代替多台机器，用于测试），等待全部结束
+    command 为不含 --shard 参数的命令行；返回各进程的退出码列表
+    """
+    processes = [
+        subprocess.Popen(command + ["--shard", f"{i}/{count}", "--shard-by", shard_by])
+        for i in range(count)
+    ]
+    return [process.wait() for process in processes]
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+相近品牌名建议
+对未找到的品牌名（如拼写错误 Bradr），给出编辑距离最近的几个已有品牌（如 Brador）
+
+使用 SymSpell 删除索引：建索引时为每个标准化品牌名生成最多删除 max_distance 个字符的所有变体，
+查询时只需生成查询词的删除变体并查表，再对少量候选计算真实编辑距离，
+查询耗时与品牌总数无关。
+"""
+
+from itertools import combinations
+
+
+# 默认最大编辑距离
+DEFAULT_MAX_DISTANCE = 2
+# 默认返回的候选数
+DEFAULT_TOP_K = 3
+# 只对前若干个字符生成删除变体，限制索引大小（SymSpell 的 prefix length）
+DEFAULT_PREFIX_LENGTH = 7
+# 查询结果缓存的最大条目数（同一个错误品牌名通常出现在很多文件中）
+SUGGEST_CACHE_SIZE = 10000
+
+
+def deletes(word, max_distance):
+    """生成 word 删除 1..max_distance 个字符后的所有变体（包括 word 本身）"""
+    results = {word}
+    length = len(word)
+    for count in range(1, min(max_distance, length) + 1):
+        for positions in combinations(range(length), count):
+            skip = set(positions)
+            results.add(''.join(ch for i, ch in enumerate(word) if i not in skip))
+    return results
+
+
+def edit_distance(a, b, max_distance):
+    """
+    受限的 Damerau-Levenshtein 距离（相邻字符交换算一次编辑）
+    超过 max_distance 时提前返回 max_distance + 1
+    """
+    if a == b:
+        return 0
+    len_a, len_b = len(a), len(b)
+    if abs(len_a - len_b) > max_distance:
+        return max_distance + 1
+
+    previous2 = None
+    previous = list(range(len_b + 1))
+    for i in range(1, len_a + 1):
+        current = [i] + [0] * len_b
+        row_min = i
+        ca = a[i - 1]
+        for j in range(1, len_b + 1):
+            cb = b[j - 1]
+            cost = 0 if ca == cb else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous2 is not None and j > 1 and ca == b[j - 2] and a[i - 2] == cb):
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > max_distance:
+            return max_distance + 1
+        previous2, previous = previous, current
+    return previous[len_b]
+
+
+class BrandSuggester:
+    """
+    标准化品牌名的相近名称索引
+
+    normalized_brands: 标准化名 -> [原始品牌名]（即 BrandCheckEngine.normalized_brands）
+    """
+
+    def __init__(self, normalized_brands, max_distance=DEFAULT_MAX_DISTANCE,
+                 prefix_length=DEFAULT_PREFIX_LENGTH):
+        self.normalized_brands = normalized_brands
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.index = {}  # 删除变体 -> 标准化品牌名（或其列表）
+        self._cache = {}
+        for key in normalized_brands:
+            for variant in deletes(key[:prefix_length], max_distance):
+                existing = self.index.get(variant)
+                if existing is None:
+                    self.index[variant] = key
+                elif isinstance(existing, list):
+                    existing.append(key)
+                else:
+                    self.index[variant] = [existing, key]
+
+    def candidates(self, token):
+        """删除索引中与 token 共享删除变体的标准化品牌名"""
+        found = set()
+        for variant in deletes(token[:self.prefix_length], self.max_distance):
+            keys = self.index.get(variant)
+            if keys is None:
+                continue
+            if isinstance(keys, list):
+                found.update(keys)
+            else:
+                found.add(keys)
+        return found
+
+    def suggest(self, token, top_k=DEFAULT_TOP_K):
+        """
+        返回与标准化名 token 最接近的品牌 [(原始品牌名, 编辑距离), ...]
+        按距离、品牌名排序，最多 top_k 个
+        """
+        cache_key = (token, top_k)
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        scored = []
+        for key in self.candidates(token):
+            distance = edit_distance(token, key, self.max_distance)
+            if 0 < distance <= self.max_distance:
+                scored.append((distance, key))
+        scored.sort()
+        result = [(self.normalized_brands[key][0], distance) for distance, key in scored[:top_k]]
+
+        if len(self._cache) >= SUGGEST_CACHE_SIZE:
+            self._cache.clear()
+        self._cache[cache_key] = result
+        return result
+
+
+def format_suggestions(suggestions):
+    """格式化建议列表，例如 Brador(1), Bravo(2)"""
+    return ", ".join(f"{brand}({distance})" for brand, distance in suggestions)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片文件校验
+只根据扩展名判断图片时，改了扩展名的 PDF、0 字节的上传文件、没传完的文件都会被当成图片。
+校验时只读取文件开头的几个字节判断格式（JPEG/PNG/GIF/BMP/WebP/TIFF），
+可选再读取文件末尾检查 JPEG/PNG 的结束标记；读取在线程池中进行，与遍历、匹配同时运行
+"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+# 默认同时校验的文件数
+DEFAULT_VALIDATE_WORKERS = 8
+# 每个校验线程最多排队的文件数（超过时等前面的结果被取走后再提交）
+PENDING_PER_WORKER = 4
+# 读取的文件头、文件尾字节数
+HEAD_SIZE = 16
+TAIL_SIZE = 32
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+JPEG_EOI = b'\xff\xd9'
+PNG_IEND = b'IEND\xaeB`\x82'
+
+# 无效原因
+REASON_EMPTY = "空文件"
+REASON_NOT_IMAGE = "不是图片"
+REASON_TRUNCATED = "文件不完整"
+
+
+def sniff_format(head):
+    """根据文件头判断图片格式，返回 jpeg/png/gif/bmp/webp/tiff，无法识别时返回 None"""
+    if head.startswith(b'\xff\xd8\xff'):
+        return "jpeg"
+    if head.startswith(PNG_SIGNATURE):
+        return "png"
+    if head.startswith((b'GIF87a', b'GIF89a')):
+        return "gif"
+    if head.startswith(b'BM') and len(head) >= 14:
+        return "bmp"
+    if head.startswith(b'RIFF') and head[8:12] == b'WEBP':
+        return "webp"
+    if head.startswith((b'II*\x00', b'MM\x00*')):
+        return "tiff"
+    return None
+
+
+def validate_image(path, check_eof=False):
+    """校验一个图片文件，有效时返回 None，否则返回无效原因"""
+    try:
+        # 不使用缓冲，只读取需要的字节
+        with open(path, 'rb', buffering=0) as f:
+            head = f.read(HEAD_SIZE)
+            if not head:
+                return REASON_EMPTY
+            image_format = sniff_format(head)
+            if image_format is None:
+                return f"{REASON_NOT_IMAGE}（文件头 {head[:8].hex()}）"
+            if check_eof and image_format in ("jpeg", "png"):
+                size = f.seek(0, 2)
+                f.seek(max(size - TAIL_SIZE, 0))
+                tail = f.read(TAIL_SIZE)
+                # JPEG 结束标记后面可能有少量填充，所以在最后几个字节中查找
+                marker = JPEG_EOI if image_format == "jpeg" else PNG_IEND
+                if marker not in tail:
+                    return f"{REASON_TRUNCATED}（缺少 {image_format.upper()} 结束标记）"
+    except OSError as e:
+        return f"无法读取: {str(e)}"
+    return None
+
+
+class ImageValidator:
+    """在线程池中并发校验图片"""
+
+    def __init__(self, workers=DEFAULT_VALIDATE_WORKERS, check_eof=False):
+        self.check_eof = check_eof
+        self.workers = max(1, workers)
+        self._pool = ThreadPoolExecutor(max_workers=self.workers)
+        self._stopped = False
+
+    def validate(self, path):
+        """在当前线程中校验一个文件"""
+        if self._stopped:
+            # 检查已停止，排队中的文件不再读取（结果不会被使用）
+            return None
+        return validate_image(path, self.check_eof)
+
+    def map(self, paths):
+        """
+        并发校验多个文件，按输入顺序逐个产出无效原因（有效为 None）
+        同时提交的文件数不超过 workers * PENDING_PER_WORKER，取走一个结果再提交下一个，
+        目录中文件再多也不会一次创建所有任务
+        """
+        submit = self._pool.submit
+        validate = self.validate
+        window = self.workers * PENDING_PER_WORKER
+        pending = deque()
+        for path in paths:
+            if len(pending) >= window:
+                yield pending.popleft().result()
+            pending.append(submit(validate, path))
+        while pending:
+            yield pending.popleft().result()
+
+    def close(self, cancel=False):
+        """停止线程池；cancel 为 True 时排队中的文件不再校验"""
+        self._stopped = cancel
+        self._pool.shutdown(wait=True)
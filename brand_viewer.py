@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+检查结果表格
+ttk.Treeview 只保留一屏的行，滚动时替换这些行的内容，数据直接从 ResultStore 中读取，
+所以显示几百万个文件时界面的内存和刷新时间都与文件数无关。
+筛选结果是文件序号的数组（按结论、品牌名筛选），检查过程中只筛选新增的文件。
+界面线程只读取结果集，不影响检查线程
+"""
+
+import tkinter as tk
+from array import array
+from tkinter import ttk
+
+from brand_engine import VERDICT_FOUND, VERDICT_INVALID, VERDICT_NO_BRAND, VERDICT_NOT_FOUND
+
+
+VERDICT_LABELS = {
+    VERDICT_FOUND: "找到品牌",
+    VERDICT_NOT_FOUND: "未找到品牌",
+    VERDICT_NO_BRAND: "无法提取品牌名",
+    VERDICT_INVALID: "无效图片",
+}
+# 结论筛选项 -> 结论代码集合（None 表示全部）
+VERDICT_FILTERS = {
+    "全部": None,
+    "未找到品牌（含无法提取）": {VERDICT_NOT_FOUND, VERDICT_NO_BRAND},
+    "找到品牌": {VERDICT_FOUND},
+    "未找到品牌": {VERDICT_NOT_FOUND},
+    "无法提取品牌名": {VERDICT_NO_BRAND},
+    "无效图片": {VERDICT_INVALID},
+}
+# 没有取到行高时使用的默认值（像素）
+DEFAULT_ROW_HEIGHT = 20
+# 输入品牌名后等待多久再筛选（毫秒）
+FILTER_DELAY_MS = 300
+# 每次 refresh() 最多筛选的文件数，文件很多时分几次完成，界面不会卡住
+FILTER_BATCH_SIZE = 200000
+
+
+class ResultsTable(ttk.Frame):
+    """
+    检查结果表格（虚拟滚动）
+    set_store() 设置结果集后，定时调用 refresh() 显示新增的文件；
+    滚动到底部时自动跟随新增的文件
+    """
+
+    def __init__(self, master, **kwargs):
+        super().__init__(master, **kwargs)
+        self.store = None
+        self.view = array('I')  # 符合筛选条件的文件序号
+        self.scanned = 0  # 已筛选过的文件数
+        self.offset = 0  # 第一行显示的是 view 中的第几个
+        self.rows = 1  # 一屏显示的行数
+        self.follow = True  # 是否跟随新增的文件
+        self._filter_job = None
+
+        filter_bar = ttk.Frame(self)
+        filter_bar.grid(row=0, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 5))
+        ttk.Label(filter_bar, text="结论:").pack(side=tk.LEFT)
+        self.verdict_var = tk.StringVar(value="全部")
+        verdict_box = ttk.Combobox(filter_bar, textvariable=self.verdict_var, values=list(VERDICT_FILTERS),
+                                   state="readonly", width=20)
+        verdict_box.pack(side=tk.LEFT, padx=5)
+        verdict_box.bind("<<ComboboxSelected>>", lambda event: self.apply_filter())
+        ttk.Label(filter_bar, text="品牌:").pack(side=tk.LEFT, padx=(10, 0))
+        self.brand_var = tk.StringVar()
+        brand_entry = ttk.Entry(filter_bar, textvariable=self.brand_var, width=20)
+        brand_entry.pack(side=tk.LEFT, padx=5)
+        brand_entry.bind("<KeyRelease>", self.on_brand_typed)
+        self.count_label = ttk.Label(filter_bar, text="", foreground="gray")
+        self.count_label.pack(side=tk.LEFT, padx=10)
+
+        self.tree = ttk.Treeview(self, columns=("path", "brand", "verdict"), show="headings",
+                                 selectmode="browse", height=1)
+        self.tree.heading("path", text="文件")
+        self.tree.heading("brand", text="品牌名 / 无效原因")
+        self.tree.heading("verdict", text="结论")
+        self.tree.column("path", width=380, stretch=True)
+        self.tree.column("brand", width=160, stretch=True)
+        self.tree.column("verdict", width=100, stretch=False)
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.on_scroll)
+        self.tree.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.scrollbar.grid(row=1, column=1, sticky=(tk.N, tk.S))
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(1, weight=1)
+
+        self.tree.bind("<Configure>", self.on_resize)
+        # Windows / macOS 的滚轮事件
+        self.tree.bind("<MouseWheel>", lambda event: self.scroll_by(-1 if event.delta > 0 else 1, "units"))
+        # Linux 的滚轮事件
+        self.tree.bind("<Button-4>", lambda event: self.scroll_by(-1, "units"))
+        self.tree.bind("<Button-5>", lambda event: self.scroll_by(1, "units"))
+        self.tree.bind("<Prior>", lambda event: self.scroll_by(-1, "pages"))
+        self.tree.bind("<Next>", lambda event: self.scroll_by(1, "pages"))
+        self.tree.bind("<Home>", lambda event: self.scroll_to(0))
+        self.tree.bind("<End>", lambda event: self.scroll_to(len(self.view)))
+
+    def row_height(self):
+        height = ttk.Style(self).lookup("Treeview", "rowheight")
+        try:
+            return int(height) or DEFAULT_ROW_HEIGHT
+        except (TypeError, ValueError):
+            return DEFAULT_ROW_HEIGHT
+
+    def set_store(self, store):
+        """显示另一个结果集（None 表示清空）"""
+        self.store = store
+        self.follow = True
+        self.apply_filter()
+
+    def filters(self):
+        return VERDICT_FILTERS.get(self.verdict_var.get()), self.brand_var.get().strip() or None
+
+    def on_brand_typed(self, event=None):
+        """输入品牌名时稍后再筛选，避免每输入一个字就筛选一遍"""
+        if self._filter_job is not None:
+            self.after_cancel(self._filter_job)
+        self._filter_job = self.after(FILTER_DELAY_MS, self.apply_filter)
+
+    def apply_filter(self):
+        """筛选条件变化后重新筛选全部文件"""
+        self._filter_job = None
+        self.view = array('I')
+        self.scanned = 0
+        self.offset = 0
+        self.refresh()
+
+    def refresh(self):
+        """筛选新增的文件并更新显示（在界面线程中定时调用）"""
+        store = self.store
+        if store is not None and len(store) > self.scanned:
+            stop = min(len(store), self.scanned + FILTER_BATCH_SIZE)
+            verdicts, brand = self.filters()
+            self.view.extend(store.select(verdicts, brand, self.scanned, stop))
+            self.scanned = stop
+        if self.follow:
+            self.offset = self.max_offset()
+        self.render()
+
+    def max_offset(self):
+        return max(0, len(self.view) - self.rows)
+
+    def scroll_to(self, offset):
+        self.offset = min(max(0, int(offset)), self.max_offset())
+        self.follow = self.offset >= self.max_offset()
+        self.render()
+
+    def scroll_by(self, count, what):
+        step = self.rows if what == "pages" else 3
+        self.scroll_to(self.offset + count * step)
+        return "break"
+
+    def on_scroll(self, action, *args):
+        """滚动条回调：moveto 位置 / scroll 数量 units|pages"""
+        if action == "moveto":
+            self.scroll_to(float(args[0]) * len(self.view))
+        elif action == "scroll":
+            self.scroll_by(int(args[0]), args[1])
+
+    def on_resize(self, event):
+        rows = max(1, event.height // self.row_height() - 1)  # 去掉表头
+        if rows != self.rows:
+            self.rows = rows
+            if self.follow:
+                self.offset = self.max_offset()
+            self.render()
+
+    def render(self):
+        """只显示当前一屏的行：已有的行直接替换内容，多余的删除、不够的补上"""
+        tree = self.tree
+        store = self.store
+        items = tree.get_children()
+        indexes = self.view[self.offset:self.offset + self.rows]
+        for i, index in enumerate(indexes):
+            path, brand, verdict = store.row(index)
+            values = (path, brand or "", VERDICT_LABELS.get(verdict, verdict))
+            if i < len(items):
+                tree.item(items[i], values=values)
+            else:
+                tree.insert("", tk.END, values=values)
+        if len(items) > len(indexes):
+            tree.delete(*items[len(indexes):])
+
+        total = len(self.view)
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + self.rows) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+        if store is None:
+            self.count_label.config(text="")
+        elif total == len(store):
+            self.count_label.config(text=f"共 {total} 个文件")
+        else:
+            self.count_label.config(text=f"{total} / {len(store)} 个文件")
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+并行目录遍历
+使用 os.scandir 列出目录，多个子目录由线程池同时列出
+适合 SMB/NFS 等每次列目录都有网络往返的存储
+"""
+
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+# 默认同时列出的目录数
+DEFAULT_WALK_WORKERS = 8
+# 每个线程最多预先排队的目录数（限制已列出但还未处理的结果占用的内存）
+INFLIGHT_PER_WORKER = 4
+
+# 系统文件不阻止删除空目录（删除目录时一并删除）
+SYSTEM_FILES = {'.DS_Store', 'Thumbs.db', '.gitkeep', '.gitignore'}
+
+
+def make_extension_filter(extensions):
+    """把扩展名集合转换为小写、带点的 frozenset"""
+    return frozenset(ext.lower() if ext.startswith('.') else '.' + ext.lower() for ext in extensions)
+
+
+def has_extension(name, extensions):
+    """
+    直接在文件名字符串上判断扩展名，不创建 Path 对象
+    与 Path(name).suffix.lower() in extensions 的结果一致
+    """
+    dot = name.rfind('.')
+    # 以点开头且只有一个点的文件（如 .jpg）没有扩展名，与 pathlib 保持一致
+    if dot <= 0:
+        return False
+    return name[dot:].lower() in extensions
+
+
+def list_dir(dir_path, extensions, prefetch_stat=False):
+    """
+    列出一个目录，返回 (目录路径, 匹配扩展名的 DirEntry 列表, 子目录路径列表, 非系统文件条目数, 系统文件名列表)
+    与 os.walk 一样不进入符号链接目录，无法访问的目录视为空目录（条目数记为 -1，不会被当作空目录删除）
+    prefetch_stat 为 True 时在工作线程中调用 entry.stat()，结果缓存在 DirEntry 上
+    """
+    files = []
+    subdirs = []
+    entry_count = 0
+    system_files = []
+    try:
+        with os.scandir(dir_path) as it:
+            for entry in it:
+                if entry.name in SYSTEM_FILES:
+                    system_files.append(entry.name)
+                    continue
+                entry_count += 1
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    if not entry.is_symlink():
+                        subdirs.append(entry.path)
+                elif extensions is None or has_extension(entry.name, extensions):
+                    if prefetch_stat:
+                        try:
+                            entry.stat()
+                        except OSError:
+                            continue
+                    files.append(entry)
+    except OSError:
+        entry_count = -1
+    return dir_path, files, subdirs, entry_count, system_files
+
+
+def iter_dirs(root, extensions=None, workers=DEFAULT_WALK_WORKERS, prefetch_stat=False, on_dir=None,
+              skip_dir=None):
+    """
+    并行遍历目录树，逐个目录产出 (目录路径, DirEntry 列表)
+
+    extensions: 只保留这些扩展名的文件（None 表示保留所有文件）
+    workers: 同时列出目录的线程数
+    prefetch_stat: 在工作线程中预先获取文件的 stat 信息（需要大小、修改时间时使用）
+    on_dir: 每列出一个目录调用 on_dir(目录路径, 非系统文件条目数, 系统文件名列表)，
+            用于在同一次遍历中记录目录结构（如删除空目录）
+    skip_dir: skip_dir(子目录路径) 返回 True 的子目录不进入（如分片检查时不属于本分片的目录）
+
+    结果按目录提交顺序（广度优先）产出，同一棵目录树每次遍历的顺序相同。
+    DirEntry 保留了 scandir 缓存的类型信息，后续处理无需再次 stat。
+    """
+    if extensions is not None:
+        extensions = make_extension_filter(extensions)
+    workers = max(1, workers)
+    max_inflight = workers * INFLIGHT_PER_WORKER
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        waiting = deque([os.fspath(root)])
+        inflight = deque()
+        while waiting or inflight:
+            while waiting and len(inflight) < max_inflight:
+                inflight.append(pool.submit(list_dir, waiting.popleft(), extensions, prefetch_stat))
+            dir_path, files, subdirs, entry_count, system_files = inflight.popleft().result()
+            if skip_dir is not None:
+                subdirs = [path for path in subdirs if not skip_dir(path)]
+            waiting.extend(subdirs)
+            if on_dir is not None:
+                on_dir(dir_path, entry_count, system_files)
+            yield dir_path, files
+
+
+def iter_files(root, extensions=None, workers=DEFAULT_WALK_WORKERS, prefetch_stat=False):
+    """并行遍历目录树，逐个产出文件的 DirEntry"""
+    for _, files in iter_dirs(root, extensions, workers, prefetch_stat):
+        for entry in files:
+            yield entry
+
+
+class EmptyDirPruner:
+    """
+    单次遍历删除空目录
+
+    遍历时通过 add_dir 记录每个目录剩余的非系统文件条目数，遍历结束后调用 prune()：
+    从条目数为 0 的目录开始删除，每删除一个目录就把父目录的条目数减一，
+    父目录变为 0 时立即删除，整个过程只访问每个目录一次。
+    只包含系统文件（.DS_Store、Thumbs.db 等）的目录视为空目录，系统文件随目录一起删除。
+    根目录本身不会被删除。
+    """
+
+    def __init__(self, root, log=None, log_detail=None):
+        self.root = os.path.normpath(os.fspath(root))
+        self.remaining = {}  # 目录路径 -> 剩余条目数（-1 表示无法访问，不删除）
+        self.system_files = {}  # 目录路径 -> 系统文件名列表（只记录有系统文件的目录）
+        self._log = log
+        self._log_detail = log_detail
+
+    def add_dir(self, dir_path, entry_count, system_files):
+        """记录一个目录（可直接作为 iter_dirs 的 on_dir 回调）"""
+        dir_path = os.path.normpath(dir_path)
+        self.remaining[dir_path] = entry_count
+        if system_files:
+            self.system_files[dir_path] = system_files
+
+    def file_removed(self, file_path):
+        """遍历后从目录中移走了一个文件（如移动到输出目录）"""
+        dir_path = os.path.dirname(os.path.normpath(os.fspath(file_path)))
+        if self.remaining.get(dir_path, 0) > 0:
+            self.remaining[dir_path] -= 1
+
+    def prune(self):
+        """删除所有空目录，返回删除的目录数"""
+        deleted_count = 0
+        stack = [path for path, count in self.remaining.items() if count == 0 and path != self.root]
+        while stack:
+            dir_path = stack.pop()
+            relative_path = os.path.relpath(dir_path, self.root)
+            try:
+                for name in self.system_files.get(dir_path, ()):
+                    os.remove(os.path.join(dir_path, name))
+                os.rmdir(dir_path)
+            except OSError as e:
+                # 遍历后目录中又出现了新文件，或没有删除权限
+                if self._log is not None:
+                    self._log(f"  无法删除目录 {relative_path}: {str(e)}")
+                continue
+            deleted_count += 1
+            if self._log_detail is not None:
+                self._log_detail(f"  删除空目录: {relative_path}")
+
+            parent = os.path.dirname(dir_path)
+            if parent in self.remaining and self.remaining[parent] > 0:
+                self.remaining[parent] -= 1
+                if self.remaining[parent] == 0 and parent != self.root:
+                    stack.append(parent)
+        return deleted_count
+
+
+def prune_empty_dirs(root, workers=DEFAULT_WALK_WORKERS, log=None, log_detail=None):
+    """遍历一次目录树并删除其中所有空目录（不删除 root 本身），返回删除的目录数"""
+    pruner = EmptyDirPruner(root, log, log_detail)
+    for _ in iter_dirs(root, extensions=(), workers=workers, on_dir=pruner.add_dir):
+        pass
+    return pruner.prune()
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+监控模式
+持续监控图片根目录，新写入或移入的图片立即检查品牌，
+未找到品牌的图片复制到 <图片根目录>_未找到品牌图片（不覆盖已有文件）
+
+Linux 上使用 inotify（通过 ctypes 调用，无需额外依赖），
+其他系统或 inotify 不可用时改为定时轮询目录修改时间
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from brand_engine import IMAGE_EXTENSIONS, CheckResult
+from brand_walk import has_extension, iter_dirs, list_dir, make_extension_filter
+
+
+# 默认轮询间隔（秒）
+DEFAULT_POLL_INTERVAL = 2.0
+# 品牌目录重新检查的间隔（秒），品牌索引只重新扫描有变化的品类
+BRAND_REFRESH_INTERVAL = 60.0
+# 新目录中已有的文件大小和修改时间保持不变多久（秒）后才报告
+STABLE_INTERVAL = 1.0
+# 记住最近处理过的多少个文件（用于跳过内容未变的重复事件）
+SEEN_CACHE_SIZE = 100000
+
+# inotify 事件（见 <sys/inotify.h>）
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, 'O_CLOEXEC', 0o2000000)
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF | IN_ONLYDIR
+
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class InotifyWatcher:
+    """
+    基于 inotify 的目录树监控
+    只报告写入完成（IN_CLOSE_WRITE）或移入（IN_MOVED_TO）的文件；
+    新建或移入的子目录自动加入监控，并报告其中已有的文件。
+    已有的文件可能还在写入：先监控目录再列出，列出的文件与轮询方式一样
+    等到大小和修改时间不再变化后才报告，期间收到写入完成事件的直接报告
+    """
+
+    def __init__(self, root, extensions, log=None):
+        libc_name = ctypes.util.find_library('c') or 'libc.so.6'
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.root = os.fspath(root)
+        self.extensions = extensions
+        self._log = log
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        self.watches = {}  # 监控描述符 -> 目录路径
+        self._pending = []
+        self.unstable = {}  # 新目录中已有的文件路径 -> ((大小, 修改时间), 记录时间)
+        self.add_tree(self.root, report=False)
+
+    def add_watch(self, dir_path):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(dir_path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if self._log is not None:
+                self._log(f"  无法监控目录 {dir_path}: {os.strerror(err)}")
+            return
+        self.watches[wd] = dir_path
+
+    def add_tree(self, dir_path, report=True):
+        """
+        监控目录及其所有子目录；report 为 True 时报告其中已有的图片
+        每个目录先加入监控再列出，列出之前写入完成的文件由列出结果报告，之后的由事件报告
+        """
+        stack = [dir_path]
+        now = time.monotonic()
+        while stack:
+            path = stack.pop()
+            self.add_watch(path)
+            _, entries, subdirs, _, _ = list_dir(path, self.extensions)
+            stack.extend(subdirs)
+            if report:
+                for entry in entries:
+                    signature = self._signature(entry.path)
+                    if signature is not None:
+                        self.unstable.setdefault(entry.path, (signature, now))
+
+    @staticmethod
+    def _signature(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def _check_unstable(self):
+        """报告大小和修改时间已经 STABLE_INTERVAL 秒没有变化的已有文件"""
+        now = time.monotonic()
+        for path, (signature, since) in list(self.unstable.items()):
+            if now - since < STABLE_INTERVAL:
+                continue
+            current = self._signature(path)
+            if current is None:
+                del self.unstable[path]
+            elif current == signature:
+                del self.unstable[path]
+                self._pending.append(path)
+            else:
+                self.unstable[path] = (current, now)
+
+    def poll(self, timeout):
+        """等待最多 timeout 秒，返回新出现的图片路径列表"""
+        if self._pending:
+            timeout = 0
+        elif self.unstable:
+            timeout = min(timeout, STABLE_INTERVAL / 2)
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if ready:
+            self._read_events()
+        if self.unstable:
+            self._check_unstable()
+        paths, self._pending = self._pending, []
+        return paths
+
+    def _read_events(self):
+        try:
+            data = os.read(self.fd, 1 << 20)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                if self._log is not None:
+                    self._log("  警告: inotify 事件队列溢出，部分新文件可能被遗漏")
+                continue
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            dir_path = self.watches.get(wd)
+            if dir_path is None or not name:
+                continue
+            path = os.path.join(dir_path, name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self.add_tree(path)
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                if has_extension(name, self.extensions):
+                    # 写入完成的文件不再等待大小稳定
+                    self.unstable.pop(path, None)
+                    self._pending.append(path)
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class PollingWatcher:
+    """
+    轮询方式的目录树监控（inotify 不可用时使用）
+    每次只 stat 已知目录，修改时间变化的目录才重新列出；
+    新文件在连续两次轮询中大小不变后才报告，避免读到正在写入的文件
+    """
+
+    def __init__(self, root, extensions, log=None):
+        self.root = os.fspath(root)
+        self.extensions = extensions
+        self._log = log
+        self.dirs = {}  # 目录路径 -> 修改时间
+        self.files = {}  # 目录路径 -> 已报告的文件名集合
+        self.unstable = {}  # 文件路径 -> 上次看到的大小
+        for path, entries in iter_dirs(self.root, self.extensions):
+            self.dirs[path] = self._mtime(path)
+            self.files[path] = {entry.name for entry in entries}
+
+    @staticmethod
+    def _mtime(path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def poll(self, timeout):
+        """等待 timeout 秒后检查一次，返回新出现的图片路径列表"""
+        time.sleep(timeout)
+        # 文件继续写入不会改变目录修改时间，所以有未稳定文件的目录也要重新列出
+        unstable_dirs = {os.path.dirname(p) for p in self.unstable}
+        changed = []
+        for path, mtime in list(self.dirs.items()):
+            current = self._mtime(path)
+            if current is None:
+                self.dirs.pop(path, None)
+                self.files.pop(path, None)
+            elif current != mtime or path in unstable_dirs:
+                self.dirs[path] = current
+                changed.append(path)
+
+        paths = []
+        for path in changed:
+            known = self.files.setdefault(path, set())
+            try:
+                with os.scandir(path) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.path not in self.dirs:
+                            # 新目录：记录下来，其中的文件由下一次轮询报告
+                            for sub_path, _ in iter_dirs(entry.path, self.extensions):
+                                self.dirs[sub_path] = None
+                        continue
+                    if entry.name in known or not has_extension(entry.name, self.extensions):
+                        continue
+                    size = entry.stat().st_size
+                except OSError:
+                    continue
+                if self.unstable.get(entry.path) == size:
+                    del self.unstable[entry.path]
+                    known.add(entry.name)
+                    paths.append(entry.path)
+                else:
+                    self.unstable[entry.path] = size
+        return paths
+
+    def close(self):
+        pass
+
+
+def create_watcher(root, extensions=IMAGE_EXTENSIONS, force_polling=False, log=None):
+    """优先使用 inotify，不可用时使用轮询"""
+    extensions = make_extension_filter(extensions)
+    if not force_polling and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(root, extensions, log)
+        except (OSError, AttributeError) as e:
+            if log is not None:
+                log(f"inotify 不可用（{e}），改用轮询方式")
+    return PollingWatcher(root, extensions, log)
+
+
+def watch(engine, stop_event=None, poll_interval=DEFAULT_POLL_INTERVAL, force_polling=False):
+    """
+    持续监控 engine.image_dir，直到 stop_event 被设置（或按 Ctrl+C）
+    engine 需要已经扫描过品牌；返回整个监控期间累计的 CheckResult
+    """
+    stop_event = stop_event or threading.Event()
+    result = CheckResult()
+    result.metrics = engine.metrics
+    engine.copy_files = True
+    engine.keep_existing_outputs = True
+
+    output_dir = os.path.abspath(engine.get_output_dir())
+    watcher = create_watcher(engine.image_dir, force_polling=force_polling, log=engine.log)
+    mode = "inotify" if isinstance(watcher, InotifyWatcher) else f"轮询（每 {poll_interval} 秒）"
+    engine.log(f"开始监控图片目录: {engine.image_dir}（{mode}），按 Ctrl+C 停止")
+
+    # 最近处理过的文件路径 -> (大小, 修改时间)，同一文件重复写入但内容未变时不再检查；
+    # 只保留最近的 SEEN_CACHE_SIZE 个，长时间监控时内存不会一直增长
+    seen = OrderedDict()
+    last_refresh = time.monotonic()
+    engine.open_report()
+    try:
+        while not stop_event.is_set():
+            for path in watcher.poll(poll_interval):
+                if os.path.abspath(path).startswith(output_dir + os.sep):
+                    continue
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                signature = (st.st_size, st.st_mtime_ns)
+                if seen.get(path) == signature:
+                    seen.move_to_end(path)
+                    continue
+                seen[path] = signature
+                seen.move_to_end(path)
+                if len(seen) > SEEN_CACHE_SIZE:
+                    seen.popitem(last=False)
+                result.processed_files += 1
+                engine.check_new_file(os.path.basename(path), path, result)
+
+            if time.monotonic() - last_refresh >= BRAND_REFRESH_INTERVAL:
+                last_refresh = time.monotonic()
+                brand_count = len(engine.brands)
+                if not engine.scan_brands():
+                    engine.log("重新扫描品牌目录失败，继续使用原来的品牌")
+                elif len(engine.brands) != brand_count:
+                    engine.log(f"品牌目录已更新：{len(engine.brands)} 个品牌")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+        engine.finish_copy(result)
+        engine.close_validator()
+        engine.close_report(result)
+        engine.collect_metrics(result)
+        engine.log("监控已停止")
+    return result